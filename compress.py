@@ -1,12 +1,68 @@
+import argparse
+from logging import basicConfig, INFO
 from pathlib import Path
-import sys
 
-from transportstreamarchiver.compress import compress
+from transportstreamarchiver.compress import (
+    ChunkedOptions,
+    compress,
+    compress_chunked,
+    cut_compress,
+    SECONDS_CHUNK,
+    THREADS_PER_CHUNK,
+)
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compress the video into HEVC.")
+    parser.add_argument("file_input", type=Path)
+    parser.add_argument("file_output", type=Path)
+    parser.add_argument("string_from", nargs="?")
+    parser.add_argument("string_to", nargs="?")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--chunked",
+        action="store_true",
+        help="Encode chunks split at key frames by multiple FFmpeg processes, resumable after interruption.",
+    )
+    group.add_argument(
+        "--cut",
+        action="store_true",
+        help="Cut the range as cut.py does and compress it through the pipe, without the intermediate file.",
+    )
+    parser.add_argument("--seconds-chunk", type=float, default=SECONDS_CHUNK)
+    parser.add_argument("--workers", type=int, help="The number of FFmpeg processes in chunked mode.")
+    parser.add_argument("--threads", type=int, default=THREADS_PER_CHUNK, help="The number of threads per process.")
+    parser.add_argument("--keep-chunks", action="store_true")
+    return parser.parse_args()
 
-SYS_ARGV_LENGTH_TO_STRING_FROM = 3
-SYS_ARGV_LENGTH_TO_STRING_TO = 4
 
 if __name__ == "__main__":
-    string_from = sys.argv[3] if len(sys.argv) > SYS_ARGV_LENGTH_TO_STRING_FROM else None
-    string_to = sys.argv[4] if len(sys.argv) > SYS_ARGV_LENGTH_TO_STRING_TO else None
-    compress(Path(sys.argv[1]), Path(sys.argv[2]), string_from=string_from, string_to=string_to)
+    basicConfig(level=INFO)
+    arguments = parse_arguments()
+    if arguments.chunked:
+        compress_chunked(
+            arguments.file_input,
+            arguments.file_output,
+            string_from=arguments.string_from,
+            string_to=arguments.string_to,
+            options=ChunkedOptions(
+                seconds_chunk=arguments.seconds_chunk,
+                max_workers=arguments.workers,
+                threads_per_chunk=arguments.threads,
+                keep_chunks=arguments.keep_chunks,
+            ),
+        )
+    elif arguments.cut:
+        cut_compress(
+            arguments.file_input,
+            arguments.file_output,
+            string_from=arguments.string_from,
+            string_to=arguments.string_to,
+        )
+    else:
+        compress(
+            arguments.file_input,
+            arguments.file_output,
+            string_from=arguments.string_from,
+            string_to=arguments.string_to,
+        )
@@ -1,9 +1,10 @@
-from logging import getLogger
+from logging import basicConfig, getLogger, INFO
 from pathlib import Path
+import sys
 
 import yaml
 
-from transportstreamarchiver.cut import cut
+from transportstreamarchiver.cut import cut_parallel, cut_segments, CutJob, MAX_WORKERS_PER_DISK, Segment
 
 logger = getLogger(__name__)
 
@@ -13,15 +14,29 @@ def convert(value: float) -> str:
 
 
 if __name__ == "__main__":
+    basicConfig(level=INFO)
     config = yaml.safe_load(Path("cut.yml").read_text("utf-8"))
+    file_input = Path(config["path"]) / config["name"]
+    logger.info(file_input)
+    segments = []
     for each_cut in config["cut"]:
-        file_input = Path(config["path"]) / config["name"]
         replaced_name = each_cut["name"].replace(" ", "-")
         file_output = Path(config["path"]) / f"{Path(config['name']).stem}-{replaced_name}.ts"
         string_from = convert(each_cut["from"])
         string_to = convert(each_cut["to"])
-        logger.info(file_input)
         logger.info(file_output)
         logger.info(string_from)
         logger.info(string_to)
-        cut(file_input, file_output, string_from=string_from, string_to=string_to)
+        segments.append(Segment(file_output, string_from, string_to))
+    if not config.get("parallel", False):
+        # All segments are cut by single FFmpeg process to read the input only once.
+        cut_segments(file_input, segments)
+        sys.exit(0)
+    results = cut_parallel(
+        (CutJob(file_input, segment) for segment in segments),
+        max_workers=config.get("max_workers"),
+        max_workers_per_disk=config.get("max_workers_per_disk", MAX_WORKERS_PER_DISK),
+        max_workers_by_disk={Path(path): limit for path, limit in config.get("max_workers_by_disk", {}).items()},
+    )
+    if any(result.error is not None for result in results):
+        sys.exit(1)
@@ -1,15 +1,20 @@
+import argparse
 from collections.abc import Generator, Iterable
 from dataclasses import dataclass
+from datetime import timedelta
 import json
 from logging import basicConfig, INFO
 from pathlib import Path
 import subprocess
 import sys
 
-from transportstreamarchiver.ffmpeg.edit import cut
+from transportstreamarchiver.ffmpeg.edit import cut_segments
 from transportstreamarchiver.ffmpeg.make_zero import make_zero
+from transportstreamarchiver.ffmpeg.seek_range import SeekRange as FFmpegSeekRange
 from transportstreamarchiver import ffprobe
-from transportstreamarchiver.ffprobe.key_frame import create_list_key_frame
+from transportstreamarchiver.ffprobe.key_frame_index import KeyFrameIndex
+from transportstreamarchiver.ffprobe.verification import CutReport
+from transportstreamarchiver.pipeline import CutVerifyPipeline, MAX_PENDING, MAX_WORKERS_CUT, MAX_WORKERS_VERIFY
 
 
 def generateCommand(index: list[int], list_time: list[str]) -> str:
@@ -24,6 +29,10 @@ def generateCommand(index: list[int], list_time: list[str]) -> str:
     return text
 
 
+# The precision of the seek range that `SeekRange.to_string()` truncates into.
+SECONDS_TRUNCATED = 0.001
+
+
 @dataclass
 class ConsecutivePeriod:
     ss: int
@@ -52,6 +61,10 @@ class SeekRange:
     def __str__(self) -> str:
         return f"{self.to_string(self.ss)} to {self.to_string(self.to)}"
 
+    def to_ffmpeg(self) -> FFmpegSeekRange:
+        # Truncated into milliseconds not to exceed the key frame.
+        return FFmpegSeekRange(timedelta(0), string_from=self.to_string(self.ss), string_to=self.to_string(self.to))
+
     @staticmethod
     def to_string(string_second: str) -> str:
         """Convert second to HH:MM:SS.mmm format."""
@@ -76,6 +89,23 @@ def create_list_period(
         yield SeekRange(list_time[period.ss], list_time[period.to + 1])
 
 
+def load_list_index(directory: Path, list_time: list[str], *, is_all: bool = False) -> list[int]:
+    """Indices of scenes to keep, whose thumbnail remains after `scene.py --thumbnails` wrote them.
+
+    Args:
+        directory: Directory of the thumbnails.
+        list_time: Start times of scenes and the end time.
+        is_all: Keep all scenes without the thumbnails.
+    """
+    if is_all:
+        return list(range(len(list_time) - 1))
+    list_index = sorted(int(file.stem) for file in directory.glob("*.jpg"))
+    if not list_index:
+        msg = f"Thumbnail is not found in {directory}, write them by `scene.py --thumbnails` or cut all by --all"
+        raise FileNotFoundError(msg)
+    return list_index
+
+
 class Frames:
     # The gap between the FFprobe's PTS_TIME and FFmpeg's -ss option position.
     # Because, FFmpeg would take the key frame before the end of the scene.
@@ -84,49 +114,120 @@ class Frames:
 
     def __init__(self, file_make_zero: Path) -> None:
         self.file_make_zero = file_make_zero
-        self.list_frame = create_list_key_frame(file_make_zero)
-        print(self.list_frame)
+        self.key_frames = KeyFrameIndex.create(file_make_zero)
+        print(f"Key frames: {len(self.key_frames)}")
 
     def search_outside_neighbor_frame(self, seek_ranges: Iterable[SeekRange]) -> Generator[SeekRange, None, None]:
-        for seek_range in seek_ranges:
+        list_seek_range = list(seek_ranges)
+        for seek_range in list_seek_range:
             print(seek_range)
-            yield SeekRange(self.search_frame_before(seek_range.ss), self.search_frame_after(seek_range.to))
+        list_ss = self.key_frames.to_strings(
+            self.key_frames.snap_before([seek_range.ss for seek_range in list_seek_range]),
+        )
+        list_to = self.key_frames.to_strings(
+            self.key_frames.snap_after(
+                [seek_range.to for seek_range in list_seek_range],
+                index_gap=self.INDEX_GAP_BETWEEN_FFPROBE_AND_FFMPEG,
+            ),
+        )
+        for ss, to in zip(list_ss, list_to, strict=True):
+            yield SeekRange(ss, to)
+
+    def move_before_key_frame(self, seek_range: FFmpegSeekRange) -> FFmpegSeekRange:
+        """Move `ss` at the key frame so that output-side `-ss` starts from the same key frame as `cut()`.
+
+        Output-side `-ss` on stream copy starts the video from the first key frame decoded at or after it,
+        so `ss` is moved to the middle between the key frame and the previous one.
+        """
+        if seek_range.ss is None:
+            return seek_range
+        # `ss` has been truncated into milliseconds from the time of the key frame.
+        time_key_frame = self.key_frames.snap_before([seek_range.ss.total_seconds() + SECONDS_TRUNCATED])[0]
+        time_previous = self.key_frames.snap_before([time_key_frame])[0]
+        # The video starts from the first key frame without `ss`.
+        seek_range.ss = (
+            None if time_previous == time_key_frame else timedelta(seconds=float(time_previous + time_key_frame) / 2)
+        )
+        return seek_range
 
     def search_frame_before(self, time: str) -> str:
-        threshold = float(time)
-        for index, frame in enumerate(self.list_frame):
-            if float(frame) >= threshold:
-                return self.list_frame[index - 1]
-        return self.list_frame[-1]
+        return self.key_frames.to_strings(self.key_frames.snap_before([time]))[0]
 
     def search_frame_after(self, time: str) -> str:
-        threshold = float(time)
-        for index, frame in enumerate(reversed(self.list_frame)):
-            if float(frame) <= threshold:
-                return self.list_frame[min(-(index + 1) + self.INDEX_GAP_BETWEEN_FFPROBE_AND_FFMPEG, -1)]
-        return self.list_frame[0]
+        snapped = self.key_frames.snap_after([time], index_gap=self.INDEX_GAP_BETWEEN_FFPROBE_AND_FFMPEG)
+        return self.key_frames.to_strings(snapped)[0]
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Cut the scenes listed in output/times.json.")
+    parser.add_argument("file_input", type=Path)
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Cut each segment by its own FFmpeg process and verify the outputs while the following ones are cut.",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        dest="is_all",
+        help="Cut all scenes instead of the ones whose thumbnail remains in output/.",
+    )
+    parser.add_argument("--workers-cut", type=int, default=MAX_WORKERS_CUT)
+    parser.add_argument("--workers-verify", type=int, default=MAX_WORKERS_VERIFY)
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=MAX_PENDING,
+        help="The number of outputs that are being cut or not verified yet in pipeline mode.",
+    )
+    return parser.parse_args()
+
+
+def cut_and_verify(
+    arguments: argparse.Namespace,
+    segments: list[tuple[FFmpegSeekRange, Path]],
+    frames: Frames,
+) -> list[CutReport]:
+    if arguments.pipeline:
+        return CutVerifyPipeline(
+            arguments.file_input,
+            max_workers_cut=arguments.workers_cut,
+            max_workers_verify=arguments.workers_verify,
+            max_pending=arguments.max_pending,
+        ).run(segments)
+    # All segments are cut by single FFmpeg process to read the input only once.
+    cut_segments(
+        arguments.file_input,
+        [(frames.move_before_key_frame(seek_range), file_output) for seek_range, file_output in segments],
+    )
+    return ffprobe.verify_cuts(arguments.file_input, [file_output for _, file_output in segments])
 
 
 if __name__ == "__main__":
     basicConfig(level=INFO)
-    file_input = Path(sys.argv[1])
+    arguments = parse_arguments()
+    file_input = arguments.file_input
     file_make_zero = make_zero(file_input, SeekRange(None, None))
     frames = Frames(file_make_zero)
-    list_index = sorted([int(file.stem) for file in Path("./output").glob("*.jpg")])
-    print(list_index)
-    print(len(list_index))
     file_times = Path("output/times.json")
     list_time = json.loads(file_times.read_text(encoding="utf-8"))
+    list_index = load_list_index(Path("./output"), list_time, is_all=arguments.is_all)
+    print(list_index)
+    print(len(list_index))
     for index, time in enumerate(list_time):
         print(index, time)
     list_consecutive_period = create_list_consecutive_period(list_index)
     list_period = create_list_period(list_consecutive_period, list_time)
     seek_ranges = frames.search_outside_neighbor_frame(list_period)
     print(seek_ranges)
+    segments = []
     for index, seek_range in enumerate(seek_ranges):
         print(seek_range)
-        file_output = Path(f"{file_input.stem}-{index + 1}{file_input.suffix}")
-        cut(file_input, seek_range, file_output)
-        ffprobe.is_cut_by_key_frame_at_start(file_output)
-        ffprobe.is_cut_by_key_frame_at_end(file_output)
-        ffprobe.is_preserving_metadata(file_input, file_output)
+        segments.append((seek_range.to_ffmpeg(), Path(f"{file_input.stem}-{index + 1}{file_input.suffix}")))
+    reports = cut_and_verify(arguments, segments, frames)
+    for report in reports:
+        print(f"{report.file_output}: {'OK' if report.is_ok else 'NG'}")
+        for error in report.errors:
+            print(error)
+    if not all(report.is_ok for report in reports):
+        sys.exit(1)
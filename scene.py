@@ -1,74 +1,133 @@
-import json
+import argparse
+from logging import basicConfig, INFO
 from pathlib import Path
-import re
 import sys
-from typing import TYPE_CHECKING
 
-import ffmpeg
+from transportstreamarchiver.scene import (
+    detect_scenes,
+    detect_scenes_fast,
+    detect_scenes_parallel,
+    Progress,
+    Scenes,
+    SceneScoreIndex,
+    write_thumbnails,
+)
+from transportstreamarchiver.scene.detector import THRESHOLD_DEFAULT
+from transportstreamarchiver.scene.fast import LOWRES
 
-if TYPE_CHECKING:
-    from ffmpeg.nodes import FilterableStream, OutputStream
+DIRECTORY_OUTPUT = Path("output")
+MODE_FULL = "full"
+MODE_KEY = "key"
+MODE_STEP = "step"
+STEP_DEFAULT = 4
 
-SCENE_DEFAULT = "0.1"
 
-
-def extract_first_scene(file_input: Path) -> None:
-    """Extract the first scene of the video.
-
-    ffmpeg -i <file_imput> -vframes 1 -f image2 /output/%06d.jpg
-    """
-    stream_input: FilterableStream = ffmpeg.input(file_input)
-    stream_filter: FilterableStream = ffmpeg.filter(stream_input, "scale", width=640, height=360)
-    stream_output: OutputStream = ffmpeg.output(
-        stream_filter,
-        "output/%06d.jpg",
-        start_number=0,
-        vframes=1,
-        f="image2",
-        hide_banner=None,
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Detect scenes and write their start times into output/times.json.")
+    parser.add_argument("file_input", type=Path)
+    parser.add_argument(
+        "threshold",
+        type=float,
+        nargs="?",
+        default=THRESHOLD_DEFAULT,
+        help="Threshold of the scene score, the same as the one of select=gt(scene,...) of FFmpeg.",
     )
-    bytes_stdout, _ = ffmpeg.run(stream_output, capture_stdout=True)
-    print(bytes_stdout.decode("utf-8", errors="ignore"))
-
-
-def extract_scene(file_input: Path, *, scene: str = SCENE_DEFAULT) -> str:
-    stream_input: FilterableStream = ffmpeg.input(file_input)
-    stream_filter_1: FilterableStream = ffmpeg.filter(stream_input, "select", f"gt(scene,{scene})")
-    stream_filter_2: FilterableStream = ffmpeg.filter(stream_filter_1, "scale", width=640, height=360)
-    # To output the frame number and timestamp
-    stream_filter_3: FilterableStream = ffmpeg.filter(stream_filter_2, "showinfo")
-    # vsync="vfr": To prevent duplicate frames in same timestamp
-    stream_output: OutputStream = ffmpeg.output(stream_filter_3, "output/%06d.jpg", vsync="vfr", hide_banner=None)
-    bytes_stdout, bytes_stderr = ffmpeg.run(stream_output, capture_stdout=True, capture_stderr=True)
-    print(bytes_stdout.decode("utf-8", errors="ignore"))
-    return bytes_stderr.decode("utf-8", errors="ignore")
+    parser.add_argument(
+        "--mode",
+        choices=[MODE_FULL, MODE_KEY, MODE_STEP],
+        default=MODE_FULL,
+        help=(
+            "full: decode all frames, "
+            "key: decode only key frames at first, "
+            "step: score only every Nth frame at first, "
+            "then refine only where the scene changes."
+        ),
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Split the video into chunks at key frames and analyze them at the same time in full mode.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of processes in parallel, the number of CPUs in default.",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Store scores of all frames in the cache once, then detect by any threshold without decoding again.",
+    )
+    parser.add_argument(
+        "--tune",
+        type=float,
+        nargs="+",
+        metavar="THRESHOLD",
+        help="Print the number of scenes for each threshold by the index, then exit.",
+    )
+    parser.add_argument("--step", type=int, default=STEP_DEFAULT, help="N of the step mode.")
+    parser.add_argument("--lowres", type=int, default=LOWRES, help="Decode in 1/2^N size in key and step mode.")
+    parser.add_argument(
+        "--log",
+        type=Path,
+        default=None,
+        help="Write the raw stderr of FFmpeg into the file in full mode, for example, output/std_err.txt.",
+    )
+    parser.add_argument(
+        "--thumbnails",
+        action="store_true",
+        help="Write the first frame of each scene into output/%%06d.jpg to select scenes by deleting images.",
+    )
+    return parser.parse_args()
 
 
-def getEndTime(stderr: str) -> str:
-    date_pattern = re.compile(r"Duration\:\s(\d{2}:\d{2}:\d{2}(?:\.\d{1,3})?)")
-    timestamp: str = re.findall(date_pattern, stderr)[0]
-    splits = timestamp.split(".")
-    digits = splits[0].split(":")
-    seconds = int(digits[0]) * 3600 + int(digits[1]) * 60 + int(digits[2])
-    return f"{seconds}.{splits[1]}"
+def print_progress(progress: Progress) -> None:
+    percent = progress.percent
+    text = f"{progress.seconds:.1f}s" if percent is None else f"{percent:5.1f}%"
+    print(f"\r{text}", end="", file=sys.stderr, flush=True)
 
 
-def getTimes(stderr: str) -> list[str]:
-    pattern = r"pts_time:(\d+\.\d+)"  # pts_timeの数値を抽出する
-    return re.findall(pattern, stderr)
+def detect(arguments: argparse.Namespace) -> Scenes:
+    if arguments.index:
+        return SceneScoreIndex.load_or_build(arguments.file_input, max_workers=arguments.workers).to_scenes(
+            arguments.threshold,
+        )
+    if arguments.mode == MODE_FULL and arguments.parallel:
+        return detect_scenes_parallel(
+            arguments.file_input,
+            threshold=arguments.threshold,
+            max_workers=arguments.workers,
+        )
+    if arguments.mode == MODE_FULL:
+        scenes = detect_scenes(
+            arguments.file_input,
+            threshold=arguments.threshold,
+            callback_progress=print_progress,
+            file_log=arguments.log,
+        )
+        print(file=sys.stderr)
+        return scenes
+    return detect_scenes_fast(
+        arguments.file_input,
+        threshold=arguments.threshold,
+        step=arguments.step if arguments.mode == MODE_STEP else None,
+        lowres=arguments.lowres,
+    )
 
 
 if __name__ == "__main__":
-    file_input = Path(sys.argv[1])
-    scene = sys.argv[2] if len(sys.argv) >= 3 else SCENE_DEFAULT
-    extract_first_scene(file_input)
-    stderr = extract_scene(file_input, scene=scene)
-    Path("output/std_err.txt").write_text(stderr, encoding="utf-8")
-    print(stderr)
-    list_time = ["0"]
-    list_time.extend(getTimes(stderr))
-    list_time.append(getEndTime(stderr))
+    basicConfig(level=INFO)
+    arguments = parse_arguments()
+    if arguments.tune:
+        index = SceneScoreIndex.load_or_build(arguments.file_input, max_workers=arguments.workers)
+        for threshold, count in zip(arguments.tune, index.count_scenes(arguments.tune), strict=True):
+            print(f"{threshold}: {count} scenes")
+        sys.exit(0)
+    scenes = detect(arguments)
+    list_time = scenes.to_list_time()
     print(list_time)
-    file_times = Path("output/times.json")
-    file_times.write_text(json.dumps(list_time), encoding="utf-8")
-    json.loads(file_times.read_text(encoding="utf-8"))
+    DIRECTORY_OUTPUT.mkdir(exist_ok=True)
+    scenes.save(DIRECTORY_OUTPUT / "times.json")
+    if arguments.thumbnails:
+        write_thumbnails(arguments.file_input, scenes, DIRECTORY_OUTPUT)
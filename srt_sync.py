@@ -1,17 +1,31 @@
-from collections.abc import Callable
-from contextlib import suppress
+"""Cut subtitles in the same way as the cut edit in AviUtl.
+
+The cut is applied in memory according to the delete list exported by AviUtl (del_import.auf),
+so neither SrtSync.exe nor any temporary file is required.
+"""
+
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
+from fractions import Fraction
 from logging import getLogger
 from pathlib import Path
-import shutil
-
-# Reason: Using subprocess is necessary to call SrtSync.exe.
-import subprocess  # nosec: B404
+import re
 import sys
-import textwrap
+from typing import TextIO
+
+import numpy as np
+import numpy.typing as npt
 
 logger = getLogger(__name__)
 
+# The frame rate of the broadcasted video in Japan.
+FRAME_RATE_DEFAULT = Fraction(30000, 1001)
+MILLISECONDS_PER_SECOND = 1000
+# Signed 64 bit integer.
+TYPECODE_TIME = "q"
+
 
 class Error(Exception):
     """Base class for exceptions in this module.
@@ -24,14 +38,147 @@ class SrtSyncError(Error):
     """SrtSync failed."""
 
 
-@dataclass
+@dataclass(slots=True)
 class Sub:
     index: int
-    time: str
+    # Start and end time in milliseconds.
+    start: int
+    end: int
     text: str
 
+    @property
+    def time(self) -> str:
+        return f"{format_time(self.start)} --> {format_time(self.end)}\n"
+
+
+class Subs:
+    """Subtitle track stored in columns.
+
+    The start and end time are stored as integer arrays in milliseconds,
+    and texts are stored in one contiguous buffer sliced by offsets.
+    Operations for the time apply to the whole track at once through NumPy views of the arrays.
+    """
+
+    __slots__ = ("starts", "ends", "buffer", "offsets")
+
+    def __init__(self, starts: "array[int]", ends: "array[int]", buffer: str, offsets: "array[int]") -> None:
+        self.starts = starts
+        self.ends = ends
+        self.buffer = buffer
+        # The text of i-th subtitle is `buffer[offsets[i]:offsets[i + 1]]`.
+        self.offsets = offsets
+
+    @classmethod
+    def create(cls, subs: Iterable[tuple[int, int, str]]) -> "Subs":
+        starts = array(TYPECODE_TIME)
+        ends = array(TYPECODE_TIME)
+        offsets = array(TYPECODE_TIME, [0])
+        texts = []
+        for start, end, text in subs:
+            starts.append(start)
+            ends.append(end)
+            text_terminated = text if text.endswith("\n") else f"{text}\n"
+            texts.append(text_terminated)
+            offsets.append(offsets[-1] + len(text_terminated))
+        return cls(starts, ends, "".join(texts), offsets)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, position: int) -> Sub:
+        if position < 0:
+            position += len(self)
+        return Sub(position + 1, self.starts[position], self.ends[position], self.text(position))
+
+    def __iter__(self) -> Iterator[Sub]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def text(self, position: int) -> str:
+        return self.buffer[self.offsets[position] : self.offsets[position + 1]]
+
+    def shift(self, millisecond: int) -> None:
+        for times in (view(self.starts), view(self.ends)):
+            np.add(times, millisecond, out=times)
+
+    def scale(self, factor: float | Fraction) -> None:
+        """Scale time, for example, to convert between 25 fps and 23.976 fps."""
+        for times in (view(self.starts), view(self.ends)):
+            times[:] = multiply_round(times, factor)
+
+    def clip(self, start: int, end: int) -> "Subs":
+        """Keep only the subtitles displayed between start and end, and trim them into the period."""
+        return self.take(np.maximum(view(self.starts), start), np.minimum(view(self.ends), end))
+
+    def select(self, times: Iterable[tuple[int, int]]) -> "Subs":
+        """Create new track that has given time, subtitles whose period becomes empty are removed."""
+        array_times = np.array(list(times), dtype=np.int64).reshape(-1, 2)
+        return self.take(array_times[:, 0], array_times[:, 1])
+
+    def take(self, starts: npt.NDArray[np.int64], ends: npt.NDArray[np.int64]) -> "Subs":
+        """Create new track that has given time of each subtitle, see `select()`."""
+        positions = np.flatnonzero(ends > starts)
+        lengths = np.diff(view(self.offsets))[positions]
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        if positions.size == len(self):
+            buffer = self.buffer
+        else:
+            buffer = "".join(self.text(position) for position in positions.tolist())
+        return Subs(to_array(starts[positions]), to_array(ends[positions]), buffer, to_array(offsets))
+
+    def write(self, file: TextIO) -> None:
+        for position, (start, end) in enumerate(zip(self.starts, self.ends, strict=True)):
+            file.write(f"{position + 1}\n{format_time(start)} --> {format_time(end)}\n")
+            file.write(self.text(position))
+            file.write("\n")
+
+
+def view(times: "array[int]") -> npt.NDArray[np.int64]:
+    """View of the array without copying, updated in place as long as the array isn't resized."""
+    viewed: npt.NDArray[np.int64] = np.frombuffer(times, dtype=np.int64)
+    return viewed
+
+
+def to_array(times: npt.NDArray[np.int64]) -> "array[int]":
+    return array(TYPECODE_TIME, times.astype(np.int64).tobytes())
+
+
+def multiply_round(times: npt.NDArray[np.int64], factor: float | Fraction) -> npt.NDArray[np.int64]:
+    """Multiply and round half to even in the same way as `round(time * factor)`."""
+    rounded: npt.NDArray[np.int64]
+    if isinstance(factor, float):
+        rounded = np.rint(times * factor).astype(np.int64)
+        return rounded
+    # Calculated in integers since the float of the rational factor may round the tie to the other side.
+    numerator, denominator = factor.as_integer_ratio()
+    quotients, remainders = np.divmod(times * numerator, denominator)
+    is_up = (2 * remainders > denominator) | ((2 * remainders == denominator) & (quotients % 2 == 1))
+    rounded = quotients + is_up
+    return rounded
 
-Subs = dict[int, Sub]
+
+PATTERN_TIME = re.compile(r"(\d+):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})")
+
+
+def parse_time(line: str) -> tuple[int, int]:
+    """Parse the time line of SubRip into start and end time in milliseconds."""
+    match = PATTERN_TIME.search(line)
+    if match is None:
+        msg = f"Invalid time line: {line!r}"
+        raise SrtSyncError(msg)
+    hour_start, minute_start, second_start, millisecond_start, hour_end, minute_end, second_end, millisecond_end = (
+        int(group) for group in match.groups()
+    )
+    start = ((hour_start * 60 + minute_start) * 60 + second_start) * MILLISECONDS_PER_SECOND + millisecond_start
+    end = ((hour_end * 60 + minute_end) * 60 + second_end) * MILLISECONDS_PER_SECOND + millisecond_end
+    return start, end
+
+
+def format_time(millisecond: int) -> str:
+    second, millisecond = divmod(millisecond, MILLISECONDS_PER_SECOND)
+    minute, second = divmod(second, 60)
+    hour, minute = divmod(minute, 60)
+    return f"{hour:02}:{minute:02}:{second:02},{millisecond:03}"
 
 
 def clear_file(file: str) -> Path:
@@ -42,85 +189,114 @@ def clear_file(file: str) -> Path:
 
 
 def load(file_sub: Path) -> Subs:
-    subs = {}
-    with suppress(StopIteration), file_sub.open(encoding="utf-8") as file:
-        while True:
-            line = next(file).strip()
-            if not line.isdigit():
-                continue
-            index = int(line)
-            subs[index] = Sub(index, next(file), next(file))
-    return subs
+    """Load SubRip file.
+
+    The text may have multiple lines, it continues until the blank line.
+    """
+    # The BOM is added in case when the file is saved by Notepad in Windows.
+    with file_sub.open(encoding="utf-8-sig") as file:
+        return Subs.create(parse_block(block) for block in iterate_block(file))
 
 
-def save(file_path: Path, subs: Subs, what_write_to_text: Callable[[Sub], str]) -> None:
+def parse_block(block: list[str]) -> tuple[int, int, str]:
+    start, end = parse_time(block[1])
+    return start, end, "".join(block[2:])
+
+
+def iterate_block(lines: Iterable[str]) -> Iterator[list[str]]:
+    block: list[str] = []
+    for line in lines:
+        if line.strip():
+            block.append(line)
+            continue
+        if block:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def save(file_path: Path, subs: Subs) -> None:
     with file_path.open("w", encoding="utf-8") as file:
-        for sub in subs.values():
-            file.write(str(sub.index) + "\n")
-            file.write(sub.time)
-            file.write(what_write_to_text(sub))
-            file.write("\n")
+        subs.write(file)
 
 
-class SrtSync:
-    EXECUTABLE = "SrtSync"
-
-    def __init__(self, file_input: Path) -> None:
-        self.input = file_input
-        self.output = clear_file(f"{self.input.stem}_new.srt")
-        if not shutil.which(self.EXECUTABLE):
-            msg = textwrap.dedent(
-                """\
-                SrtSync not found.
-                Put SrtSync.exe into either of PATH in Windows (or same folder with this Python code).
-                If you don't have SrtSync.exe, download it from:
-                http://www2.wazoku.net/2sen/
-            """,
-            )
-            raise SrtSyncError(msg)
-
-    def cut(self, remove_list: Path) -> Path:
-        # Reason: Confirmed that command isn't so risky.
-        process = subprocess.Popen(  # noqa: S603  # nosec: B603
-            [self.EXECUTABLE, "-aviutldl", remove_list, self.input],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        while process.poll() is None:
-            # Reason: The condition `process.poll() is None` guarantees that `process.stdout` is not None.
-            line: str = process.stdout.readline()  # type: ignore[union-attr]
-            stripped_line = line.strip()
-            logger.debug(stripped_line)
-            if stripped_line.startswith("続行するには何かキーを押してください"):
-                process.communicate("\r\n")
-        if not self.output.exists():
-            msg = "Failed to cut"
-            raise SrtSyncError(msg)
-        return self.output
+class RemoveList:
+    """Removed periods of the video loaded from the delete list of AviUtl.
 
+    The delete list lists removed frame numbers one by one. Range notation such as `100-200` is also accepted.
+    Lines that don't contain frame number such as header are ignored.
+    """
+
+    PATTERN_FRAME = re.compile(r"^\s*(\d+)(?:\s*[-,\s]\s*(\d+))?\s*$")
+
+    def __init__(self, periods: Iterable[tuple[int, int]]) -> None:
+        # Start and end time in milliseconds of each removed period.
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        # Total length of removed periods before each period.
+        self.removed_befores: list[int] = []
+        removed = 0
+        for start, end in sorted(periods):
+            if self.ends and start <= self.ends[-1]:
+                removed += max(end, self.ends[-1]) - self.ends[-1]
+                self.ends[-1] = max(end, self.ends[-1])
+                continue
+            self.starts.append(start)
+            self.ends.append(end)
+            self.removed_befores.append(removed)
+            removed += end - start
 
-class SrtSyncWrapper:
     @classmethod
-    def process(cls, file_sub_original: Path, remove_list: Path) -> None:
-        file_sub_temporary = cls.replace_text_with_index(file_sub_original)
-        file_sub_cut = SrtSync(file_sub_temporary).cut(remove_list)
-        cls.replace_index_with_text(file_sub_cut, file_sub_original)
+    def load(cls, file: Path, *, frame_rate: Fraction = FRAME_RATE_DEFAULT) -> "RemoveList":
+        with file.open(encoding="utf-8-sig") as text:
+            return cls(cls.to_period(frames, frame_rate) for frames in cls.iterate_frames(text))
 
-    @staticmethod
-    def replace_text_with_index(file_sub_original: Path) -> Path:
-        subs_original = load(file_sub_original)
-        file_sub_temporary = clear_file(f"{file_sub_original.stem}_replaced_by_index.srt")
-        save(file_sub_temporary, subs_original, lambda sub: f"\\{sub.index}\\\n")
-        return file_sub_temporary
+    @classmethod
+    def iterate_frames(cls, lines: Iterable[str]) -> Iterator[tuple[int, int]]:
+        for line in lines:
+            match = cls.PATTERN_FRAME.match(line)
+            if match is None:
+                logger.debug("Skip line: %s", line.rstrip())
+                continue
+            first = int(match.group(1))
+            last = int(match.group(2)) if match.group(2) is not None else first
+            yield first, last
 
     @staticmethod
-    def replace_index_with_text(file_sub_cut: Path, file_sub_original: Path) -> None:
-        file_sub_cut_fixed = clear_file(f"{file_sub_original.stem}_cut.srt")
-        subs_cut = load(file_sub_cut)
-        subs_original = load(file_sub_original)
-        save(file_sub_cut_fixed, subs_cut, lambda sub: subs_original[int(sub.text.replace("\\", ""))].text)
+    def to_period(frames: tuple[int, int], frame_rate: Fraction) -> tuple[int, int]:
+        first, last = frames
+        return to_millisecond(first, frame_rate), to_millisecond(last + 1, frame_rate)
+
+    def map(self, time: int) -> int:
+        """Map the time in original video into the time in cut video.
+
+        The time in removed period is mapped into the time where the period has been removed.
+        """
+        index = bisect_right(self.starts, time) - 1
+        if index < 0:
+            return time
+        if time < self.ends[index]:
+            return self.starts[index] - self.removed_befores[index]
+        return time - self.removed_befores[index] - (self.ends[index] - self.starts[index])
+
+    def cut(self, subs: Subs) -> Subs:
+        """Remove subtitles displayed only in removed periods and shift the rest."""
+        return subs.select((self.map(start), self.map(end)) for start, end in zip(subs.starts, subs.ends, strict=True))
+
+
+def to_millisecond(frame: int, frame_rate: Fraction) -> int:
+    return round(frame * MILLISECONDS_PER_SECOND / frame_rate)
+
+
+class SrtSyncWrapper:
+    @classmethod
+    def process(cls, file_sub_original: Path, remove_list: Path, *, file_sub_cut: Path | None = None) -> Path:
+        if file_sub_cut is None:
+            file_sub_cut = clear_file(f"{file_sub_original.stem}_cut.srt")
+        subs_cut = RemoveList.load(remove_list).cut(load(file_sub_original))
+        save(file_sub_cut, subs_cut)
+        return file_sub_cut
 
 
 if __name__ == "__main__":
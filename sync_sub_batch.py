@@ -0,0 +1,24 @@
+from logging import basicConfig, INFO
+from pathlib import Path
+import sys
+
+import yaml
+
+from transportstreamarchiver.sync_sub import sync_sub_batch, SyncSubJob
+
+if __name__ == "__main__":
+    basicConfig(level=INFO)
+    config = yaml.safe_load(Path("sync_sub.yml").read_text("utf-8"))
+    path = Path(config.get("path", "."))
+    jobs = [
+        SyncSubJob(
+            path / each_job["original"],
+            path / each_job["remove_list"],
+            path / each_job["cut"],
+            path / each_job["synced"],
+        )
+        for each_job in config["jobs"]
+    ]
+    results = sync_sub_batch(jobs, max_workers=config.get("max_workers"))
+    if any(result.error is not None for result in results):
+        sys.exit(1)
@@ -3,8 +3,33 @@
 Execute 'invoke --list' for guidance on using Invoke
 """
 
-from invoke import Collection
+from pathlib import Path
+
+from invoke import Collection, Context, Exit, task
 from invokelint import _clean, dist, lint, path, style, test
+from pytest_benchmark.utils import get_machine_id
+
+# Mean slower than the baseline by this ratio fails the comparison.
+THRESHOLD_REGRESSION = "mean:20%"
+# The default storage of pytest-benchmark.
+DIRECTORY_BENCHMARK = Path(".benchmarks")
+
+
+@task(help={"save": "Save the result as the new baseline.", "compare": "Fail when slower than the last baseline."})
+def benchmark(context: Context, *, save: bool = False, compare: bool = False) -> None:
+    """Run benchmarks on the generated fixtures, the baselines are stored locally in .benchmarks."""
+    options = ["--benchmark-only", "-p", "no:logging"]
+    if save:
+        options.append("--benchmark-autosave")
+    if compare:
+        # pytest-benchmark only warns and passes when there is nothing to compare with.
+        directory_baseline = DIRECTORY_BENCHMARK / get_machine_id()
+        if not any(directory_baseline.glob("*.json")):
+            msg = f"No baseline in {directory_baseline}, save it first by `invoke benchmark --save`"
+            raise Exit(msg, code=1)
+        options.extend(["--benchmark-compare", f"--benchmark-compare-fail={THRESHOLD_REGRESSION}"])
+    context.run(f"pytest tests/test_benchmark.py {' '.join(options)}", pty=True)
+
 
 ns = Collection()
 ns.add_collection(_clean)
@@ -13,3 +38,4 @@ ns.add_collection(lint)
 ns.add_collection(path)
 ns.add_collection(style)
 ns.add_collection(test)
+ns.add_task(benchmark)
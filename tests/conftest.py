@@ -0,0 +1,36 @@
+from pathlib import Path
+import shutil
+
+import pytest
+
+from tests.generator import generate_mpegts, generate_scenes, generate_srt
+from transportstreamarchiver.cache import ENVIRONMENT_VARIABLE_DIRECTORY_CACHE
+
+# Seconds of the MPEG-TS fixture, long enough to contain multiple GOPs in the head and the tail.
+DURATION_FIXTURE = 10.0
+COUNT_SUBTITLE = 2000
+
+
+@pytest.fixture(autouse=True)
+def _directory_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Not to write the caches into the cache directory of the developer."""
+    monkeypatch.setenv(ENVIRONMENT_VARIABLE_DIRECTORY_CACHE, str(tmp_path / "cache"))
+
+
+@pytest.fixture(scope="session")
+def file_mpegts(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("FFmpeg is not installed")
+    return generate_mpegts(tmp_path_factory.mktemp("fixture") / "input.ts", duration=DURATION_FIXTURE)
+
+
+@pytest.fixture(scope="session")
+def file_scenes(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("FFmpeg is not installed")
+    return generate_scenes(tmp_path_factory.mktemp("fixture") / "scenes.ts")
+
+
+@pytest.fixture(scope="session")
+def file_srt(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    return generate_srt(tmp_path_factory.mktemp("fixture") / "input.srt", count=COUNT_SUBTITLE)
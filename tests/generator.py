@@ -0,0 +1,152 @@
+"""Generator of copyright free fixtures that look like broadcast recordings.
+
+The MPEG-TS has two programs, MPEG-2 video in 15-frame GOPs, AAC audio, a private data stream,
+and a subtitle stream in private PES like ARIB caption, and the PTS starts from far from zero.
+The scenes are MPEG-TS of the video whose source changes at the same interval.
+"""
+
+from pathlib import Path
+
+# Reason: Using subprocess is necessary to call FFmpeg.
+import subprocess  # nosec: B404
+
+FRAME_RATE = "30000/1001"
+SIZE_GOP = 15
+# Seconds of the start of PTS, broadcast recordings rarely start from zero.
+OFFSET_PTS = 1000
+SIZE_DATA = 4096
+# Sources of the scenes, the scene changes between the sources with various scores.
+SOURCES_SCENE = ["testsrc", "testsrc2", "smptebars", "color=c=red", "rgbtestsrc"]
+
+
+def generate_mpegts(file: Path, *, duration: float = 10.0) -> Path:
+    """Generate MPEG-TS.
+
+    Streams:
+        0: video of the program 1024, 1: audio of the program 1024,
+        2: subtitle of the program 1024, 3: data of the program 1024,
+        4: video of the program 1025, 5: audio of the program 1025.
+    """
+    file_srt = generate_srt(file.with_suffix(".srt"), count=int(duration))
+    file_data = file.with_suffix(".bin")
+    file_data.write_bytes(bytes(index % 256 for index in range(SIZE_DATA)))
+    command = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-y",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc=size=320x180:rate={FRAME_RATE}",
+        "-f",
+        "lavfi",
+        "-i",
+        "sine=frequency=440:sample_rate=48000",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc2=size=320x180:rate={FRAME_RATE}",
+        "-f",
+        "lavfi",
+        "-i",
+        "sine=frequency=880:sample_rate=48000",
+        "-i",
+        str(file_srt),
+        "-f",
+        "data",
+        "-i",
+        str(file_data),
+        "-t",
+        str(duration),
+        "-map",
+        "0:v",
+        "-map",
+        "1:a",
+        "-map",
+        "4:s",
+        "-map",
+        "5:d",
+        "-map",
+        "2:v",
+        "-map",
+        "3:a",
+        "-c:v",
+        "mpeg2video",
+        "-g",
+        str(SIZE_GOP),
+        "-bf",
+        "2",
+        "-c:a",
+        "aac",
+        # Copied into private PES since FFmpeg can't encode ARIB caption.
+        "-c:s",
+        "copy",
+        "-c:d",
+        "copy",
+        "-program",
+        "program_num=1024:title=Program1:st=0:st=1:st=2:st=3",
+        "-program",
+        "program_num=1025:title=Program2:st=4:st=5",
+        "-metadata",
+        "service_provider=Provider",
+        "-metadata",
+        "service_name=Service",
+        "-output_ts_offset",
+        str(OFFSET_PTS),
+        "-f",
+        "mpegts",
+        str(file),
+    ]
+    # Reason: Confirmed that command isn't so risky.
+    subprocess.run(command, check=True)  # noqa: S603  # nosec: B603
+    return file
+
+
+def generate_scenes(file: Path, *, seconds_scene: float = 2.0) -> Path:
+    """Generate MPEG-TS of the video that changes the scene every seconds_scene seconds."""
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+    for source in SOURCES_SCENE:
+        separator = ":" if "=" in source else "="
+        source_sized = f"{source}{separator}size=320x180:rate={FRAME_RATE}:duration={seconds_scene}"
+        command.extend(["-f", "lavfi", "-i", source_sized])
+    inputs = "".join(f"[{index}]" for index in range(len(SOURCES_SCENE)))
+    command.extend(
+        [
+            "-filter_complex",
+            f"{inputs}concat=n={len(SOURCES_SCENE)},format=yuv420p",
+            "-c:v",
+            "mpeg2video",
+            "-q:v",
+            "2",
+            "-g",
+            str(SIZE_GOP),
+            "-bf",
+            "2",
+            "-f",
+            "mpegts",
+            str(file),
+        ],
+    )
+    # Reason: Confirmed that command isn't so risky.
+    subprocess.run(command, check=True)  # noqa: S603  # nosec: B603
+    return file
+
+
+def generate_srt(file: Path, *, count: int) -> Path:
+    """Generate SubRip with a caption per second, some captions have multiple lines."""
+    blocks = []
+    for index in range(count):
+        text = f"字幕 {index}" if index % 3 else f"字幕 {index}\n二行目"
+        time_range = f"{format_time(index * 1000 + 100)} --> {format_time(index * 1000 + 900)}"
+        blocks.append(f"{index + 1}\n{time_range}\n{text}\n")
+    file.write_text("\n".join(blocks), encoding="utf-8")
+    return file
+
+
+def format_time(millisecond: int) -> str:
+    second, millisecond = divmod(millisecond, 1000)
+    minute, second = divmod(second, 60)
+    hour, minute = divmod(minute, 60)
+    return f"{hour:02}:{minute:02}:{second:02},{millisecond:03}"
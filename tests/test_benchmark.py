@@ -0,0 +1,135 @@
+"""Benchmarks of the hot paths on the generated fixtures.
+
+Save the baseline by `invoke benchmark --save` and compare with it by `invoke benchmark --compare`.
+"""
+
+from datetime import timedelta
+from fractions import Fraction
+from pathlib import Path
+import shutil
+from typing import Optional, TYPE_CHECKING
+
+import pytest
+
+from cut_scene import Frames, SeekRange
+from srt_sync import load, save, Subs
+from tests.generator import OFFSET_PTS
+from transportstreamarchiver.cache import get_directory_cache
+from transportstreamarchiver.ffmpeg.edit import cut
+from transportstreamarchiver.ffmpeg.seek_range import SeekRange as FFmpegSeekRange
+from transportstreamarchiver.ffprobe.key_frame import create_list_key_frame
+from transportstreamarchiver.ffprobe.metadata import find_difference, get_metadata
+from transportstreamarchiver.ffprobe.packet_index import PacketIndex
+from transportstreamarchiver.ffprobe.session import ProbeSession
+from transportstreamarchiver.offset import OffsetChecker
+
+if TYPE_CHECKING:
+    from pytest_benchmark.fixture import BenchmarkFixture
+
+pytest.importorskip("pytest_benchmark")
+
+pytestmark = pytest.mark.slow
+requires_ffprobe = pytest.mark.skipif(shutil.which("ffprobe") is None, reason="FFprobe is not installed")
+COUNT_SEEK_RANGE = 1000
+# 25 fps into 24.975 fps.
+FACTOR_SCALE = Fraction(25025, 25000)
+
+
+def clear_packet_index() -> None:
+    """To scan packets in each round instead of loading the index built in the previous round."""
+    PacketIndex.memo.clear()
+    shutil.rmtree(get_directory_cache() / "packet_index", ignore_errors=True)
+
+
+def test_offset(benchmark: "BenchmarkFixture", file_mpegts: Path) -> None:
+    offset = benchmark(lambda: OffsetChecker(file_mpegts).get_offset())
+    assert timedelta(0) <= offset < timedelta(seconds=1)
+
+
+def test_create_list_key_frame(benchmark: "BenchmarkFixture", file_mpegts: Path) -> None:
+    list_key_frame = benchmark.pedantic(  # type: ignore[no-untyped-call]
+        lambda: create_list_key_frame(file_mpegts),
+        setup=clear_packet_index,
+        rounds=10,
+    )
+    assert float(list_key_frame[0]) >= OFFSET_PTS
+
+
+def test_frames_search(benchmark: "BenchmarkFixture", file_mpegts: Path) -> None:
+    frames = Frames(file_mpegts)
+    start = float(frames.key_frames.pts_time[0])
+    end = float(frames.key_frames.pts_time[-1])
+    step = (end - start) / COUNT_SEEK_RANGE
+    seek_ranges = [
+        SeekRange(f"{start + step * index:.6f}", f"{start + step * (index + 1):.6f}")
+        for index in range(COUNT_SEEK_RANGE)
+    ]
+    result = benchmark(lambda: list(frames.search_outside_neighbor_frame(seek_ranges)))
+    assert len(result) == COUNT_SEEK_RANGE
+
+
+@requires_ffprobe
+def test_cut(benchmark: "BenchmarkFixture", file_mpegts: Path, tmp_path: Path) -> None:
+    file_output = tmp_path / "output.ts"
+    seek_range = FFmpegSeekRange(timedelta(0), string_from="00:00:02.000", string_to="00:00:06.000")
+    benchmark.pedantic(lambda: cut(file_mpegts, seek_range, file_output), rounds=3)  # type: ignore[no-untyped-call]
+    assert file_output.exists()
+
+
+@requires_ffprobe
+def test_is_preserving_metadata(benchmark: "BenchmarkFixture", file_mpegts: Path, tmp_path: Path) -> None:
+    file_output = tmp_path / "output.ts"
+    cut(file_mpegts, FFmpegSeekRange(timedelta(0), string_from="00:00:02.000"), file_output)
+
+    def verify() -> Optional[str]:
+        # A new session in each round to probe instead of reusing the results.
+        session = ProbeSession()
+        return find_difference(get_metadata(file_mpegts, session=session), get_metadata(file_output, session=session))
+
+    # The generated fixture doesn't have the layout of streams of the broadcast that find_difference() expects,
+    # so this measures the time of probing and comparing regardless of the result.
+    benchmark(verify)
+
+
+def test_srt_sync_load(benchmark: "BenchmarkFixture", file_srt: Path) -> None:
+    subs = benchmark(load, file_srt)
+    assert len(subs.starts) > 0
+
+
+def test_srt_sync_save(benchmark: "BenchmarkFixture", file_srt: Path, tmp_path: Path) -> None:
+    subs = load(file_srt)
+    file_output = tmp_path / "output.srt"
+    benchmark(save, file_output, subs)
+    assert load(file_output).starts == subs.starts
+
+
+def test_srt_sync_shift(benchmark: "BenchmarkFixture", file_srt: Path) -> None:
+    subs = load(file_srt)
+    start = subs.starts[0]
+
+    def shift() -> None:
+        # Forward and back in each round to keep the time.
+        subs.shift(1000)
+        subs.shift(-1000)
+
+    benchmark(shift)
+    assert subs.starts[0] == start
+
+
+def test_srt_sync_scale(benchmark: "BenchmarkFixture", file_srt: Path) -> None:
+    def setup() -> tuple[tuple[Subs], dict[str, object]]:
+        return (load(file_srt),), {}
+
+    benchmark.pedantic(  # type: ignore[no-untyped-call]
+        lambda subs: subs.scale(FACTOR_SCALE),
+        setup=setup,
+        rounds=100,
+    )
+
+
+def test_srt_sync_clip(benchmark: "BenchmarkFixture", file_srt: Path) -> None:
+    subs = load(file_srt)
+    start = subs.starts[len(subs) // 4]
+    end = subs.ends[len(subs) * 3 // 4]
+    clipped = benchmark(subs.clip, start, end)
+    assert len(clipped) == len(subs) // 2 + 1
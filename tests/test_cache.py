@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from transportstreamarchiver.cache import ENVIRONMENT_VARIABLE_DIRECTORY_CACHE, JsonCache
+
+MAX_SIZE = 2
+NUMBER_QUERIES = 64
+VALUE = 123
+
+
+def test_json_cache(tmp_path: Path) -> None:
+    file = tmp_path / "input.ts"
+    file.write_bytes(b"\x47" * 188)
+    JsonCache("test", directory=tmp_path).set(file, VALUE)
+    # Other process reads from the file.
+    assert JsonCache("test", directory=tmp_path).get(file) == VALUE
+    file.write_bytes(b"\x47" * 376)
+    assert JsonCache("test", directory=tmp_path).get(file) is None
+
+
+def test_json_cache_bounded(tmp_path: Path) -> None:
+    files = [tmp_path / f"{index}.ts" for index in range(4)]
+    cache = JsonCache("test", directory=tmp_path, max_size=MAX_SIZE)
+    for index, file in enumerate(files[:3]):
+        file.write_bytes(b"\x47" * 188 * (index + 1))
+        cache.set(file, index)
+    # The oldest entry is evicted.
+    assert len(list((tmp_path / "test").iterdir())) == MAX_SIZE
+    assert JsonCache("test", directory=tmp_path).get(files[0]) is None
+    # Updated entry becomes the newest.
+    cache.set(files[1], 1)
+    files[3].write_bytes(b"\x47" * 188 * 4)
+    cache.set(files[3], 3)
+    assert [JsonCache("test", directory=tmp_path).get(file) for file in files] == [None, 1, None, 3]
+
+
+def test_json_cache_directory_resolved_lazily(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file = tmp_path / "input.ts"
+    file.write_bytes(b"\x47" * 188)
+    # Created before the environment variable is set, like the class attribute at import time.
+    cache = JsonCache("test")
+    monkeypatch.setenv(ENVIRONMENT_VARIABLE_DIRECTORY_CACHE, str(tmp_path / "first"))
+    cache.set(file, VALUE)
+    assert len(list((tmp_path / "first" / "test").iterdir())) == 1
+    monkeypatch.setenv(ENVIRONMENT_VARIABLE_DIRECTORY_CACHE, str(tmp_path / "second"))
+    assert cache.get(file) is None
+
+
+def test_json_cache_update_concurrently(tmp_path: Path) -> None:
+    file = tmp_path / "input.ts"
+    file.write_bytes(b"\x47" * 188)
+    cache = JsonCache("test", directory=tmp_path)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for index in range(NUMBER_QUERIES):
+            executor.submit(cache.update, file, {str(index): index})
+    # No update is lost, and the other entries are not read nor written.
+    assert JsonCache("test", directory=tmp_path).get(file) == {str(index): index for index in range(NUMBER_QUERIES)}
+    assert len(list((tmp_path / "test").iterdir())) == 1
@@ -0,0 +1,65 @@
+from typing import Any
+
+from transportstreamarchiver.ffprobe.comparator import Schema
+from transportstreamarchiver.ffprobe.metadata import find_difference
+
+
+def create_metadata() -> dict[str, Any]:
+    return {
+        "programs": [
+            {
+                "program_id": 1024,
+                "pcr_pid": 256,
+                "tags": {"service_name": "Channel", "service_provider": "Provider"},
+                "streams": [{"index": 0, "codec_name": "mpeg2video", "start_time": "1.400000"}],
+            },
+            {"program_id": 1025, "streams": []},
+        ],
+        "streams": [
+            {"index": 0, "codec_name": "mpeg2video", "codec_type": "video", "tags": {}},
+            {"index": 1, "codec_name": "aac", "codec_type": "audio", "tags": {"language": "jpn"}},
+        ],
+        "format": {"tags": {"service_name": "Channel"}},
+    }
+
+
+def test_flatten() -> None:
+    schema = Schema(["streams.*.index", "programs.1"])
+    leaves = dict(schema.flatten(create_metadata()))
+    assert ("streams", 0, "index") not in leaves
+    assert not any(path[:2] == ("programs", 1) for path in leaves)
+    assert leaves[("streams", 1, "tags", "language")] == "jpn"
+    # Empty containers are regarded as leaves.
+    assert leaves[("streams", 0, "tags")] == {}
+
+
+def test_compare() -> None:
+    schema = Schema(["streams.*.index"])
+    metadata_old = create_metadata()
+    metadata_new = create_metadata()
+    metadata_new["streams"][1]["index"] = 5
+    assert not schema.compare(metadata_old, metadata_new)
+    metadata_new["streams"][1]["tags"]["language"] = "eng"
+    del metadata_new["format"]
+    difference = schema.compare(metadata_old, metadata_new)
+    assert difference.changed == {("streams", 1, "tags", "language"): ("jpn", "eng")}
+    assert difference.removed == {("format", "tags", "service_name"): "Channel"}
+    assert not difference.added
+    assert "root['streams'][1]['tags']['language']" in difference.to_dict()["values_changed"]
+
+
+def test_find_difference() -> None:
+    metadata_input = create_metadata()
+    metadata_output = create_metadata()
+    # FFmpeg moves the first stream to the last, and changes the items that are changed by cut.
+    metadata_output["streams"].append(metadata_output["streams"].pop(0))
+    metadata_output["streams"][0]["index"] = 0
+    metadata_output["programs"][0]["pcr_pid"] = 4096
+    metadata_output["programs"][0]["streams"][0]["start_time"] = "0.000000"
+    metadata_output["programs"][0]["tags"]["service_provider"] = ""
+    metadata_output["programs"].pop(1)
+    assert find_difference(metadata_input, metadata_output) is None
+    metadata_output["format"]["tags"]["service_name"] = "Other"
+    message = find_difference(metadata_input, metadata_output)
+    assert message is not None
+    assert "Metadata is not preserved." in message
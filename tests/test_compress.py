@@ -0,0 +1,180 @@
+from datetime import timedelta
+from pathlib import Path
+import shutil
+
+# Reason: Using subprocess is necessary to call FFmpeg.
+import subprocess  # nosec: B404
+from typing import Optional
+
+import ffmpeg as ffmpeg_python
+import numpy as np
+import pytest
+
+from transportstreamarchiver.compress import ChunkedOptions, compress, compress_chunked, cut_compress, plan_chunks
+from transportstreamarchiver import ffmpeg
+from transportstreamarchiver.cut import cut
+from transportstreamarchiver.ffmpeg.exceptions import FFmpegProcessError
+from transportstreamarchiver.ffmpeg.seek_range.factory import SeekRangeFactory
+from transportstreamarchiver.ffprobe.comparator import Schema
+from transportstreamarchiver.ffprobe.duration import probe_duration
+from transportstreamarchiver.ffprobe.key_frame_index import KeyFrameIndex
+from transportstreamarchiver.ffprobe.metadata import probe_metadata
+from transportstreamarchiver.scene import score_frames
+
+FRAME_RATE = 25
+SAMPLE_RATE = 48000
+# The first frame of the second chunk.
+SECONDS_FLASH = 2.0
+# Amplitude of the beep, the silence is zero.
+THRESHOLD_BEEP = 0.5
+# The timestamps and the size may differ between the encoders fed from the pipe and from the file.
+SCHEMA_ENCODED = Schema(
+    [
+        "streams.*.start_pts",
+        "streams.*.start_time",
+        "streams.*.duration_ts",
+        "streams.*.duration",
+        "streams.*.bit_rate",
+        "streams.*.nb_frames",
+    ],
+)
+# Tolerance of the duration, a few frames of the fixture.
+SECONDS_TOLERANCE_DURATION = 0.1
+
+
+def has_libx265() -> bool:
+    if shutil.which("ffmpeg") is None:
+        return False
+    # Reason: Confirmed that command isn't so risky.
+    encoders = subprocess.run(  # noqa: S603  # nosec: B603
+        ["ffmpeg", "-hide_banner", "-encoders"],  # noqa: S607
+        capture_output=True,
+        check=False,
+    ).stdout
+    return b"libx265" in encoders
+
+
+def test_plan_chunks() -> None:
+    key_frames = np.arange(0.0, 20.0, 0.5) + 0.1
+    chunks = plan_chunks(key_frames, timedelta(seconds=1), timedelta(seconds=12), 4)
+    assert chunks == [
+        (timedelta(seconds=1), timedelta(seconds=5.1)),
+        (timedelta(seconds=5.1), timedelta(seconds=9.1)),
+        (timedelta(seconds=9.1), timedelta(seconds=12)),
+    ]
+    # The rest of the file is the last chunk when the end isn't specified.
+    assert plan_chunks(key_frames, timedelta(0), None, 100) == [(timedelta(0), None)]
+
+
+def test_compress_chunked_resume(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file_input = tmp_path / "input.ts"
+    file_input.write_bytes(b"\x00" * 188)
+    file_output = tmp_path / "output.mp4"
+    list_start = []
+    is_failing = True
+
+    def fake_encode_video(
+        _file_input: Path,
+        start: timedelta,
+        _end: Optional[timedelta],
+        file_output: Path,
+        **_kwargs: int,
+    ) -> None:
+        list_start.append(start)
+        if is_failing and start == timedelta(seconds=4):
+            msg = "Failed to encode"
+            raise FFmpegProcessError(msg)
+        file_output.touch()
+
+    monkeypatch.setattr(SeekRangeFactory, "get_delta_offset", lambda _: timedelta(0))
+    monkeypatch.setattr(KeyFrameIndex, "create", lambda _: KeyFrameIndex(np.arange(100.0, 110.0, 0.5)))
+    monkeypatch.setattr(ffmpeg, "encode_video", fake_encode_video)
+    monkeypatch.setattr(ffmpeg, "concat_video", lambda *_args: file_output.touch())
+    with pytest.raises(FFmpegProcessError):
+        compress_chunked(file_input, file_output, options=ChunkedOptions(seconds_chunk=2, max_workers=1))
+    directory = file_output.with_name("output.mp4.chunks")
+    names = sorted(path.name for path in directory.glob("chunk-*.mkv"))
+    # The chunk queued before the failure may be encoded.
+    assert names[:2] == ["chunk-00000.mkv", "chunk-00001.mkv"]
+    assert "chunk-00002.mkv" not in names
+    is_failing = False
+    list_start.clear()
+    compress_chunked(file_input, file_output, options=ChunkedOptions(seconds_chunk=2, max_workers=1))
+    # Only the rest of chunks are encoded.
+    assert list_start[0] == timedelta(seconds=4)
+    assert timedelta(0) not in list_start
+    assert timedelta(seconds=2) not in list_start
+    assert file_output.exists()
+    assert not directory.exists()
+
+
+def generate_flash_and_beep(file: Path, duration: float) -> Path:
+    """Video and audio which flash and beep at the same time, key frame every second."""
+    enable = f"between(t,{SECONDS_FLASH},{SECONDS_FLASH + 0.2})"
+    stream_video = ffmpeg_python.input(
+        f"color=c=black:size=160x120:rate={FRAME_RATE}:duration={duration}",
+        f="lavfi",
+    ).drawbox(0, 0, "iw", "ih", color="white", thickness="fill", enable=enable)
+    stream_audio = ffmpeg_python.input(
+        f"aevalsrc='if({enable},sin(2*PI*1000*t),0)':sample_rate={SAMPLE_RATE}:duration={duration}",
+        f="lavfi",
+    )
+    ffmpeg_python.output(
+        stream_video,
+        stream_audio,
+        str(file),
+        vcodec="libx264",
+        g=FRAME_RATE,
+        sc_threshold=0,
+        acodec="aac",
+        loglevel="error",
+    ).run()
+    return file
+
+
+def find_beep(file: Path) -> float:
+    stdout, _ = (
+        ffmpeg_python.input(str(file))
+        .output("pipe:", map="0:a:0", f="f32le", ac=1, ar=SAMPLE_RATE, loglevel="error")
+        .run(capture_stdout=True)
+    )
+    samples = np.frombuffer(stdout, dtype="<f4")
+    return float(np.flatnonzero(np.abs(samples) > THRESHOLD_BEEP)[0]) / SAMPLE_RATE
+
+
+@pytest.mark.skipif(not has_libx265(), reason="FFmpeg with libx265 is not installed")
+def test_compress_chunked_synchronized(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file_input = generate_flash_and_beep(tmp_path / "input.mkv", 5.0)
+    file_output = tmp_path / "output.mp4"
+    # The offset and the key frames are read from MPEG-TS.
+    monkeypatch.setattr(SeekRangeFactory, "get_delta_offset", lambda _: timedelta(0))
+    monkeypatch.setattr(KeyFrameIndex, "create", lambda _: KeyFrameIndex(np.arange(0.0, 5.0, 1.0)))
+    options = ChunkedOptions(seconds_chunk=2, max_workers=2, threads_per_chunk=1)
+    compress_chunked(file_input, file_output, options=options)
+    frame_scores = score_frames(file_output)
+    list_pts_time = [float(pts_time) for pts_time in frame_scores.list_pts_time]
+    # The deinterlacer outputs a frame for each field.
+    seconds_field = 1 / FRAME_RATE / 2
+    # Neither gap nor overlap at the boundaries of chunks.
+    assert np.diff(list_pts_time) == pytest.approx(seconds_field, abs=0.002)
+    assert len(list_pts_time) == 5 * FRAME_RATE * 2
+    seconds_flash = list_pts_time[int(np.argmax(frame_scores.scores))]
+    assert seconds_flash == pytest.approx(SECONDS_FLASH, abs=seconds_field + 0.001)
+    assert find_beep(file_output) == pytest.approx(seconds_flash, abs=seconds_field + 0.001)
+
+
+@pytest.mark.skipif(shutil.which("ffprobe") is None, reason="FFprobe is not installed")
+@pytest.mark.skipif(not has_libx265(), reason="FFmpeg with libx265 is not installed")
+def test_cut_compress(file_mpegts: Path, tmp_path: Path) -> None:
+    file_output = tmp_path / "output.mp4"
+    string_from = "00:00:02.000"
+    string_to = "00:00:06.000"
+    cut_compress(file_mpegts, file_output, string_from=string_from, string_to=string_to)
+    file_cut = tmp_path / "cut.ts"
+    cut(file_mpegts, file_cut, string_from=string_from, string_to=string_to)
+    file_expected = tmp_path / "expected.mp4"
+    compress(file_cut, file_expected)
+    # The streams and the tags mapped by ParameterBuilder are kept as the same as through the intermediate file.
+    assert not SCHEMA_ENCODED.compare(probe_metadata(file_expected), probe_metadata(file_output))
+    duration = probe_duration(file_output)
+    assert duration == pytest.approx(probe_duration(file_expected), abs=SECONDS_TOLERANCE_DURATION)
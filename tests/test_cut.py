@@ -0,0 +1,253 @@
+from datetime import timedelta
+import io
+from pathlib import Path
+import shutil
+import threading
+import time
+from typing import Optional
+
+import ffmpeg as ffmpeg_python
+import numpy as np
+import pytest
+
+import transportstreamarchiver.cut
+from transportstreamarchiver.cut import (
+    cut,
+    cut_parallel,
+    cut_segments,
+    CutJob,
+    Segment,
+    snap_to_key_frame_at_or_before,
+)
+from transportstreamarchiver.ffmpeg import edit
+from transportstreamarchiver.ffmpeg.exceptions import FFmpegProcessError
+from transportstreamarchiver.ffmpeg.seek_range.factory import SeekRangeFactory
+from transportstreamarchiver.ffmpeg.seek_range import SeekRange
+from transportstreamarchiver.ffprobe.comparator import Schema
+from transportstreamarchiver.ffprobe.key_frame import is_cut_by_key_frame_at_start
+from transportstreamarchiver.ffprobe.metadata import probe_metadata
+
+# The timestamps depend on whether `-ss` is input-side or output-side.
+SCHEMA_TIMESTAMPS = Schema(
+    [
+        "programs.*.streams.*.start_pts",
+        "programs.*.streams.*.start_time",
+        "programs.*.streams.*.duration_ts",
+        "programs.*.streams.*.duration",
+        "programs.*.streams.*.bit_rate",
+        "streams.*.start_pts",
+        "streams.*.start_time",
+        "streams.*.duration_ts",
+        "streams.*.duration",
+        "streams.*.bit_rate",
+    ],
+)
+# Start, end and the key frame at or before the start in the fixture, which has key frames every 0.5005 seconds.
+RANGES_SEGMENT = [
+    ("00:00:01.200", "00:00:03.000", "00:00:01.001"),
+    # Just before the key frame.
+    ("00:00:05.000", "00:00:08.000", "00:00:04.505"),
+    # Just after the key frame.
+    ("00:00:08.520", "00:00:12.300", "00:00:08.509"),
+]
+MAX_WORKERS_PER_DISK = 2
+
+
+@pytest.mark.parametrize(
+    ("string_from", "expected"),
+    [
+        ("00:00:00.000", None),
+        ("00:00:00.400", None),
+        ("00:00:00.500", timedelta(seconds=0.35)),
+        ("00:00:00.900", timedelta(seconds=0.35)),
+        ("00:00:01.000", timedelta(seconds=0.85)),
+    ],
+)
+def test_snap_to_key_frame_at_or_before(string_from: str, expected: Optional[timedelta]) -> None:
+    # The first video frame is 0.1 seconds later than the start of the file,
+    # and the seek range is relative to the first video frame.
+    key_frames = np.array([0.1, 0.6, 1.1, 1.6])
+    seek_range = snap_to_key_frame_at_or_before(SeekRange(timedelta(seconds=0.1), string_from=string_from), key_frames)
+    if expected is None:
+        assert seek_range.ss is None
+        return
+    # The middle between the key frame at or before and the previous one.
+    assert seek_range.ss == pytest.approx(expected, abs=timedelta(microseconds=1))
+
+
+def test_cut_segments(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file_input = tmp_path / "input.ts"
+    file_input.touch()
+    list_parameters = []
+    monkeypatch.setattr(edit.ParameterBuilder, "build", lambda _self, _file: None)
+    monkeypatch.setattr(edit, "execute_ffmpeg", lambda parameters, *_args: list_parameters.append(parameters))
+    segments = [
+        (SeekRange(timedelta(0), string_from="00:00:01.000", string_to="00:00:02.000"), tmp_path / "1.ts"),
+        (SeekRange(timedelta(0), string_from="00:00:05.000", string_to="00:00:06.000"), tmp_path / "2.ts"),
+    ]
+    edit.cut_segments(file_input, segments)
+    assert len(list_parameters) == 1
+    parameters = list_parameters[0]
+    index_input = parameters.index(str(file_input))
+    # Input stops at the end of the last segment.
+    assert parameters[:2] == ["-to", "0:00:06"]
+    assert parameters[index_input + 1 : index_input + 5] == ["-ss", "0:00:01", "-to", "0:00:02"]
+    index_first_output = parameters.index(str(tmp_path / "1.ts"))
+    assert parameters[index_first_output + 1 : index_first_output + 5] == ["-ss", "0:00:05", "-to", "0:00:06"]
+    assert parameters[-1] == str(tmp_path / "2.ts")
+
+
+def test_cut_segments_batch(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file_input = tmp_path / "input.ts"
+    file_input.touch()
+    list_files_output = []
+    monkeypatch.setattr(edit.ParameterBuilder, "build", lambda _self, _file: None)
+    monkeypatch.setattr(edit, "execute_ffmpeg", lambda _parameters, _message, *files: list_files_output.append(files))
+    segments = [
+        (
+            SeekRange(timedelta(0), string_from=f"00:00:{index:02}.000", string_to=f"00:00:{index:02}.500"),
+            tmp_path / f"{index}.ts",
+        )
+        for index in range(5)
+    ]
+    edit.cut_segments(file_input, segments, max_outputs=2)
+    assert list_files_output == [
+        (tmp_path / "0.ts", tmp_path / "1.ts"),
+        (tmp_path / "2.ts", tmp_path / "3.ts"),
+        (tmp_path / "4.ts",),
+    ]
+
+
+def probe_packets(file: Path, stream_specifier: str) -> list[tuple[int, str, str]]:
+    """PTS relative to the first packet, size and flags of each packet in the stream."""
+    packets = ffmpeg_python.probe(str(file), select_streams=stream_specifier, show_entries="packet=pts,size,flags")
+    pts_first = int(packets["packets"][0]["pts"])
+    return [(int(packet["pts"]) - pts_first, packet["size"], packet["flags"]) for packet in packets["packets"]]
+
+
+@pytest.mark.skipif(shutil.which("ffprobe") is None, reason="FFprobe is not installed")
+def test_cut_segments_same_as_cut(file_mpegts: Path, tmp_path: Path) -> None:
+    segments = [
+        Segment(tmp_path / f"segment-{index}.ts", string_from, string_to)
+        for index, (string_from, string_to, _) in enumerate(RANGES_SEGMENT)
+    ]
+    cut_segments(file_mpegts, segments)
+    for segment, (_, _, string_key_frame) in zip(segments, RANGES_SEGMENT, strict=True):
+        file_cut = tmp_path / f"cut-{segment.file_output.name}"
+        cut(file_mpegts, file_cut, string_from=string_key_frame, string_to=segment.string_to)
+        is_cut_by_key_frame_at_start(segment.file_output)
+        # Programs, streams and their tags are mapped in the same way as `cut()`.
+        assert not SCHEMA_TIMESTAMPS.compare(probe_metadata(file_cut), probe_metadata(segment.file_output))
+        # The video is the same as `cut()` from the key frame at or before the start frame for frame.
+        assert probe_packets(segment.file_output, "v:0") == probe_packets(file_cut, "v:0")
+        # The audio starts from `ss` later than the position `cut()` seeks to, and ends at the same packet.
+        packets_audio = [packet[1:] for packet in probe_packets(segment.file_output, "a:0")]
+        packets_audio_cut = [packet[1:] for packet in probe_packets(file_cut, "a:0")]
+        assert packets_audio == packets_audio_cut[-len(packets_audio) :]
+
+
+def test_cut_parallel(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file_input = tmp_path / "input.ts"
+    file_input.write_bytes(b"\x00" * 188)
+    lock = threading.Lock()
+    count_running = 0
+    max_running = 0
+
+    def fake_cut(_file_input: Path, file_output: Path, **_kwargs: Optional[str | timedelta]) -> None:
+        nonlocal count_running, max_running
+        with lock:
+            count_running += 1
+            max_running = max(max_running, count_running)
+        time.sleep(0.05)
+        with lock:
+            count_running -= 1
+        if file_output.name == "2.ts":
+            msg = "Failed to cut"
+            raise FFmpegProcessError(msg)
+        file_output.write_bytes(b"\x00" * 1000)
+
+    list_file_checked = []
+
+    def fake_get_delta_offset(file: Path) -> timedelta:
+        list_file_checked.append(file)
+        return timedelta(0)
+
+    monkeypatch.setattr(transportstreamarchiver.cut, "cut", fake_cut)
+    monkeypatch.setattr(SeekRangeFactory, "get_delta_offset", fake_get_delta_offset)
+    jobs = [CutJob(file_input, Segment(tmp_path / f"{index}.ts")) for index in range(1, 5)]
+    results = cut_parallel(jobs, max_workers=4, max_workers_per_disk=MAX_WORKERS_PER_DISK)
+    # All jobs are on the same disk.
+    assert max_running == MAX_WORKERS_PER_DISK
+    assert [result.job for result in results] == jobs
+    assert [result.error for result in results] == [None, "FFmpegProcessError: Failed to cut", None, None]
+    assert [result.size for result in results] == [1000, 0, 1000, 1000]
+    # The offset is checked once before the jobs run at the same time.
+    assert list_file_checked == [file_input]
+
+
+def test_cut_compress(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file_input = tmp_path / "input.ts"
+    file_input.touch()
+    file_output = tmp_path / "output.mp4"
+    list_command = []
+
+    class FakeProcess:
+        stdout = io.BytesIO()
+
+        def __init__(self, command: list[str], *, is_limited: bool) -> None:
+            list_command.append(command)
+            # Counted as a pair with the downstream.
+            assert not is_limited
+
+        def kill(self) -> None:
+            pass
+
+        def wait(self) -> int:
+            return 0
+
+    def fake_execute_ffmpeg(parameters: list[str], *_args: Path, stdin: object) -> None:
+        assert stdin is FakeProcess.stdout
+        list_command.append(parameters)
+
+    monkeypatch.setattr(edit.ParameterBuilder, "build", lambda _self, _file: None)
+    monkeypatch.setattr(edit, "popen", FakeProcess)
+    monkeypatch.setattr(edit, "execute_ffmpeg", fake_execute_ffmpeg)
+    seek_range = SeekRange(timedelta(0), string_from="00:00:01.000", string_to="00:00:02.000")
+    edit.cut_compress(file_input, seek_range, file_output)
+    command_cut, parameters_compress = list_command
+    # The upstream is the same as `cut()` except for the output.
+    assert command_cut[2:-3] == edit.build_parameters_cut(file_input, seek_range)
+    assert command_cut[-3:] == ["-f", "mpegts", "pipe:1"]
+    assert parameters_compress[:5] == ["-fix_sub_duration", "-f", "mpegts", "-i", "pipe:0"]
+    assert parameters_compress[-1] == str(file_output)
+    assert FakeProcess.stdout.closed
+
+
+def test_cut_compress_upstream_failed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file_input = tmp_path / "input.ts"
+    file_input.touch()
+    file_output = tmp_path / "output.mp4"
+
+    class FakeProcess:
+        stdout = io.BytesIO()
+
+        def __init__(self, _command: list[str], **_kwargs: bool) -> None:
+            pass
+
+        def kill(self) -> None:
+            pass
+
+        def wait(self) -> int:
+            return 1
+
+    def fake_execute_ffmpeg(_parameters: list[str], *_args: Path, **_kwargs: object) -> None:
+        # The downstream succeeds with what the upstream wrote before failing.
+        file_output.touch()
+
+    monkeypatch.setattr(edit.ParameterBuilder, "build", lambda _self, _file: None)
+    monkeypatch.setattr(edit, "popen", FakeProcess)
+    monkeypatch.setattr(edit, "execute_ffmpeg", fake_execute_ffmpeg)
+    seek_range = SeekRange(timedelta(0), string_from="00:00:01.000", string_to="00:00:02.000")
+    with pytest.raises(FFmpegProcessError, match="Failed to cut"):
+        edit.cut_compress(file_input, seek_range, file_output)
+    assert not file_output.exists()
@@ -1,6 +1,10 @@
+from pathlib import Path
+
 import pytest
 
-from cut_scene import ConsecutivePeriod, create_list_consecutive_period
+from cut_scene import ConsecutivePeriod, create_list_consecutive_period, load_list_index
+
+LIST_TIME = ["0", "1.5", "3.2", "4.8", "6.00"]
 
 
 @pytest.mark.parametrize(
@@ -24,3 +28,16 @@ from cut_scene import ConsecutivePeriod, create_list_consecutive_period
 )
 def test(list_index: list[int], expected: list[ConsecutivePeriod]) -> None:
     assert list(create_list_consecutive_period(list_index)) == expected
+
+
+def test_load_list_index(tmp_path: Path) -> None:
+    for index in (0, 2):
+        (tmp_path / f"{index:06d}.jpg").touch()
+    assert load_list_index(tmp_path, LIST_TIME) == [0, 2]
+    assert load_list_index(tmp_path, LIST_TIME, is_all=True) == [0, 1, 2, 3]
+
+
+def test_load_list_index_without_thumbnails(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError, match="Thumbnail is not found"):
+        load_list_index(tmp_path, LIST_TIME)
+    assert load_list_index(tmp_path, LIST_TIME, is_all=True) == [0, 1, 2, 3]
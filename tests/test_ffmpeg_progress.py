@@ -0,0 +1,102 @@
+import json
+from pathlib import Path
+import shutil
+
+import pytest
+
+from transportstreamarchiver.ffmpeg.execution import execute_ffmpeg
+from transportstreamarchiver.ffmpeg.progress import JsonLinesSink, Progress, ProgressParser, PrometheusTextfileSink
+
+FRAME_RATE_TEST_SOURCE = 10
+
+BLOCK = b"""frame=120
+fps=59.94
+stream_0_0_q=-1.0
+bitrate=N/A
+total_size=1048576
+out_time_us=4004000
+out_time_ms=4004000
+out_time=00:00:04.004000
+dup_frames=0
+drop_frames=0
+speed=2.01x
+progress=continue
+frame=150
+fps=60.00
+total_size=N/A
+out_time_us=N/A
+speed=N/A
+progress=end
+"""
+
+
+def test_progress_parser() -> None:
+    list_progress: list[Progress] = []
+    parser = ProgressParser("output.ts", list_progress.append)
+    for line in BLOCK.splitlines(keepends=True):
+        parser.parse(line)
+    first, last = list_progress
+    assert (first.frame, first.fps, first.speed, first.out_time) == (120, 59.94, 2.01, 4.004)
+    assert (first.total_size, first.status) == (1048576, "continue")
+    assert (last.frame, last.speed, last.out_time, last.total_size, last.status) == (150, None, 0.0, 0, "end")
+    assert parser.last == last
+
+
+def test_sinks(tmp_path: Path) -> None:
+    file_json_lines = tmp_path / "progress.jsonl"
+    file_prometheus = tmp_path / "ffmpeg.prom"
+    sink_json_lines = JsonLinesSink(file_json_lines)
+    sink_prometheus = PrometheusTextfileSink(file_prometheus)
+    for progress in [Progress("a.ts", frame=1, speed=1.5), Progress('b "1".ts', frame=2), Progress("a.ts", frame=3)]:
+        sink_json_lines(progress)
+        sink_prometheus(progress)
+    lines = file_json_lines.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["frame"] for line in lines] == [1, 2, 3]
+    text = file_prometheus.read_text(encoding="utf-8")
+    assert 'transportstreamarchiver_ffmpeg_frame{output="a.ts"} 3\n' in text
+    assert 'transportstreamarchiver_ffmpeg_frame{output="b \\"1\\".ts"} 2\n' in text
+    # Speed is omitted until measured.
+    assert 'transportstreamarchiver_ffmpeg_speed{output="b \\"1\\".ts"}' not in text
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_prometheus_textfile_sink_drops_finished(tmp_path: Path) -> None:
+    file_prometheus = tmp_path / "ffmpeg.prom"
+    sink_prometheus = PrometheusTextfileSink(file_prometheus)
+    sink_prometheus(Progress("a.ts", frame=1))
+    sink_prometheus(Progress("a.ts", frame=2, status="end"))
+    # The final snapshot is written.
+    assert 'transportstreamarchiver_ffmpeg_finished{output="a.ts"} 1\n' in file_prometheus.read_text(encoding="utf-8")
+    assert sink_prometheus.latest == {}
+    sink_prometheus(Progress("b.ts", frame=1))
+    text = file_prometheus.read_text(encoding="utf-8")
+    assert 'output="a.ts"' not in text
+    assert 'transportstreamarchiver_ffmpeg_frame{output="b.ts"} 1\n' in text
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg is not installed")
+def test_execute_ffmpeg_progress(tmp_path: Path) -> None:
+    file_output = tmp_path / "output.mp4"
+    list_progress: list[Progress] = []
+    source = f"testsrc=size=64x48:rate={FRAME_RATE_TEST_SOURCE}:duration=1"
+    parameters = ["-f", "lavfi", "-i", source, "-loglevel", "error", str(file_output)]
+    execute_ffmpeg(parameters, "Failed to encode", file_output, callback_progress=list_progress.append)
+    assert list_progress[-1].status == "end"
+    assert list_progress[-1].frame == FRAME_RATE_TEST_SOURCE
+    assert list_progress[-1].label == str(file_output)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg is not installed")
+def test_execute_ffmpeg_progress_callback_raises(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    file_output = tmp_path / "output.mp4"
+
+    def callback(_progress: Progress) -> None:
+        msg = "Failed to report"
+        raise ValueError(msg)
+
+    source = f"testsrc=size=64x48:rate={FRAME_RATE_TEST_SOURCE}:duration=1"
+    parameters = ["-f", "lavfi", "-i", source, "-loglevel", "error", str(file_output)]
+    # The failure of the callback doesn't stop FFmpeg.
+    execute_ffmpeg(parameters, "Failed to encode", file_output, callback_progress=callback)
+    assert file_output.exists()
+    assert "Failed to report progress" in caplog.text
@@ -1,10 +1,10 @@
 from dataclasses import dataclass
+from pathlib import Path
 import re
 from typing import Optional
 
 import ffmpeg
 from ffmpeg.nodes import FilterableStream, OutputStream
-import pytest
 
 
 @dataclass
@@ -56,13 +56,12 @@ def assert_option(stream: OutputStream, expects: list[Option]) -> None:
         assert option in expects
 
 
-@pytest.mark.skip(reason="Since it's difficult to prepare copyright free MPEG ts file.")
-def test() -> None:
-    stream: FilterableStream = ffmpeg.input("input.ts", ss="00:00:00.000", to="00:00:02.000")
+def test(file_mpegts: Path) -> None:
+    stream: FilterableStream = ffmpeg.input(str(file_mpegts), ss="00:00:00.000", to="00:00:02.000")
     expects = [
         Option("-ss", "00:00:00.000"),
         Option("-to", "00:00:02.000"),
-        Option("-i", "input.ts"),
+        Option("-i", str(file_mpegts)),
     ]
-    stream = ffmpeg.output(stream, "input-3.ts")
+    stream = ffmpeg.output(stream, str(file_mpegts.with_name("input-3.ts")))
     assert_option(stream, expects)
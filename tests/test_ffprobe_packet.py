@@ -0,0 +1,40 @@
+from fractions import Fraction
+from io import BytesIO
+
+import pytest
+
+from transportstreamarchiver.ffprobe.packet import FLAG_CORRUPT, FLAG_KEY, iterate_packet_table, read_packet_table
+
+CSV = (
+    b"packet,135000,564,K__\r\n"
+    b"packet,144009,10716,___\r\n"
+    b"packet,N/A,18612,___\r\n"
+    b"packet,138003,N/A,__C\r\n"
+    b"packet,141006,26508,K_C\r\n"
+    b"stream,1/90000\r\n"
+)
+
+
+@pytest.mark.parametrize("size_chunk", [7, 64, 1024])
+def test_read_packet_table(size_chunk: int) -> None:
+    table = read_packet_table(BytesIO(CSV), size_chunk=size_chunk)
+    assert list(table.pts) == [135000, 144009, 138003, 141006]
+    assert list(table.positions) == [564, 10716, -1, 26508]
+    assert list(table.flags) == [FLAG_KEY, 0, FLAG_CORRUPT, FLAG_KEY | FLAG_CORRUPT]
+    assert table.time_base == Fraction(1, 90000)
+
+
+def test_read_packet_table_side_data() -> None:
+    csv = b"packet,166020,7332,K__,side_data,\n\npacket,160014,21244,___,side_data,\n\nstream,1/90000,side_data,\n\n"
+    table = read_packet_table(BytesIO(csv), size_chunk=40)
+    assert list(table.pts) == [166020, 160014]
+    assert list(table.positions) == [7332, 21244]
+    assert list(table.flags) == [FLAG_KEY, 0]
+    assert table.time_base == Fraction(1, 90000)
+
+
+def test_iterate_packet_table() -> None:
+    csv = b"".join(f"packet,{index * 3003},{index * 188},___\n".encode() for index in range(1000))
+    tables = list(iterate_packet_table(BytesIO(csv), size_chunk=4096))
+    assert len(tables) > 1
+    assert [pts for table in tables for pts in table.pts] == [index * 3003 for index in range(1000)]
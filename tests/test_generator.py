@@ -0,0 +1,17 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from tests.generator import OFFSET_PTS, SIZE_GOP
+from transportstreamarchiver.mpegts import read_timestamps, scan_video
+
+
+def test_generate_mpegts(file_mpegts: Path) -> None:
+    timestamps = read_timestamps(file_mpegts)
+    assert timestamps.first_video_pts / 90000 == pytest.approx(OFFSET_PTS, abs=2)
+    video_packets = scan_video(file_mpegts)
+    indices_key = np.flatnonzero(video_packets.is_key)
+    assert len(indices_key) > 1
+    # The encoder may make the first GOP shorter.
+    assert np.all(np.diff(indices_key)[1:] == SIZE_GOP)
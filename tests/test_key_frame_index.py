@@ -0,0 +1,66 @@
+from datetime import timedelta
+from fractions import Fraction
+
+import pytest
+
+from transportstreamarchiver.ffprobe.key_frame_index import KeyFrameIndex
+from transportstreamarchiver.ffprobe.packet import FLAG_KEY
+from transportstreamarchiver.ffprobe.packet_index import PacketIndex
+
+INDEX_GAP = 3
+LIST_FRAME = [f"{index * 0.5:.6f}" for index in range(1, 11)]
+
+
+def search_frame_before(list_frame: list[str], time: str) -> str:
+    """The implementation by linear search to compare."""
+    threshold = float(time)
+    for index, frame in enumerate(list_frame):
+        if float(frame) >= threshold:
+            return list_frame[max(index - 1, 0)]
+    return list_frame[-1]
+
+
+def search_frame_after(list_frame: list[str], time: str) -> str:
+    """The implementation by linear search to compare."""
+    threshold = float(time)
+    for index, frame in enumerate(reversed(list_frame)):
+        if float(frame) <= threshold:
+            return list_frame[min(-(index + 1) + INDEX_GAP, -1)]
+    return list_frame[0]
+
+
+LIST_TIME = ["0.0", "0.5", "0.7", "1.0", "2.6", "4.0", "4.9", "5.0", "6.0"]
+
+
+def test_snap_before() -> None:
+    key_frames = KeyFrameIndex(LIST_FRAME)
+    expected = [search_frame_before(LIST_FRAME, time) for time in LIST_TIME]
+    assert key_frames.to_strings(key_frames.snap_before(LIST_TIME)) == expected
+
+
+def test_snap_after() -> None:
+    key_frames = KeyFrameIndex(LIST_FRAME)
+    expected = [search_frame_after(LIST_FRAME, time) for time in LIST_TIME]
+    assert key_frames.to_strings(key_frames.snap_after(LIST_TIME, index_gap=INDEX_GAP)) == expected
+
+
+def test_get_delta_accurate() -> None:
+    key_frames = KeyFrameIndex(LIST_FRAME)
+    assert key_frames.get_delta_accurate(timedelta(seconds=1.2)) == [
+        timedelta(seconds=1),
+        timedelta(seconds=1.5),
+        timedelta(seconds=2),
+    ]
+
+
+def test_empty() -> None:
+    with pytest.raises(ValueError, match="Key frame is not found"):
+        KeyFrameIndex([])
+
+
+def test_from_packet_index_tie() -> None:
+    # 126000 / 90000 is 1.4000000000000001 in float while FFprobe reports 1.400000.
+    index = PacketIndex([0, 126000, 129003], [-1, -1, -1], [FLAG_KEY, FLAG_KEY, 0], Fraction(1, 90000))
+    key_frames = KeyFrameIndex.from_packet_index(index)
+    assert key_frames.to_strings(key_frames.snap_after(["1.400000"])) == ["1.400000"]
+    assert key_frames.to_strings(key_frames.snap_before(["1.400000"])) == ["0.000000"]
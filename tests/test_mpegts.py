@@ -0,0 +1,108 @@
+from collections.abc import Callable
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+from transportstreamarchiver.mpegts import MpegTsError, read_timestamps, scan_video, scanner
+from transportstreamarchiver.mpegts.packet import detect_packet_format, PacketFormat
+
+PID_VIDEO = 0x111
+PID_AUDIO = 0x112
+STREAM_ID_VIDEO = 0xE0
+STREAM_ID_AUDIO = 0xC0
+FIRST_VIDEO_PTS = 903_003
+COUNT_PACKET_BLOCK_SMALL = 4
+
+
+def encode_pts(pts: int) -> bytes:
+    return bytes(
+        [
+            0x21 | ((pts >> 29) & 0x0E),
+            (pts >> 22) & 0xFF,
+            0x01 | ((pts >> 14) & 0xFE),
+            (pts >> 7) & 0xFF,
+            0x01 | ((pts << 1) & 0xFE),
+        ],
+    )
+
+
+def create_packet(pid: int, stream_id: int, pts: int, *, is_random_access: bool = False) -> bytes:
+    header = bytes([0x47, 0x40 | (pid >> 8), pid & 0xFF, 0x30])
+    adaptation_field = bytes([1, 0x40 if is_random_access else 0x00])
+    pes = bytes([0x00, 0x00, 0x01, stream_id, 0x00, 0x00, 0x80, 0x80, 0x05]) + encode_pts(pts)
+    packet = header + adaptation_field + pes
+    return packet + b"\xff" * (188 - len(packet))
+
+
+def create_stream(*, m2ts: bool = False, has_random_access: bool = True) -> bytes:
+    packets = [create_packet(PID_AUDIO, STREAM_ID_AUDIO, 900_000)]
+    for index in range(30):
+        is_key = has_random_access and index == 0
+        pts = FIRST_VIDEO_PTS + index * 3003
+        packets.append(create_packet(PID_VIDEO, STREAM_ID_VIDEO, pts, is_random_access=is_key))
+    if m2ts:
+        packets = [b"\x00\x00\x00\x00" + packet for packet in packets]
+    return b"".join(packets)
+
+
+@pytest.mark.parametrize(
+    ("m2ts", "expected"),
+    [(False, PacketFormat(188, 0)), (True, PacketFormat(192, 4))],
+)
+def test_detect_packet_format(*, m2ts: bool, expected: PacketFormat) -> None:
+    assert detect_packet_format(create_stream(m2ts=m2ts)) == expected
+
+
+@pytest.mark.parametrize("m2ts", [False, True])
+def test_read_timestamps(tmp_path: Path, *, m2ts: bool) -> None:
+    file = tmp_path / "input.ts"
+    file.write_bytes(create_stream(m2ts=m2ts))
+    timestamps = read_timestamps(file, size_sample=188 * 8)
+    assert timestamps.offset == timedelta(microseconds=33366)
+    assert timestamps.first_video_pts == FIRST_VIDEO_PTS
+    assert timestamps.last_video_pts == FIRST_VIDEO_PTS + 29 * 3003
+    assert timestamps.duration == pytest.approx((30 * 3003 + 3003) / 90000)
+
+
+def test_read_timestamps_not_mpegts(tmp_path: Path) -> None:
+    file = tmp_path / "input.mp4"
+    file.write_bytes(b"\x00" * 1024)
+    with pytest.raises(MpegTsError):
+        read_timestamps(file)
+
+
+@pytest.mark.parametrize("function", [read_timestamps, scan_video])
+def test_empty(tmp_path: Path, function: Callable[[Path], object]) -> None:
+    file = tmp_path / "input.ts"
+    file.touch()
+    with pytest.raises(MpegTsError, match="File is empty"):
+        function(file)
+
+
+@pytest.mark.parametrize("m2ts", [False, True])
+def test_scan_video(tmp_path: Path, *, m2ts: bool) -> None:
+    file = tmp_path / "input.ts"
+    file.write_bytes(create_stream(m2ts=m2ts))
+    video_packets = scan_video(file)
+    size = 192 if m2ts else 188
+    assert video_packets.pid == PID_VIDEO
+    assert video_packets.pts.tolist() == [903_003 + index * 3003 for index in range(30)]
+    assert video_packets.positions.tolist() == [size * (index + 1) for index in range(30)]
+    assert video_packets.is_key.tolist() == [index == 0 for index in range(30)]
+
+
+def test_scan_video_head(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file = tmp_path / "input.ts"
+    file.write_bytes(create_stream())
+    monkeypatch.setattr(scanner, "COUNT_PACKET_BLOCK", COUNT_PACKET_BLOCK_SMALL)
+    # The 11th frame reaches 0.3 seconds from the first frame, and the scan stops at the end of its block.
+    video_packets = scan_video(file, seconds=0.3)
+    assert video_packets.pts.tolist() == [FIRST_VIDEO_PTS + index * 3003 for index in range(11)]
+
+
+def test_scan_video_without_random_access(tmp_path: Path) -> None:
+    file = tmp_path / "input.ts"
+    file.write_bytes(create_stream(has_random_access=False))
+    with pytest.raises(MpegTsError, match="Random access indicator is not found"):
+        scan_video(file)
@@ -0,0 +1,73 @@
+from array import array
+from collections import OrderedDict
+from fractions import Fraction
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from transportstreamarchiver.cache import Fingerprint
+from transportstreamarchiver.ffprobe.packet import FLAG_KEY
+from transportstreamarchiver.ffprobe.packet_index import MAX_SIZE_MEMO, PacketIndex, SIZE_HEADER
+
+SECONDS_HEAD = 60.0
+
+
+def test_save_and_load(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(PacketIndex, "memo", OrderedDict())
+    file = tmp_path / "input.ts"
+    file.write_bytes(b"\x47" * 188)
+    pts = array("q", [135000 + 3003 * index for index in range(30)])
+    flags = array("B", [FLAG_KEY if index % 15 == 0 else 0 for index in range(30)])
+    fingerprint = Fingerprint.create(file)
+    PacketIndex(pts, array("q", range(30)), flags, Fraction(1, 90000)).save(
+        PacketIndex.get_path(fingerprint),
+        fingerprint,
+    )
+    index = PacketIndex.load(file)
+    assert index is not None
+    assert list(index.pts) == list(pts)
+    assert [index.to_string(pts) for pts in index.list_pts_key_frame()] == ["1.500000", "2.000500"]
+    file.write_bytes(b"\x47" * 376)
+    assert PacketIndex.load(file) is None
+
+
+@pytest.mark.parametrize("size", [0, SIZE_HEADER - 1, SIZE_HEADER + 8])
+def test_load_broken(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, size: int) -> None:
+    monkeypatch.setattr(PacketIndex, "memo", OrderedDict())
+    file = tmp_path / "input.ts"
+    file.write_bytes(b"\x47" * 188)
+    fingerprint = Fingerprint.create(file)
+    path = PacketIndex.get_path(fingerprint)
+    index = PacketIndex(array("q", range(30)), array("q", range(30)), array("B", [FLAG_KEY] * 30), Fraction(1, 90000))
+    index.save(path, fingerprint)
+    # Truncated sidecar is a cache miss.
+    path.write_bytes(path.read_bytes()[:size])
+    assert PacketIndex.load(file) is None
+
+
+def test_memo_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(PacketIndex, "memo", OrderedDict())
+    index = PacketIndex(array("q"), array("q"), array("B"), Fraction(1, 90000))
+    fingerprints = [Fingerprint(size, 0, "") for size in range(MAX_SIZE_MEMO + 1)]
+    for fingerprint in fingerprints:
+        PacketIndex.remember(fingerprint, index)
+    assert list(PacketIndex.memo) == fingerprints[1:]
+
+
+def test_load_or_scan_head(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(PacketIndex, "memo", OrderedDict())
+    file = tmp_path / "input.ts"
+    file.write_bytes(b"\x47" * 188)
+    index = PacketIndex(array("q", range(30)), array("q", range(30)), array("B", [FLAG_KEY] * 30), Fraction(1, 90000))
+    list_seconds = []
+
+    def scan(_file: Path, *, seconds: Optional[float] = None) -> PacketIndex:
+        list_seconds.append(seconds)
+        return index
+
+    monkeypatch.setattr(PacketIndex, "scan", scan)
+    assert PacketIndex.load_or_scan_head(file, SECONDS_HEAD) is index
+    assert list_seconds == [SECONDS_HEAD]
+    # The index of the head is not stored since it doesn't cover whole of the file.
+    assert PacketIndex.load(file) is None
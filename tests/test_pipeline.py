@@ -0,0 +1,60 @@
+from datetime import timedelta
+from pathlib import Path
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from transportstreamarchiver import ffmpeg, pipeline
+from transportstreamarchiver.ffmpeg.exceptions import FFmpegProcessError
+from transportstreamarchiver.ffmpeg.seek_range import SeekRange
+from transportstreamarchiver.ffprobe.verification import CutReport
+from transportstreamarchiver.pipeline import CutVerifyPipeline
+
+COUNT_SEGMENT = 8
+MAX_PENDING = 3
+
+
+def test_cut_verify_pipeline(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file_input = tmp_path / "input.ts"
+    file_input.touch()
+    lock = threading.Lock()
+    set_unverified: set[Path] = set()
+    max_unverified = 0
+    list_verified = []
+
+    def fake_cut(_file_input: Path, _seek_range: SeekRange, file_output: Path) -> None:
+        nonlocal max_unverified
+        if file_output.name == "2.ts":
+            msg = "Failed to cut"
+            raise FFmpegProcessError(msg)
+        file_output.touch()
+        with lock:
+            set_unverified.add(file_output)
+            max_unverified = max(max_unverified, len(set_unverified))
+
+    def fake_verify_cut(_file_input: Path, file_output: Path, **_kwargs: Any) -> CutReport:
+        # Verification slower than cuts to apply backpressure.
+        time.sleep(0.02)
+        with lock:
+            set_unverified.remove(file_output)
+            list_verified.append(file_output)
+        return CutReport(file_output)
+
+    monkeypatch.setattr(ffmpeg, "cut", fake_cut)
+    monkeypatch.setattr(pipeline, "verify_cut", fake_verify_cut)
+    monkeypatch.setattr(pipeline, "get_metadata", lambda *_args, **_kwargs: {})
+    segments = [(SeekRange(timedelta(0)), tmp_path / f"{index}.ts") for index in range(1, COUNT_SEGMENT + 1)]
+    reports = CutVerifyPipeline(
+        file_input,
+        max_workers_cut=2,
+        max_workers_verify=1,
+        max_pending=MAX_PENDING,
+    ).run(segments)
+    assert [report.file_output for report in reports] == [file_output for _, file_output in segments]
+    assert [report.is_ok for report in reports] == [True, False, True, True, True, True, True, True]
+    assert reports[1].errors[0] == "FFmpegProcessError: Failed to cut"
+    # Except for the failed cut.
+    assert len(list_verified) == COUNT_SEGMENT - 1
+    assert max_unverified <= MAX_PENDING
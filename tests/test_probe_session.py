@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import threading
+import time
+
+from transportstreamarchiver.cache import JsonCache
+from transportstreamarchiver.ffprobe.session import ProbeSession
+
+# The probes in test_memoize count the calls.
+NTH_PROBE_OTHER_QUERY = 2
+NTH_PROBE_CHANGED_FILE = 3
+SECONDS_DURATION = 1.5
+
+
+def create_files(tmp_path: Path, count: int) -> list[Path]:
+    files = []
+    for index in range(count):
+        file = tmp_path / f"{index}.ts"
+        file.write_bytes(bytes([index]) * 188)
+        files.append(file)
+    return files
+
+
+def test_memoize(tmp_path: Path) -> None:
+    file = create_files(tmp_path, 1)[0]
+    list_probed = []
+    session = ProbeSession()
+
+    def probe(file: Path) -> int:
+        list_probed.append(file)
+        return len(list_probed)
+
+    assert session.get("query", file, probe) == 1
+    assert session.get("query", file, probe) == 1
+    assert session.get("other", file, probe) == NTH_PROBE_OTHER_QUERY
+    # The file changes.
+    file.write_bytes(b"\x47" * 376)
+    assert session.get("query", file, probe) == NTH_PROBE_CHANGED_FILE
+    assert (session.count_hit, session.count_miss) == (1, 3)
+
+
+def test_evict_least_recently_used(tmp_path: Path) -> None:
+    files = create_files(tmp_path, 3)
+    session = ProbeSession(max_size=2)
+    session.get("query", files[0], str)
+    session.get("query", files[1], str)
+    session.get("query", files[0], str)
+    session.get("query", files[2], str)
+    assert [key[1] for key in session.memo] == [str(files[0].resolve()), str(files[2].resolve())]
+
+
+def test_persistent(tmp_path: Path) -> None:
+    file = create_files(tmp_path, 1)[0]
+    cache = JsonCache("probe", directory=tmp_path / "cache")
+    ProbeSession(cache=cache).get("duration", file, lambda _: SECONDS_DURATION, persistent=True)
+    session = ProbeSession(cache=JsonCache("probe", directory=tmp_path / "cache"))
+    assert session.get("duration", file, lambda _: 0.0, persistent=True) == SECONDS_DURATION
+    assert session.count_miss == 0
+
+
+def test_concurrent(tmp_path: Path) -> None:
+    file = create_files(tmp_path, 1)[0]
+    list_probed = []
+    session = ProbeSession()
+    barrier = threading.Barrier(8)
+
+    def probe(file: Path) -> int:
+        list_probed.append(file)
+        # Lets the other callers reach the session while probing.
+        time.sleep(0.1)
+        return len(list_probed)
+
+    def get(_: int) -> int:
+        barrier.wait()
+        return session.get("query", file, probe)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(get, range(8))) == [1] * 8
+    assert (session.count_hit, session.count_miss) == (7, 1)
+    assert not session.in_flight
+
+
+def test_concurrent_error(tmp_path: Path) -> None:
+    file = create_files(tmp_path, 1)[0]
+    list_probed = []
+    session = ProbeSession()
+    barrier = threading.Barrier(2)
+
+    def probe(file: Path) -> int:
+        list_probed.append(file)
+        time.sleep(0.1)
+        if len(list_probed) == 1:
+            msg = "Failed to probe"
+            raise ValueError(msg)
+        return len(list_probed)
+
+    def get(_: int) -> str:
+        barrier.wait()
+        try:
+            return str(session.get("query", file, probe))
+        except ValueError as error:
+            return str(error)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # The caller waiting for the failed probe probes by itself.
+        assert sorted(executor.map(get, range(2))) == ["2", "Failed to probe"]
+    assert not session.in_flight
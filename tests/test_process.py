@@ -0,0 +1,159 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+import sys
+import time
+
+import pytest
+
+from transportstreamarchiver import process
+from transportstreamarchiver.process import run, run_async, set_max_processes
+
+TOOL = Path(sys.executable).stem
+SECONDS_TIMEOUT = 0.5
+# Far shorter than the sleep of the children to confirm they are killed.
+SECONDS_UNTIL_KILLED = 10
+SECONDS_PROCESS = 0.2
+COUNT_PROCESS = 3
+
+
+def test_run() -> None:
+    lines: list[bytes] = []
+    completed_process = run(
+        [sys.executable, "-c", "import sys; print('a'); print('b'); print('c', file=sys.stderr)"],
+        callback_stdout=lines.append,
+    )
+    assert completed_process.return_code == 0
+    assert lines == [b"a\n", b"b\n"]
+    assert completed_process.stdout == b""
+    assert completed_process.stderr == b"c\n"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Process group is killed only on POSIX")
+def test_run_timeout() -> None:
+    # The child holds the pipe, so the run doesn't finish unless the whole process group is killed.
+    code = (
+        "import subprocess, sys, time; "
+        "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']); "
+        "time.sleep(30)"
+    )
+    time_start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        run([sys.executable, "-c", code], timeout=SECONDS_TIMEOUT)
+    assert time.perf_counter() - time_start < SECONDS_UNTIL_KILLED
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Process group is killed only on POSIX")
+def test_run_callback_raises() -> None:
+    list_pid = []
+
+    def callback(line: bytes) -> None:
+        list_pid.append(int(line))
+        msg = "Failed to parse"
+        raise ValueError(msg)
+
+    code = "import os, time; print(os.getpid(), flush=True); time.sleep(30)"
+    time_start = time.perf_counter()
+    with pytest.raises(ValueError, match="Failed to parse"):
+        run([sys.executable, "-c", code], callback_stdout=callback)
+    assert time.perf_counter() - time_start < SECONDS_UNTIL_KILLED
+    # The process has been killed and reaped.
+    with pytest.raises(ProcessLookupError):
+        os.kill(list_pid[0], 0)
+
+
+@pytest.fixture
+def _single_process(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(process, "MAX_PROCESSES", {})
+    monkeypatch.setattr(process, "semaphores", {})
+    set_max_processes(TOOL, 1)
+
+
+@pytest.mark.usefixtures("_single_process")
+def test_run_async_concurrency() -> None:
+    command = [sys.executable, "-c", f"import time; time.sleep({SECONDS_PROCESS})"]
+
+    async def run_all() -> None:
+        await asyncio.gather(*(run_async(command) for _ in range(COUNT_PROCESS)))
+
+    time_start = time.perf_counter()
+    asyncio.run(run_all())
+    assert time.perf_counter() - time_start >= SECONDS_PROCESS * COUNT_PROCESS
+
+
+@pytest.mark.usefixtures("_single_process")
+def test_run_concurrency_among_event_loops() -> None:
+    # Each synchronous wrapper runs its own event loop.
+    command = [sys.executable, "-c", f"import time; time.sleep({SECONDS_PROCESS})"]
+    time_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=COUNT_PROCESS) as executor:
+        list_completed_process = list(executor.map(lambda _: run(command), range(COUNT_PROCESS)))
+    assert time.perf_counter() - time_start >= SECONDS_PROCESS * COUNT_PROCESS
+    assert [completed_process.return_code for completed_process in list_completed_process] == [0] * COUNT_PROCESS
+
+
+@pytest.mark.usefixtures("_single_process")
+def test_run_async_cancel() -> None:
+    command = [sys.executable, "-c", "import time; time.sleep(0.2)"]
+
+    async def run_cancelled() -> None:
+        task_running = asyncio.create_task(run_async(command))
+        task_waiting = asyncio.create_task(run_async(command))
+        await asyncio.sleep(0.1)
+        task_waiting.cancel()
+        await task_running
+        with pytest.raises(asyncio.CancelledError):
+            await task_waiting
+
+    asyncio.run(run_cancelled())
+    # The cancelled task doesn't keep the semaphore.
+    assert process.get_semaphore(TOOL).value == 1
+
+
+@pytest.mark.usefixtures("_single_process")
+def test_run_async_order() -> None:
+    command = [sys.executable, "-c", f"import time; time.sleep({SECONDS_PROCESS / COUNT_PROCESS})"]
+    list_index = []
+
+    async def run_one(index: int) -> None:
+        await run_async(command)
+        list_index.append(index)
+
+    async def run_all() -> None:
+        await asyncio.gather(*(run_one(index) for index in range(COUNT_PROCESS)))
+
+    asyncio.run(run_all())
+    # Granted in the order of requests.
+    assert list_index == list(range(COUNT_PROCESS))
+
+
+@pytest.mark.usefixtures("_single_process")
+def test_popen_limited() -> None:
+    command = [sys.executable, "-c", f"import time; time.sleep({SECONDS_PROCESS})"]
+    time_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        process_reader = process.popen(command, stdout=None)
+        future = executor.submit(run, command)
+        assert process_reader.wait() == 0
+        # Waits until the process of the reader is reaped.
+        assert future.result().return_code == 0
+    assert time.perf_counter() - time_start >= SECONDS_PROCESS * 2
+    assert process.get_semaphore(TOOL).value == 1
+
+
+def test_run_stdin() -> None:
+    # The stdout of the upstream is piped into the stdin without passing through this process.
+    # Not limited as `cut_compress()`, otherwise, the downstream may wait for the upstream holding the last slot.
+    upstream = process.popen([sys.executable, "-c", "print('a'); print('b')"], is_limited=False)
+    lines: list[bytes] = []
+    completed_process = run(
+        [sys.executable, "-c", "import sys; sys.stdout.write(sys.stdin.read().upper())"],
+        callback_stdout=lines.append,
+        stdin=upstream.stdout,
+    )
+    assert upstream.stdout is not None
+    upstream.stdout.close()
+    assert upstream.wait() == 0
+    assert completed_process.return_code == 0
+    assert lines == [b"A\n", b"B\n"]
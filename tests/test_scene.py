@@ -0,0 +1,253 @@
+from pathlib import Path
+import re
+import shutil
+from typing import Optional
+
+import ffmpeg
+import numpy as np
+import numpy.typing as npt
+import pytest
+
+from tests.generator import SOURCES_SCENE
+from transportstreamarchiver.cache import Fingerprint
+from transportstreamarchiver.scene import (
+    detect_scenes,
+    detect_scenes_fast,
+    detect_scenes_parallel,
+    FrameScores,
+    index,
+    iterate_scenes,
+    parallel,
+    Progress,
+    Scenes,
+    SceneScoreIndex,
+    SceneScorer,
+    ShowInfoParser,
+    split_into_chunks,
+    write_thumbnails,
+)
+from transportstreamarchiver.scene.detector import FrameSize, score_frames, SIZE_ANALYSIS, THRESHOLD_DEFAULT
+from transportstreamarchiver.scene.index import SIZE_HEADER
+from transportstreamarchiver.scene.showinfo import parse_duration, PATTERN_PTS_TIME
+
+PATTERN_SCENE_SCORE = re.compile(r"lavfi\.scene_score=([\d.]+)")
+# Thresholds away from the scores of the scene changes in the fixture.
+THRESHOLDS_SELECT = [0.05, THRESHOLD_DEFAULT, 0.5]
+TOLERANCE_SCORE = 0.01
+LINE_SHOWINFO = (
+    "[Parsed_showinfo_2 @ 0x7f62b800f780] n:   1 pts:   1024 pts_time:0.1     duration:   1024 "
+    "duration_time:0.1     fmt:gray cl:left sar:3/4 s:32x18 i:P iskey:0 type:B checksum:BF9220EE"
+)
+
+
+def create_frames() -> np.ndarray:
+    frames = np.zeros((6, 4, 4), dtype=np.uint8)
+    frames[3:] = 200
+    # Small motion that is not a scene change.
+    frames[1, 0, 0] = 16
+    return frames
+
+
+def test_scene_scorer() -> None:
+    frames = create_frames()
+    scores = SceneScorer().update(frames)
+    assert scores[0] == 0
+    assert scores[3] == pytest.approx(1.0)
+    assert np.count_nonzero(scores > THRESHOLD_DEFAULT) == 1
+
+
+def test_scene_scorer_blocks() -> None:
+    """The scores don't depend on how the frames are split into blocks."""
+    frames = create_frames()
+    scorer = SceneScorer()
+    scores = np.concatenate([scorer.update(frames[:2]), scorer.update(frames[2:5]), scorer.update(frames[5:])])
+    np.testing.assert_allclose(scores, SceneScorer().update(frames))
+
+
+def test_scenes() -> None:
+    scores = np.array([0.0, 0.05, 0.5, 0.0, 0.2])
+    scenes = Scenes.create(scores, ["0", "0.1", "0.2", "0.3", "0.4"], "0.50", threshold=0.1)
+    assert scenes.times == ["0.2", "0.4"]
+    assert scenes.indices == [0, 1, 2]
+    assert scenes.to_list_time() == ["0", "0.2", "0.4", "0.50"]
+
+
+def test_parse_stderr() -> None:
+    match = PATTERN_PTS_TIME.search(LINE_SHOWINFO)
+    assert match is not None
+    assert match.group(1) == "0.1"
+    assert parse_duration("  Duration: 01:02:03.45, start: 1.400000, bitrate: 33 kb/s") == "3723.45"
+
+
+def test_show_info_parser() -> None:
+    list_progress: list[Progress] = []
+    parser = ShowInfoParser(callback_progress=list_progress.append, step_progress=50)
+    assert parser.parse("  Duration: 00:00:00.20, start: 0.000000, bitrate: 33 kb/s") is None
+    assert parser.parse(LINE_SHOWINFO.replace("pts_time:0.1 ", "pts_time:0 ")) == "0"
+    assert parser.parse(LINE_SHOWINFO) == "0.1"
+    assert parser.parse(LINE_SHOWINFO.replace("pts_time:0.1 ", "pts_time:0.15 ")) == "0.15"
+    assert parser.duration == "0.20"
+    assert [progress.percent for progress in list_progress] == [0, 50]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg is not installed")
+def test_detect_scenes(tmp_path: Path) -> None:
+    file = tmp_path / "scene.mp4"
+    stream_first = ffmpeg.input("testsrc=size=320x240:rate=10:duration=3", f="lavfi")
+    stream_second = ffmpeg.input("color=c=red:size=320x240:rate=10:duration=2", f="lavfi")
+    ffmpeg.output(ffmpeg.concat(stream_first, stream_second), str(file), loglevel="error").run()
+    file_log = tmp_path / "std_err.txt"
+    list_progress: list[Progress] = []
+    scenes = detect_scenes(file, callback_progress=list_progress.append, file_log=file_log)
+    assert scenes.to_list_time() == ["0", "3", "5.00"]
+    assert list(iterate_scenes(file)) == ["3"]
+    assert "showinfo" in file_log.read_text(encoding="utf-8")
+    assert list_progress[-1].percent == pytest.approx(98)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg is not installed")
+@pytest.mark.parametrize("step", [None, 4])
+def test_detect_scenes_fast(tmp_path: Path, step: Optional[int]) -> None:
+    file = tmp_path / "scene.mp4"
+    stream_first = ffmpeg.input("testsrc=size=320x240:rate=10:duration=3.3", f="lavfi")
+    stream_second = ffmpeg.input("color=c=red:size=320x240:rate=10:duration=2", f="lavfi")
+    # The scene doesn't change at key frame.
+    ffmpeg.output(
+        ffmpeg.concat(stream_first, stream_second),
+        str(file),
+        vcodec="libx264",
+        g=25,
+        sc_threshold=0,
+        loglevel="error",
+    ).run()
+    scenes = detect_scenes_fast(file, step=step)
+    assert scenes.to_list_time() == ["0", "3.300000", "5.30"]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg is not installed")
+def test_detect_scenes_fast_motion(tmp_path: Path) -> None:
+    file = tmp_path / "scene.mp4"
+    # Every frame differs from the previous one without scene change.
+    stream_noise = ffmpeg.input("nullsrc=size=320x240:rate=10:duration=3.3", f="lavfi").filter(
+        "geq",
+        lum="random(1)*255",
+        cb=128,
+        cr=128,
+    )
+    stream_second = ffmpeg.input("color=c=red:size=320x240:rate=10:duration=2", f="lavfi")
+    ffmpeg.output(
+        ffmpeg.concat(stream_noise, stream_second),
+        str(file),
+        vcodec="libx264",
+        g=25,
+        sc_threshold=0,
+        loglevel="error",
+    ).run()
+    # The second frame of the refined interval from the key frame at 2.5 seconds is not a scene change.
+    assert detect_scenes_fast(file).to_list_time() == ["0", "0.100000", "3.300000", "5.30"]
+    assert detect_scenes(file).to_list_time() == ["0", "0.1", "3.3", "5.30"]
+
+
+def test_split_into_chunks() -> None:
+    key_frame_times = np.arange(0, 10.5, 0.5)
+    assert split_into_chunks(key_frame_times, 4) == [0.0, 2.5, 5.0, 7.5]
+    assert split_into_chunks(key_frame_times, 1) == [0.0]
+    # Chunks never start at the same key frame.
+    assert split_into_chunks(np.array([0.0, 0.5]), 8) == [0.0, 0.5]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg is not installed")
+def test_detect_scenes_parallel(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file = tmp_path / "scene.mp4"
+    stream_first = ffmpeg.input("testsrc=size=320x240:rate=10:duration=3.3", f="lavfi")
+    stream_second = ffmpeg.input("color=c=red:size=320x240:rate=10:duration=2", f="lavfi")
+    ffmpeg.output(ffmpeg.concat(stream_first, stream_second), str(file), vcodec="libx264", g=5, loglevel="error").run()
+    # The packet index is not available for MP4 without FFprobe.
+    monkeypatch.setattr(parallel, "get_key_frame_times", lambda _file: np.arange(0, 5.3, 0.5))
+    scenes = detect_scenes_parallel(file, max_workers=2)
+    assert scenes.to_list_time() == ["0", "3.300000", "5.30"]
+
+
+def test_merge() -> None:
+    """The frame at the boundary is kept once even if the chunks round its timestamp differently."""
+    first = FrameScores(np.array([0.0, 0.1, 0.2]), ["0.000000", "0.033367", "0.066700"], "0.2")
+    second = FrameScores(np.array([0.2, 0.3]), ["0.066734", "0.100100"])
+    merged = parallel.merge([first, second])
+    assert merged.list_pts_time == ["0.000000", "0.033367", "0.066700", "0.100100"]
+    assert merged.scores.tolist() == [0.0, 0.1, 0.2, 0.3]
+    assert merged.duration == "0.2"
+
+
+@pytest.mark.parametrize("max_workers", [1, 2, 3, 5])
+def test_score_frames_parallel_same_as_single_pass(file_scenes: Path, max_workers: int) -> None:
+    """Each frame is scored once as in the single pass however the chunks are split."""
+    frame_scores = score_frames(file_scenes)
+    frame_scores_parallel = parallel.score_frames_parallel(file_scenes, max_workers=max_workers)
+    np.testing.assert_allclose(
+        np.array(frame_scores_parallel.list_pts_time, dtype=np.float64),
+        np.array(frame_scores.list_pts_time, dtype=np.float64),
+        atol=parallel.TOLERANCE,
+    )
+    np.testing.assert_allclose(frame_scores_parallel.scores, frame_scores.scores)
+    scenes = detect_scenes(file_scenes)
+    scenes_parallel = detect_scenes_parallel(file_scenes, max_workers=max_workers)
+    assert [float(time) for time in scenes_parallel.times] == pytest.approx([float(time) for time in scenes.times])
+
+
+def test_scene_score_index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    file = tmp_path / "input.ts"
+    file.write_bytes(b"\x47" * 188)
+    frame_scores = FrameScores(np.array([0.0, 0.05, 0.5, 0.0, 0.2]), ["0", "0.1", "0.2", "0.3", "0.4"], "0.50")
+    monkeypatch.setattr(index, "score_frames", lambda *_args, **_kwargs: frame_scores)
+    scene_score_index = SceneScoreIndex.load_or_build(file, max_workers=1)
+    monkeypatch.setattr(index, "score_frames", pytest.fail)
+    loaded = SceneScoreIndex.load(file)
+    assert loaded is not None
+    assert loaded.scores.tolist() == scene_score_index.scores.tolist()
+    assert loaded.to_scenes(0.1).to_list_time() == ["0", "0.200000", "0.400000", "0.500000"]
+    assert loaded.to_scenes(0.3).to_list_time() == ["0", "0.200000", "0.500000"]
+    assert loaded.count_scenes([0.01, 0.1, 0.3, 0.9]) == [4, 3, 2, 1]
+    # Another size of frames is another index.
+    assert SceneScoreIndex.load(file, size=FrameSize(320, 180)) is None
+
+
+@pytest.mark.parametrize("size", [0, SIZE_HEADER - 1, SIZE_HEADER + 8])
+def test_scene_score_index_broken(tmp_path: Path, size: int) -> None:
+    file = tmp_path / "input.ts"
+    file.write_bytes(b"\x47" * 188)
+    fingerprint = Fingerprint.create(file)
+    path = SceneScoreIndex.get_path(fingerprint, SIZE_ANALYSIS)
+    SceneScoreIndex([0.0, 0.1, 0.2], [0.0, 0.5, 0.0], 0.3).save(path, fingerprint, SIZE_ANALYSIS)
+    # Truncated sidecar is a cache miss.
+    path.write_bytes(path.read_bytes()[:size])
+    assert SceneScoreIndex.load(file) is None
+
+
+def probe_scene_scores(file: Path, file_scores: Path) -> npt.NDArray[np.float64]:
+    """The scores of all frames by the `select` filter of FFmpeg."""
+    stream = ffmpeg.input(str(file)).filter("select", "gte(scene,0)")
+    stream = stream.filter("metadata", "print", file=str(file_scores))
+    ffmpeg.output(stream, "-", f="null", loglevel="error").run()
+    text = file_scores.read_text(encoding="utf-8")
+    return np.array([float(score) for score in PATTERN_SCENE_SCORE.findall(text)])
+
+
+def test_scores_same_as_select(file_scenes: Path, tmp_path: Path) -> None:
+    frame_scores = score_frames(file_scenes)
+    expected = probe_scene_scores(file_scenes, tmp_path / "scores.txt")
+    # Only the downscale makes the difference.
+    np.testing.assert_allclose(frame_scores.scores, expected, atol=TOLERANCE_SCORE)
+    for threshold in THRESHOLDS_SELECT:
+        # The same frames as `select=gt(scene,threshold)`.
+        assert frame_scores.select(threshold) == [
+            frame_scores.list_pts_time[frame] for frame in np.flatnonzero(expected > threshold).tolist()
+        ]
+
+
+def test_write_thumbnails(file_scenes: Path, tmp_path: Path) -> None:
+    scenes = detect_scenes(file_scenes)
+    assert len(scenes) == len(SOURCES_SCENE)
+    # The thumbnail of the previous detection.
+    (tmp_path / f"{len(scenes):06d}.jpg").touch()
+    write_thumbnails(file_scenes, scenes, tmp_path)
+    assert sorted(file.name for file in tmp_path.glob("*.jpg")) == [f"{index:06d}.jpg" for index in scenes.indices]
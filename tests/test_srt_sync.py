@@ -0,0 +1,97 @@
+from fractions import Fraction
+from pathlib import Path
+
+import pytest
+
+from srt_sync import load, RemoveList, save, SrtSyncWrapper, Sub, Subs
+
+SUBRIP = """\
+1
+00:00:01,000 --> 00:00:02,500
+First
+
+2
+00:00:03,000 --> 00:00:04,000
+Removed
+
+3
+00:00:04,500 --> 00:00:06,000
+Second line 1
+Second line 2
+
+"""
+
+# 10 frames per second to make calculation easy.
+FRAME_RATE = Fraction(10)
+
+
+@pytest.mark.parametrize(
+    ("time", "expected"),
+    [
+        (1000, 1000),
+        # In removed period
+        (3000, 2000),
+        (3999, 2000),
+        # After removed period
+        (4000, 2000),
+        (6000, 4000),
+    ],
+)
+def test_map(time: int, expected: int) -> None:
+    remove_list = RemoveList([(2000, 4000)])
+    assert remove_list.map(time) == expected
+
+
+def test_merge_consecutive_frames() -> None:
+    remove_list = RemoveList(RemoveList.to_period(frames, FRAME_RATE) for frames in [(20, 20), (21, 29), (50, 59)])
+    assert remove_list.starts == [2000, 5000]
+    assert remove_list.ends == [3000, 6000]
+    assert remove_list.map(7000) == 7000 - (3000 - 2000) - (6000 - 5000)
+
+
+def test_iterate_frames() -> None:
+    lines = ["DelList v1\n", "30\n", "31\n", "40-49\n", "\n"]
+    assert list(RemoveList.iterate_frames(lines)) == [(30, 30), (31, 31), (40, 49)]
+
+
+def test_process(tmp_path: Path) -> None:
+    file_sub = tmp_path / "sub.srt"
+    file_sub.write_text(SUBRIP, encoding="utf-8")
+    file_remove_list = tmp_path / "remove_list.txt"
+    file_remove_list.write_text("DelList v1\n" + "".join(f"{frame}\n" for frame in range(89, 120)), encoding="utf-8")
+    file_sub_cut = tmp_path / "sub_cut.srt"
+    SrtSyncWrapper.process(file_sub, file_remove_list, file_sub_cut=file_sub_cut)
+    # Frame rate of the delete list is assumed as 29.97 fps.
+    assert list(load(file_sub_cut)) == [
+        Sub(1, 1000, 2500, "First\n"),
+        Sub(2, 3466, 4966, "Second line 1\nSecond line 2\n"),
+    ]
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    file_sub = tmp_path / "sub.srt"
+    file_sub.write_text(SUBRIP, encoding="utf-8")
+    file_saved = tmp_path / "saved.srt"
+    save(file_saved, load(file_sub))
+    assert file_saved.read_text(encoding="utf-8") == SUBRIP
+
+
+def test_shift_and_scale() -> None:
+    subs = Subs.create([(1000, 2000, "First"), (3000, 4000, "Second")])
+    subs.shift(-500)
+    subs.scale(2)
+    assert list(subs.starts) == [1000, 5000]
+    assert list(subs.ends) == [3000, 7000]
+
+
+@pytest.mark.parametrize("factor", [Fraction(1, 2), Fraction(25025, 25000), 0.5, 1.001])
+def test_scale_rounded_as_builtin(factor: float | Fraction) -> None:
+    times = list(range(0, 100_000, 7))
+    subs = Subs.create((time, time + 1, "Text") for time in times)
+    subs.scale(factor)
+    assert list(subs.starts) == [round(time * factor) for time in times]
+
+
+def test_clip() -> None:
+    subs = Subs.create([(1000, 2000, "First"), (3000, 4000, "Second"), (5000, 6000, "Third")])
+    assert list(subs.clip(1500, 3500)) == [Sub(1, 1500, 2000, "First\n"), Sub(2, 3000, 3500, "Second\n")]
@@ -0,0 +1,72 @@
+import os
+from pathlib import Path
+import sys
+
+import pytest
+
+from srt_sync import load, Sub
+from tests.test_srt_sync import SUBRIP
+from transportstreamarchiver.sync_sub import sync_sub_batch, SyncSubJob
+
+# Copies the subtitle instead of the video since the jobs run in child processes where monkeypatch doesn't reach:
+# the only input when exporting, the second input when importing.
+FAKE_FFMPEG = """\
+import shutil
+import sys
+
+arguments = sys.argv[1:]
+inputs = [arguments[index + 1] for index, argument in enumerate(arguments) if argument == "-i"]
+try:
+    shutil.copyfile(inputs[-1], arguments[-1])
+except FileNotFoundError:
+    sys.exit(1)
+"""
+
+
+@pytest.fixture
+def _fake_ffmpeg(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    directory = tmp_path / "bin"
+    directory.mkdir()
+    file_ffmpeg = directory / "ffmpeg"
+    file_ffmpeg.write_text(f"#!{sys.executable}\n{FAKE_FFMPEG}", encoding="utf-8")
+    file_ffmpeg.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{directory}{os.pathsep}{Path(sys.executable).parent}")
+
+
+def create_jobs(tmp_path: Path, count: int) -> list[SyncSubJob]:
+    file_remove_list = tmp_path / "remove_list.txt"
+    file_remove_list.write_text("DelList v1\n" + "".join(f"{frame}\n" for frame in range(89, 120)), encoding="utf-8")
+    jobs = []
+    for index in range(count):
+        ts_original = tmp_path / f"{index}.ts"
+        ts_original.write_text(SUBRIP, encoding="utf-8")
+        ts_cut = tmp_path / f"{index}_cut.ts"
+        ts_cut.touch()
+        jobs.append(SyncSubJob(ts_original, file_remove_list, ts_cut, tmp_path / f"{index}_synced.mp4"))
+    return jobs
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="The fake FFmpeg is a script with shebang")
+@pytest.mark.usefixtures("_fake_ffmpeg")
+def test_sync_sub_batch(tmp_path: Path) -> None:
+    jobs = create_jobs(tmp_path, 4)
+    results = sync_sub_batch(jobs, max_workers=2)
+    # In the order of jobs regardless of the order of completion.
+    assert [result.job for result in results] == jobs
+    assert [result.error for result in results] == [None] * 4
+    for job in jobs:
+        assert list(load(job.ts_synced)) == [
+            Sub(1, 1000, 2500, "First\n"),
+            Sub(2, 3466, 4966, "Second line 1\nSecond line 2\n"),
+        ]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="The fake FFmpeg is a script with shebang")
+@pytest.mark.usefixtures("_fake_ffmpeg")
+def test_sync_sub_batch_error(tmp_path: Path) -> None:
+    jobs = create_jobs(tmp_path, 3)
+    jobs[1].ts_original.unlink()
+    results = sync_sub_batch(jobs, max_workers=2)
+    assert [result.error for result in results] == [None, "FFmpegProcessError: Failed to export subtitle", None]
+    assert not jobs[1].ts_synced.exists()
+    assert jobs[2].ts_synced.exists()
@@ -0,0 +1,94 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from transportstreamarchiver.ffprobe import duration
+from transportstreamarchiver.ffprobe.key_frame import COUNT_HEAD, find_error_at_end, find_error_at_start
+from transportstreamarchiver.ffprobe.session import ProbeSession
+from transportstreamarchiver.ffprobe.verification import CutReport, parse, verify_cut
+
+SIZE_PACKET = 188
+COUNT_FRAME = 60
+
+
+def create_packets(start: int, count: int, *, position_base: int = 0) -> list[dict[str, Any]]:
+    """Video packets with a key frame every 15 frames, and audio packets between them."""
+    packets: list[dict[str, Any]] = []
+    for index in range(count):
+        position = position_base + index * SIZE_PACKET * 2
+        flags = "K__" if (start + index) % 15 == 0 else "___"
+        packets.append({"stream_index": 0, "pts": (start + index) * 3003, "pos": str(position), "flags": flags})
+        packets.append({"stream_index": 1, "pts": (start + index) * 3003, "pos": str(position + 188), "flags": "K__"})
+    return packets
+
+
+def create_result(packets: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "packets": packets,
+        "programs": [],
+        "streams": [
+            {"index": 0, "codec_type": "video", "time_base": "1/90000"},
+            {"index": 1, "codec_type": "audio", "time_base": "1/90000"},
+        ],
+    }
+
+
+def test_parse() -> None:
+    head = create_packets(0, COUNT_FRAME)
+    count_tail = 31
+    tail = create_packets(1755, count_tail, position_base=100_000_000)
+    # Leading frames of the last key frame in the order of decoding.
+    indices_leading = (1783, 1784)
+    for index in indices_leading:
+        position = str(100_000_000 + (index - 1752) * SIZE_PACKET * 2)
+        tail.append({"stream_index": 0, "pts": index * 3003, "pos": position, "flags": "___"})
+    probe = parse(create_result(head + tail), 60.0)
+    assert "packets" not in probe.metadata
+    assert len(probe.head) == COUNT_HEAD
+    assert probe.head[0] == ("0.000000", True)
+    # Packets in the head are not regarded as the tail.
+    assert len(probe.tail) == count_tail + len(indices_leading)
+    assert probe.tail[0] == (f"{1755 * 3003 / 90000:.6f}", True)
+    assert find_error_at_start(probe.head) is None
+    assert find_error_at_end(probe.tail) is None
+
+
+def test_parse_overlapped() -> None:
+    packets = create_packets(0, COUNT_FRAME)
+    # The tail interval reads the same packets again in case when the file is short.
+    probe = parse(create_result(packets + packets[60:]), 0.5)
+    assert len(probe.head) == COUNT_HEAD
+    assert len(probe.tail) == COUNT_FRAME
+
+
+def test_find_error_at_start() -> None:
+    list_is_key_frame = [(f"{index}", index % 15 == 1) for index in range(16)]
+    assert find_error_at_start(list_is_key_frame) == "First frame is not key frame"
+    assert find_error_at_start(list_is_key_frame[:3]) == "The number of frames is less than 16"
+
+
+def test_report() -> None:
+    report = CutReport(Path("output.ts"), error_metadata="Metadata is not preserved.")
+    assert not report.is_ok
+    assert report.errors == ["Metadata is not preserved."]
+    assert CutReport(Path("output.ts")).is_ok
+
+
+def test_verify_cut_missing(tmp_path: Path) -> None:
+    report = verify_cut(tmp_path / "input.ts", tmp_path / "output.ts", metadata_input={}, session=ProbeSession())
+    assert not report.is_ok
+    assert report.errors[0].startswith("FileNotFoundError: ")
+
+
+def test_verify_cut_empty(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def probe_duration(_file: Path) -> float:
+        # FFprobe prints N/A as the duration of the file which has no stream.
+        return float("N/A")
+
+    monkeypatch.setattr(duration, "probe_duration", probe_duration)
+    file_output = tmp_path / "output.ts"
+    file_output.touch()
+    report = verify_cut(tmp_path / "input.ts", file_output, metadata_input={}, session=ProbeSession())
+    assert not report.is_ok
+    assert report.errors[0].startswith("ValueError: could not convert string to float")
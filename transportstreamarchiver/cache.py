@@ -0,0 +1,147 @@
+"""Cache for the results of inspecting video files.
+
+The cache is keyed by the fingerprint of the file
+since the same recording may be moved or renamed while archiving.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
+import json
+import os
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+import threading
+import time
+from typing import Any
+
+__all__ = ["Fingerprint", "get_directory_cache", "JsonCache"]
+
+ENVIRONMENT_VARIABLE_DIRECTORY_CACHE = "TRANSPORT_STREAM_ARCHIVER_CACHE"
+# Size to read from the head and the tail of the file to calculate the fingerprint.
+SIZE_SAMPLE = 1024 * 1024
+# The number of entries to keep for each cache, every cut output adds an entry.
+MAX_SIZE_JSON_CACHE = 1024
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    size: int
+    mtime_ns: int
+    digest: str
+
+    @classmethod
+    def create(cls, file: Path) -> "Fingerprint":
+        stat = file.stat()
+        return cls._create(file.resolve(), stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def _create(cls, file: Path, size: int, mtime_ns: int) -> "Fingerprint":
+        """Hash only the head and the tail since the recording is too large to hash whole of it."""
+        hash_object = hashlib.blake2b(digest_size=16)
+        with file.open("rb") as stream:
+            hash_object.update(stream.read(SIZE_SAMPLE))
+            if size > SIZE_SAMPLE:
+                stream.seek(max(size - SIZE_SAMPLE, SIZE_SAMPLE))
+                hash_object.update(stream.read(SIZE_SAMPLE))
+        return cls(size, mtime_ns, hash_object.hexdigest())
+
+    def __str__(self) -> str:
+        return f"{self.size}-{self.mtime_ns}-{self.digest}"
+
+
+def get_directory_cache() -> Path:
+    directory = os.environ.get(ENVIRONMENT_VARIABLE_DIRECTORY_CACHE)
+    if directory:
+        return Path(directory)
+    directory_base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+    return (Path(directory_base) if directory_base else Path.home() / ".cache") / "transportstreamarchiver"
+
+
+class JsonCache:
+    """Persistent cache stored in a JSON file for each fingerprint with in-process memo on top of it.
+
+    The cache directory is resolved on each use rather than on construction,
+    so that the instance created at import time follows the environment variable set later.
+    Each update reads and writes only the file of the entry,
+    and the files updated least recently are removed beyond the max size.
+
+    Args:
+        name: Name of the directory of the files.
+        directory: Parent of the directory, the cache directory in default.
+        max_size: The number of entries to keep in the directory and in the memo.
+    """
+
+    def __init__(self, name: str, *, directory: Path | None = None, max_size: int = MAX_SIZE_JSON_CACHE) -> None:
+        self.name = name
+        self.directory = directory
+        self.max_size = max_size
+        # Keyed by the file of the entry, not to mix entries when the cache directory changes.
+        self.memo: OrderedDict[Path, Any] = OrderedDict()
+        # The threads of the same process update the same entry, for example, the queries of the same file.
+        self.lock = threading.Lock()
+
+    @property
+    def directory_entries(self) -> Path:
+        return (self.directory if self.directory else get_directory_cache()) / self.name
+
+    def get_path(self, file: Path) -> Path:
+        return self.directory_entries / f"{Fingerprint.create(file)}.json"
+
+    def get(self, file: Path) -> Any:
+        path = self.get_path(file)
+        with self.lock:
+            if path in self.memo:
+                self.memo.move_to_end(path)
+                return self.memo[path]
+            value = self.load(path)
+            if value is not None:
+                self.remember(path, value)
+            return value
+
+    def set(self, file: Path, value: Any) -> None:
+        path = self.get_path(file)
+        with self.lock:
+            self.write(path, value)
+
+    def update(self, file: Path, entries: dict[str, Any]) -> None:
+        """Merge the entries into the dictionary of the file, including the ones written by other processes."""
+        path = self.get_path(file)
+        with self.lock:
+            self.write(path, {**(self.load(path) or {}), **entries})
+
+    def write(self, path: Path, value: Any) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, suffix=".tmp", delete=False) as temporary:
+            json.dump(value, temporary)
+        # The time stamp of the file system is too coarse to order the updates in a row.
+        time_ns = time.time_ns()
+        os.utime(temporary.name, ns=(time_ns, time_ns))
+        Path(temporary.name).replace(path)
+        self.remember(path, value)
+        self.evict(path.parent)
+
+    def remember(self, path: Path, value: Any) -> None:
+        self.memo[path] = value
+        self.memo.move_to_end(path)
+        while len(self.memo) > self.max_size:
+            self.memo.popitem(last=False)
+
+    def evict(self, directory: Path) -> None:
+        # Counted without stat, which is needed only when the files exceed.
+        with os.scandir(directory) as iterator:
+            entries = [entry for entry in iterator if entry.name.endswith(".json")]
+        if len(entries) <= self.max_size:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[: len(entries) - self.max_size]:
+            Path(entry.path).unlink(missing_ok=True)
+
+    @staticmethod
+    def load(path: Path) -> Any:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
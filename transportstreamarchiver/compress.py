@@ -1,8 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+import json
+from logging import getLogger
+import math
+import os
 from pathlib import Path
-from typing import Optional
+import shutil
+from typing import Any, Optional
 
+import numpy as np
+import numpy.typing as npt
+
+from transportstreamarchiver.cache import Fingerprint
 from transportstreamarchiver import ffmpeg
+from transportstreamarchiver.ffmpeg.edit import PARAMETERS_ENCODE_VIDEO
 from transportstreamarchiver.ffmpeg.seek_range.factory import SeekRangeFactory
+from transportstreamarchiver.ffprobe.key_frame_index import KeyFrameIndex
+
+logger = getLogger(__name__)
+
+# Long enough to amortize the start up of x265 and the look ahead at the boundaries.
+SECONDS_CHUNK = 300
+# x265 scales up to around 4 threads per process on 1080i broadcast, more processes scale better.
+THREADS_PER_CHUNK = 4
+NAME_MANIFEST = "manifest.json"
+NAME_LIST = "list.txt"
+
+Chunk = tuple[timedelta, Optional[timedelta]]
+
+
+@dataclass
+class ChunkedOptions:
+    """Tuning of `compress_chunked()`.
+
+    Args:
+        seconds_chunk: The approximate length of each chunk.
+        max_workers: The number of FFmpeg processes at the same time, fill the CPUs with threads_per_chunk in default.
+        threads_per_chunk: The number of threads of each FFmpeg process.
+        keep_chunks: Keep the encoded chunks after success, for debugging.
+    """
+
+    seconds_chunk: float = SECONDS_CHUNK
+    max_workers: Optional[int] = None
+    threads_per_chunk: int = THREADS_PER_CHUNK
+    keep_chunks: bool = False
 
 
 def compress(
@@ -14,3 +56,163 @@ def compress(
 ) -> None:
     ffmpeg_seek_range = SeekRangeFactory.create(file_input, string_from=string_from, string_to=string_to)
     ffmpeg.compress(file_input, ffmpeg_seek_range, file_output)
+
+
+def cut_compress(
+    file_input: Path,
+    file_output: Path,
+    *,
+    string_from: Optional[str] = None,
+    string_to: Optional[str] = None,
+) -> None:
+    """The same as `cut()` followed by `compress()` without the intermediate file."""
+    ffmpeg_seek_range = SeekRangeFactory.create(file_input, string_from=string_from, string_to=string_to)
+    ffmpeg.cut_compress(file_input, ffmpeg_seek_range, file_output)
+
+
+def compress_chunked(
+    file_input: Path,
+    file_output: Path,
+    *,
+    string_from: Optional[str] = None,
+    string_to: Optional[str] = None,
+    options: Optional[ChunkedOptions] = None,
+) -> None:
+    """Compress in the same way as `compress()` by encoding chunks split at key frames at the same time.
+
+    Each chunk starts at a key frame so that the encoded chunks are joined by the concat demuxer without re-encoding,
+    then the audio and the subtitle are muxed from the input only once.
+    The encoded chunks are kept in `<file_output>.chunks` until the end,
+    so running again after interruption encodes only the rest of chunks.
+
+    Threads are enough since the work is done by FFmpeg processes.
+
+    Args:
+        file_input: Input file.
+        file_output: Output file.
+        string_from: The start of the range.
+        string_to: The end of the range.
+        options: Tuning of chunks and processes, the default values in default.
+    """
+    options = options or ChunkedOptions()
+    ffmpeg_seek_range = SeekRangeFactory.create(file_input, string_from=string_from, string_to=string_to)
+    key_frames = KeyFrameIndex.create(file_input).to_file_times(ffmpeg_seek_range.delta_offset)
+    start = ffmpeg_seek_range.ss or timedelta(0)
+    end = ffmpeg_seek_range.to
+    chunks = plan_chunks(key_frames, start, end, options.seconds_chunk)
+    directory = file_output.with_name(f"{file_output.name}.chunks")
+    prepare_directory(directory, create_manifest(file_input, start, end, chunks))
+    files_chunk = [directory / f"chunk-{index:05d}.mkv" for index in range(len(chunks))]
+    workers = options.max_workers or max(1, (os.cpu_count() or 1) // options.threads_per_chunk)
+    logger.info("Encode %d chunks by %d processes in %s", len(chunks), workers, directory)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(encode_chunk, file_input, chunk, file_chunk, options.threads_per_chunk)
+            for chunk, file_chunk in zip(chunks, files_chunk, strict=True)
+        ]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            # Fail fast, the encoded chunks remain to resume.
+            for future in futures:
+                future.cancel()
+            raise
+    file_list = directory / NAME_LIST
+    file_list.write_text(create_list(chunks, files_chunk), encoding="utf-8")
+    ffmpeg.concat_video(file_list, file_input, start, end, file_output)
+    if not options.keep_chunks:
+        shutil.rmtree(directory)
+
+
+def plan_chunks(
+    key_frames: npt.NDArray[np.float64],
+    start: timedelta,
+    end: Optional[timedelta],
+    seconds_chunk: float,
+) -> list[Chunk]:
+    """Split the range at the first key frame at or after each multiple of seconds_chunk from the start.
+
+    Args:
+        key_frames: Times of key frames relative to the start of the file.
+        start: The start of the range.
+        end: The end of the range, the end of the file if None.
+        seconds_chunk: The approximate length of each chunk.
+    """
+    if seconds_chunk <= 0:
+        msg = f"The length of chunk must be positive: {seconds_chunk}"
+        raise ValueError(msg)
+    seconds_start = start.total_seconds()
+    seconds_end = end.total_seconds() if end is not None else math.inf
+    inside = key_frames[(key_frames > seconds_start) & (key_frames < seconds_end)]
+    boundaries: list[timedelta] = []
+    seconds_next = seconds_start + seconds_chunk
+    for seconds in inside.tolist():
+        if seconds >= seconds_next:
+            # Round down not to exceed the key frame.
+            boundaries.append(timedelta(microseconds=math.floor(seconds * 1_000_000)))
+            seconds_next = seconds + seconds_chunk
+    starts = [start, *boundaries]
+    ends: list[Optional[timedelta]] = [*boundaries, end]
+    return list(zip(starts, ends, strict=True))
+
+
+def create_manifest(
+    file_input: Path,
+    start: timedelta,
+    end: Optional[timedelta],
+    chunks: list[Chunk],
+) -> dict[str, Any]:
+    return {
+        "fingerprint": str(Fingerprint.create(file_input)),
+        "start": start.total_seconds(),
+        "end": end.total_seconds() if end is not None else None,
+        "chunks": [
+            [chunk_start.total_seconds(), chunk_end.total_seconds() if chunk_end is not None else None]
+            for chunk_start, chunk_end in chunks
+        ],
+        "parameters": PARAMETERS_ENCODE_VIDEO,
+    }
+
+
+def prepare_directory(directory: Path, manifest: dict[str, Any]) -> None:
+    """Resume from the encoded chunks only when they are encoded from the same input in the same plan."""
+    file_manifest = directory / NAME_MANIFEST
+    if file_manifest.exists():
+        if json.loads(file_manifest.read_text(encoding="utf-8")) == manifest:
+            logger.info("Resume from %s", directory)
+            return
+        logger.info("Discard chunks encoded in the other plan: %s", directory)
+        shutil.rmtree(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    file_manifest.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+def encode_chunk(file_input: Path, chunk: Chunk, file_chunk: Path, threads: int) -> None:
+    if file_chunk.exists():
+        logger.debug("Skip encoded chunk: %s", file_chunk)
+        return
+    # Rename after encoding not to resume from the chunk interrupted while encoding.
+    file_part = file_chunk.with_suffix(f".part{file_chunk.suffix}")
+    ffmpeg.encode_video(file_input, *chunk, file_part, threads=threads)
+    file_part.replace(file_chunk)
+
+
+def create_list(chunks: list[Chunk], files_chunk: list[Path]) -> str:
+    """List for the concat demuxer with the duration of each chunk.
+
+    The concat demuxer places each file after the duration of the previous file,
+    which is one field longer than the chunk since the deinterlacer gives the last field the duration of the frame,
+    so the video would be delayed from the audio by the field at every boundary.
+    """
+    lines = []
+    for (start, end), file_chunk in zip(chunks, files_chunk, strict=True):
+        lines.append(f"file '{quote(file_chunk)}'\n")
+        if end is not None:
+            lines.append(f"duration {(end - start).total_seconds():.6f}\n")
+    return "".join(lines)
+
+
+def quote(file: Path) -> str:
+    """Quote for the list of the concat demuxer."""
+    return str(file.resolve()).replace("'", "'\\''")
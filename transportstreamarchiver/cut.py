@@ -1,8 +1,100 @@
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, ExitStack
+from dataclasses import dataclass
+from datetime import timedelta
+from logging import getLogger
+import os
 from pathlib import Path
+import threading
+import time
 from typing import Optional
 
+import numpy as np
+import numpy.typing as npt
+
 from transportstreamarchiver import ffmpeg, ffprobe
 from transportstreamarchiver.ffmpeg.seek_range.factory import SeekRangeFactory
+from transportstreamarchiver.ffmpeg.seek_range import SeekRange
+from transportstreamarchiver.ffprobe.key_frame_index import KeyFrameIndex
+
+logger = getLogger(__name__)
+
+# Remux is I/O bound, so too many processes on the same disk only cause seeks.
+MAX_WORKERS_PER_DISK = 2
+
+
+@dataclass
+class Segment:
+    file_output: Path
+    string_from: Optional[str] = None
+    string_to: Optional[str] = None
+
+
+@dataclass
+class CutJob:
+    file_input: Path
+    segment: Segment
+
+
+@dataclass
+class CutResult:
+    job: CutJob
+    seconds: float
+    size: int = 0
+    error: Optional[str] = None
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.seconds if self.seconds > 0 else 0.0
+
+
+class DiskLimiter:
+    """Limit the number of jobs that access the same disk at the same time.
+
+    Args:
+        max_workers_per_disk: The limit for each disk.
+        max_workers_by_disk: The limit for the disk that has the path, to override the default.
+    """
+
+    def __init__(
+        self,
+        max_workers_per_disk: int = MAX_WORKERS_PER_DISK,
+        *,
+        max_workers_by_disk: Optional[Mapping[Path, int]] = None,
+    ) -> None:
+        self.max_workers_per_disk = max_workers_per_disk
+        self.limits = {self.get_device(path): limit for path, limit in (max_workers_by_disk or {}).items()}
+        for limit in (max_workers_per_disk, *self.limits.values()):
+            if limit < 1:
+                msg = f"The number of workers must be positive: {limit}"
+                raise ValueError(msg)
+        self.semaphores: dict[int, threading.Semaphore] = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, *paths: Path) -> Iterator[None]:
+        # Acquire in the order of devices to prevent deadlock between jobs on the same pair of disks.
+        devices = sorted({self.get_device(path) for path in paths})
+        with ExitStack() as stack:
+            for device in devices:
+                stack.enter_context(self.get_semaphore(device))
+            yield
+
+    def get_semaphore(self, device: int) -> threading.Semaphore:
+        with self.lock:
+            if device not in self.semaphores:
+                limit = self.limits.get(device, self.max_workers_per_disk)
+                self.semaphores[device] = threading.Semaphore(limit)
+            return self.semaphores[device]
+
+    @staticmethod
+    def get_device(path: Path) -> int:
+        """The device of the file, or the one of the directory when the file doesn't exist yet."""
+        for each_path in (path, *path.parents):
+            if each_path.exists():
+                return each_path.stat().st_dev
+        return Path.cwd().stat().st_dev
 
 
 def cut(
@@ -11,7 +103,152 @@ def cut(
     *,
     string_from: Optional[str] = None,
     string_to: Optional[str] = None,
+    delta_offset: Optional[timedelta] = None,
 ) -> None:
-    ffmpeg_seek_range = SeekRangeFactory.create(file_input, string_from=string_from, string_to=string_to)
+    if delta_offset is None:
+        ffmpeg_seek_range = SeekRangeFactory.create(file_input, string_from=string_from, string_to=string_to)
+    else:
+        ffmpeg_seek_range = SeekRange(delta_offset, string_from=string_from, string_to=string_to)
     ffmpeg.cut(file_input, ffmpeg_seek_range, file_output)
     ffprobe.is_cut_by_key_frame_at_start(file_output)
+
+
+def cut_segments(file_input: Path, segments: Iterable[Segment]) -> None:
+    """Cut segments by single FFmpeg process that reads the input once.
+
+    The video of each segment starts from the key frame at or before its start,
+    so each segment is the same as the one `cut()` outputs from the time of that key frame.
+    """
+    list_segment = list(segments)
+    delta_offset = SeekRangeFactory.get_delta_offset(file_input)
+    list_seek_range = [
+        SeekRange(delta_offset, string_from=segment.string_from, string_to=segment.string_to)
+        for segment in list_segment
+    ]
+    list_ss = [seek_range.ss.total_seconds() for seek_range in list_seek_range if seek_range.ss is not None]
+    if list_ss:
+        # Unless the index has been stored, only the head until the last start is scanned
+        # instead of reading whole of the input before FFmpeg reads it.
+        key_frames = KeyFrameIndex.create(file_input, seconds=max(list_ss)).to_file_times(delta_offset)
+        for seek_range in list_seek_range:
+            snap_to_key_frame_at_or_before(seek_range, key_frames)
+    ffmpeg.cut_segments(
+        file_input,
+        [(seek_range, segment.file_output) for seek_range, segment in zip(list_seek_range, list_segment, strict=True)],
+    )
+    for segment in list_segment:
+        ffprobe.is_cut_by_key_frame_at_start(segment.file_output)
+
+
+def snap_to_key_frame_at_or_before(seek_range: SeekRange, key_frames: npt.NDArray[np.float64]) -> SeekRange:
+    """Move `ss` so that output-side `-ss` starts the video from the key frame at or before it.
+
+    Output-side `-ss` on stream copy drops the packets decoded before it
+    and starts the video from the first key frame it keeps.
+    The decoding time of the key frame is earlier than its presentation time by the reordering of frames,
+    so `ss` is moved to the middle between the key frame and the previous one.
+    The rest of the streams start from `ss`.
+
+    Args:
+        seek_range: Seek range relative to the start of the file.
+        key_frames: Times of key frames relative to the start of the file.
+    """
+    if seek_range.ss is None:
+        return seek_range
+    # Round in the same way as pts_time of FFprobe not to miss the key frame by the error in the last digit.
+    times = np.round(key_frames, 6)
+    index = int(np.searchsorted(times, round(seek_range.ss.total_seconds(), 6), side="right")) - 1
+    # The video starts from the first key frame without `ss`.
+    seek_range.ss = None if index <= 0 else timedelta(seconds=float(times[index - 1] + times[index]) / 2)
+    return seek_range
+
+
+def get_delta_offsets(files: Iterable[Path]) -> dict[Path, Optional[timedelta]]:
+    """The offset of each input, checked once before the jobs run at the same time.
+
+    Otherwise, the jobs that cut the same input check the offset at the same time,
+    and the ones for other than MPEG-TS write and remove the same intermediate file.
+    """
+    delta_offsets: dict[Path, Optional[timedelta]] = {}
+    for file in files:
+        if file in delta_offsets:
+            continue
+        try:
+            delta_offsets[file] = SeekRangeFactory.get_delta_offset(file)
+        # Reason: The job of the input reports the failure in the summary.
+        except Exception:  # noqa: BLE001
+            logger.debug("Failed to check offset: %s", file, exc_info=True)
+            delta_offsets[file] = None
+    return delta_offsets
+
+
+def run_job(job: CutJob, disk_limiter: DiskLimiter, delta_offset: Optional[timedelta] = None) -> CutResult:
+    with disk_limiter.acquire(job.file_input, job.segment.file_output):
+        time_start = time.perf_counter()
+        try:
+            cut(
+                job.file_input,
+                job.segment.file_output,
+                string_from=job.segment.string_from,
+                string_to=job.segment.string_to,
+                delta_offset=delta_offset,
+            )
+        # Reason: To continue the rest of jobs and report the failure in the summary.
+        except Exception as error:  # noqa: BLE001
+            return CutResult(job, time.perf_counter() - time_start, error=f"{type(error).__name__}: {error}")
+        return CutResult(job, time.perf_counter() - time_start, job.segment.file_output.stat().st_size)
+
+
+def cut_parallel(
+    jobs: Iterable[CutJob],
+    *,
+    max_workers: Optional[int] = None,
+    max_workers_per_disk: int = MAX_WORKERS_PER_DISK,
+    max_workers_by_disk: Optional[Mapping[Path, int]] = None,
+) -> list[CutResult]:
+    """Cut by multiple FFmpeg processes at the same time.
+
+    Threads are enough since the work is done by FFmpeg processes.
+
+    Args:
+        jobs: Jobs to cut.
+        max_workers: The number of jobs at the same time in total, the number of CPUs in default.
+        max_workers_per_disk: The number of jobs at the same time that read from or write into the same disk.
+        max_workers_by_disk: The number of jobs for the disk that has the path, to override the default.
+    """
+    list_job = list(jobs)
+    disk_limiter = DiskLimiter(max_workers_per_disk, max_workers_by_disk=max_workers_by_disk)
+    time_start = time.perf_counter()
+    delta_offsets = get_delta_offsets(job.file_input for job in list_job)
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = [executor.submit(run_job, job, disk_limiter, delta_offsets[job.file_input]) for job in list_job]
+        list_result = []
+        # Log in the order of jobs regardless of the order of completion.
+        for future in futures:
+            result = future.result()
+            logger.info("%s: %.1f sec %s", result.job.segment.file_output, result.seconds, result.error or "OK")
+            list_result.append(result)
+    log_summary(list_result, time.perf_counter() - time_start)
+    return list_result
+
+
+def log_summary(results: list[CutResult], seconds_wall: float) -> None:
+    list_failure = [result for result in results if result.error is not None]
+    size_total = sum(result.size for result in results)
+    logger.info(
+        "Summary: %d succeeded, %d failed, %.1f sec, %.1f MB/s",
+        len(results) - len(list_failure),
+        len(list_failure),
+        seconds_wall,
+        size_total / seconds_wall / 1_000_000 if seconds_wall > 0 else 0.0,
+    )
+    for result in results:
+        logger.info(
+            "%8.1f sec %8.1f MB/s %s %s",
+            result.seconds,
+            result.bytes_per_second / 1_000_000,
+            "NG" if result.error else "OK",
+            result.job.segment.file_output,
+        )
+    for result in list_failure:
+        logger.error("%s: %s", result.job.segment.file_output, result.error)
@@ -1,9 +1,11 @@
-from transportstreamarchiver.ffmpeg import edit, seek_range
+from transportstreamarchiver.ffmpeg import edit, progress, seek_range
 
 # Reason: To import all names from a submodule
 from transportstreamarchiver.ffmpeg.edit import *  # noqa: F401, F403, RUF100
+from transportstreamarchiver.ffmpeg.progress import *  # noqa: F401, F403, RUF100
 from transportstreamarchiver.ffmpeg.seek_range import *  # noqa: F401, F403, RUF100
 
 __all__: list[str] = []
 __all__ += seek_range.__all__
 __all__ += edit.__all__
+__all__ += progress.__all__
@@ -1,14 +1,33 @@
+from collections.abc import Sequence
+from datetime import timedelta
 from logging import getLogger
 from pathlib import Path
+from typing import Optional
 
+from transportstreamarchiver.ffmpeg.exceptions import FFmpegProcessError
 from transportstreamarchiver.ffmpeg.execution import execute_ffmpeg
 from transportstreamarchiver.ffmpeg.seek_range import SeekRange
 from transportstreamarchiver.ffprobe.metadata import get_dict_stream
+from transportstreamarchiver.ffprobe.session import ProbeSession
+from transportstreamarchiver.process import popen
 
-__all__ = ["cut", "compress", "export_subtitle", "import_subtitle"]
+__all__ = [
+    "concat_video",
+    "cut",
+    "cut_compress",
+    "cut_segments",
+    "compress",
+    "encode_video",
+    "export_subtitle",
+    "import_subtitle",
+]
 
 logger = getLogger(__name__)
 
+# Each output repeats the parameters to keep streams and metadata,
+# so hundreds of outputs exceed 32767 characters, the limit of the command line on Windows.
+MAX_OUTPUTS_PER_PROCESS = 32
+
 
 class ParameterBuilder:
     def __init__(self) -> None:
@@ -17,8 +36,8 @@ class ParameterBuilder:
         self.parameters_map_metadata: list[str] = []
         self.parameters_metadata: list[str] = []
 
-    def build(self, file_input: Path) -> None:
-        dict_stream = get_dict_stream(file_input)
+    def build(self, file_input: Path, *, session: Optional[ProbeSession] = None) -> None:
+        dict_stream = get_dict_stream(file_input, session=session)
         list_processed_program_id = []
         output_stream_index = 0
         for index, stream in dict_stream.items():
@@ -51,7 +70,82 @@ metadata = {self.parameters_metadata}
 """)
 
 
+PARAMETERS_ANALYZE = [
+    # To prevent following error:
+    # [mpegts @ 000001f37d4fecc0] sample rate not set
+    # [out#0/mpegts @ 000001f37afaa840] Could not write header (incorrect codec parameters ?): Invalid argument
+    # Conversion failed!
+    #
+    # The broadcasted stream tends to be poor samples to analyze.
+    # - Answer: ffmpeg not copying audio from concatenated VOB files. Says sample rate not set - Super User
+    #   https://superuser.com/a/1609481
+    # - ffmpegのオプション -analyzeduration と -probesize - 脳内メモ++
+    #   http://fftest33.blog.fc2.com/blog-entry-109.html
+    "-analyzeduration",
+    "100000G",
+    "-probesize",
+    "100000G",
+]
+
+
+def build_parameters_output(parameter_builder: ParameterBuilder) -> list[str]:
+    """Options for each output to keep streams, programs and metadata of the input."""
+    return [
+        # In default, only one stream is selected for each type and the rest of the streams are removed.
+        *parameter_builder.parameters_map,
+        # In case when recorded video around the time when switch audio track
+        # from single audio track to the one with sub audio,
+        # the audio track may be handled as invalid track.
+        # To remove useless track, set the following option:
+        # "-map",
+        # "-0:a:1",  # noqa: ERA001
+        *parameter_builder.parameters_create_stream,
+        "-c",
+        "copy",
+        # To copy data stream that FFmpeg doesn't recognize:
+        # - Answer: ffmpeg: Extract unknown data stream from video container - Stack Overflow
+        #   https://stackoverflow.com/a/63053691/12721873
+        "-copy_unknown",
+        # To fix gap between video and audio track if they are not synchronized.
+        "-async",
+        "1",
+        # To copy also metadata (this is not reliable):
+        # - Retrieving and Saving media metadata using FFmpeg - Stack Overflow
+        #   https://stackoverflow.com/questions/9464617/retrieving-and-saving-media-metadata-using-ffmpeg
+        *parameter_builder.parameters_map_metadata,
+        "-movflags",
+        "use_metadata_tags",
+        *parameter_builder.parameters_metadata,
+        # (Just in case) To prepare in case when need to use experimental features
+        "-strict",
+        "experimental",
+        # To fix timestamp in case when the video starts from negative timestamp.
+        "-avoid_negative_ts",
+        "make_non_negative",
+        "-y",
+        "-loglevel",
+        "verbose",
+        # The option `-copyts` is not used intentionally since `-copyts` has side effect
+        # to
+        # - ffmpeg Documentation
+        #   https://www.ffmpeg.org/ffmpeg-all.html
+        # > -dts_delta_threshold threshold
+        # > The timestamp discontinuity correction ... is automatically disabled
+        # > when employing the -copyts option (unless wrapping is detected).
+        # > If a timestamp discontinuity is detected whose absolute value is greater than threshold,
+        # > ffmpeg will remove the discontinuity by decreasing/increasing the current DTS and PTS
+        # > by the corresponding delta value.
+    ]
+
+
 def cut(file_input: Path, ffmpeg_seek_range: SeekRange, file_output: Path) -> None:
+    parameters = build_parameters_cut(file_input, ffmpeg_seek_range)
+    parameters.append(str(file_output))
+    execute_ffmpeg(parameters, "Failed to cut", file_output)
+
+
+def build_parameters_cut(file_input: Path, ffmpeg_seek_range: SeekRange) -> list[str]:
+    """Parameters of `cut()` except for the output."""
     if not file_input.exists():
         msg = f"{file_input} does not exist"
         raise FileNotFoundError(msg)
@@ -63,72 +157,84 @@ def cut(file_input: Path, ffmpeg_seek_range: SeekRange, file_output: Path) -> No
         parameters.extend(["-ss", f"{ffmpeg_seek_range.ss}"])
     if ffmpeg_seek_range.to is not None:
         parameters.extend(["-to", f"{ffmpeg_seek_range.to}"])
-    parameters.extend(
-        [
-            # To prevent following error:
-            # [mpegts @ 000001f37d4fecc0] sample rate not set
-            # [out#0/mpegts @ 000001f37afaa840] Could not write header (incorrect codec parameters ?): Invalid argument
-            # Conversion failed!
-            #
-            # The broadcasted stream tends to be poor samples to analyze.
-            # - Answer: ffmpeg not copying audio from concatenated VOB files. Says sample rate not set - Super User
-            #   https://superuser.com/a/1609481
-            # - ffmpegのオプション -analyzeduration と -probesize - 脳内メモ++
-            #   http://fftest33.blog.fc2.com/blog-entry-109.html
-            "-analyzeduration",
-            "100000G",
-            "-probesize",
-            "100000G",
-            "-i",
-            str(file_input),
-            # In default, only one stream is selected for each type and the rest of the streams are removed.
-            *parameter_builder.parameters_map,
-            # In case when recorded video around the time when switch audio track
-            # from single audio track to the one with sub audio,
-            # the audio track may be handled as invalid track.
-            # To remove useless track, set the following option:
-            # "-map",
-            # "-0:a:1",  # noqa: ERA001
-            *parameter_builder.parameters_create_stream,
-            "-c",
-            "copy",
-            # To copy data stream that FFmpeg doesn't recognize:
-            # - Answer: ffmpeg: Extract unknown data stream from video container - Stack Overflow
-            #   https://stackoverflow.com/a/63053691/12721873
-            "-copy_unknown",
-            # To fix gap between video and audio track if they are not synchronized.
-            "-async",
-            "1",
-            # To copy also metadata (this is not reliable):
-            # - Retrieving and Saving media metadata using FFmpeg - Stack Overflow
-            #   https://stackoverflow.com/questions/9464617/retrieving-and-saving-media-metadata-using-ffmpeg
-            *parameter_builder.parameters_map_metadata,
-            "-movflags",
-            "use_metadata_tags",
-            *parameter_builder.parameters_metadata,
-            # (Just in case) To prepare in case when need to use experimental features
-            "-strict",
-            "experimental",
-            # To fix timestamp in case when the video starts from negative timestamp.
-            "-avoid_negative_ts",
-            "make_non_negative",
-            "-y",
-            "-loglevel",
-            "verbose",
-            # The option `-copyts` is not used intentionally since `-copyts` has side effect
-            # to
-            # - ffmpeg Documentation
-            #   https://www.ffmpeg.org/ffmpeg-all.html
-            # > -dts_delta_threshold threshold
-            # > The timestamp discontinuity correction ... is automatically disabled
-            # > when employing the -copyts option (unless wrapping is detected).
-            # > If a timestamp discontinuity is detected whose absolute value is greater than threshold,
-            # > ffmpeg will remove the discontinuity by decreasing/increasing the current DTS and PTS
-            # > by the corresponding delta value.
-        ],
-    )
-    parameters.append(str(file_output))
-    execute_ffmpeg(parameters, "Failed to cut", file_output)
+    parameters.extend([*PARAMETERS_ANALYZE, "-i", str(file_input)])
+    parameters.extend(build_parameters_output(parameter_builder))
+    return parameters
+
+
+def cut_segments(
+    file_input: Path,
+    segments: Sequence[tuple[SeekRange, Path]],
+    *,
+    max_outputs: int = MAX_OUTPUTS_PER_PROCESS,
+) -> None:
+    """Cut multiple segments by single FFmpeg process for each batch so that the input is read once per batch.
+
+    Each segment is written into its own output with output-side `-ss` and `-to`.
+    Different from input-side `-ss` in `cut()`, output-side `-ss` on stream copy starts the video
+    from the first key frame decoded at or after it, so `ss` has to be moved before the key frame to start from.
+
+    Args:
+        file_input: Input file.
+        segments: Seek ranges and outputs.
+        max_outputs: The number of outputs of each FFmpeg process,
+                     to keep the command line within the limit of Windows and the number of open files.
+    """
+    if not file_input.exists():
+        msg = f"{file_input} does not exist"
+        raise FileNotFoundError(msg)
+    if not segments:
+        return
+    # To prevent to FFmpeg overwrite some metadata.
+    parameter_builder = ParameterBuilder()
+    parameter_builder.build(file_input)
+    parameters_output = build_parameters_output(parameter_builder)
+    for start in range(0, len(segments), max_outputs):
+        batch = segments[start : start + max_outputs]
+        execute_ffmpeg(
+            build_parameters_cut_segments(file_input, batch, parameters_output),
+            "Failed to cut",
+            *(file_output for _, file_output in batch),
+        )
+
+
+def build_parameters_cut_segments(
+    file_input: Path,
+    segments: Sequence[tuple[SeekRange, Path]],
+    parameters_output: list[str],
+) -> list[str]:
+    parameters = []
+    list_to = [seek_range.to for seek_range, _ in segments if seek_range.to is not None]
+    # To stop reading the input at the end of the last segment.
+    if len(list_to) == len(segments):
+        parameters.extend(["-to", f"{max(list_to)}"])
+    parameters.extend([*PARAMETERS_ANALYZE, "-i", str(file_input)])
+    for seek_range, file_output in segments:
+        if seek_range.ss is not None:
+            parameters.extend(["-ss", f"{seek_range.ss}"])
+        if seek_range.to is not None:
+            parameters.extend(["-to", f"{seek_range.to}"])
+        parameters.extend(parameters_output)
+        parameters.append(str(file_output))
+    return parameters
+
+
+PARAMETERS_ENCODE_VIDEO = [
+    "-c:v",
+    "libx265",
+    "-crf",
+    "22",
+    "-tag:v",
+    "hvc1",
+    "-vf",
+    "w3fdif",
+]
+PARAMETERS_SUBTITLE = [
+    "-c:s",
+    "mov_text",
+    "-metadata:s:s:0",
+    "language=jpn",
+]
 
 
 def compress(file_input: Path, ffmpeg_seek_range: SeekRange, file_output: Path) -> None:
@@ -144,29 +250,144 @@ def compress(file_input: Path, ffmpeg_seek_range: SeekRange, file_output: Path)
     # from the time: `to` to the end time of input file.
     if ffmpeg_seek_range.to is not None:
         parameters.extend(["-to", f"{ffmpeg_seek_range.to}"])
-    parameters.extend(
-        [
-            "-c:a",
-            "copy",
-            "-c:v",
-            "libx265",
-            "-crf",
-            "22",
-            "-tag:v",
-            "hvc1",
-            "-vf",
-            "w3fdif",
-            "-c:s",
-            "mov_text",
-            "-metadata:s:s:0",
-            "language=jpn",
-            "-y",
-            str(file_output),
-        ],
-    )
+    parameters.extend(["-c:a", "copy", *PARAMETERS_ENCODE_VIDEO, *PARAMETERS_SUBTITLE, "-y", str(file_output)])
     execute_ffmpeg(parameters, "Failed to cut", file_output)
 
 
+def cut_compress(file_input: Path, ffmpeg_seek_range: SeekRange, file_output: Path) -> None:
+    """Compress the output of `cut()` without writing it into the disk.
+
+    The upstream FFmpeg cuts in the same way as `cut()` and writes MPEG-TS into the pipe,
+    so the streams, programs and metadata mapped by `ParameterBuilder` are the same as the file `cut()` outputs.
+    The downstream FFmpeg compresses it in the same way as `compress()` for the whole of the input.
+    """
+    parameters_cut = build_parameters_cut(file_input, ffmpeg_seek_range)
+    # To prevent the upstream from reading the stdin shared with the downstream for the interaction.
+    # The upstream is not limited but counted as a pair with the downstream,
+    # otherwise, the upstreams of concurrent calls would take all slots while their downstreams wait.
+    process_cut = popen(["ffmpeg", "-nostdin", *parameters_cut, "-f", "mpegts", "pipe:1"], is_limited=False)
+    parameters_compress = [
+        "-fix_sub_duration",
+        "-f",
+        "mpegts",
+        "-i",
+        "pipe:0",
+        "-c:a",
+        "copy",
+        *PARAMETERS_ENCODE_VIDEO,
+        *PARAMETERS_SUBTITLE,
+        "-y",
+        str(file_output),
+    ]
+    try:
+        execute_ffmpeg(parameters_compress, "Failed to compress", file_output, stdin=process_cut.stdout)
+    except BaseException:
+        # The upstream may be blocked on the pipe that no one reads anymore.
+        process_cut.kill()
+        raise
+    finally:
+        if process_cut.stdout is not None:
+            process_cut.stdout.close()
+        return_code = process_cut.wait()
+    if return_code != 0:
+        # The downstream may have finished the output of the truncated stream successfully.
+        file_output.unlink(missing_ok=True)
+        msg = "Failed to cut"
+        raise FFmpegProcessError(msg)
+
+
+def build_parameters_input_range(start: timedelta, end: Optional[timedelta]) -> list[str]:
+    """Input-side seek by the start and the duration.
+
+    The duration is used instead of input-side `-to` since `-to` has been added `-ss` as offset.
+    """
+    parameters = ["-ss", f"{start}"]
+    if end is not None:
+        parameters.extend(["-t", f"{end - start}"])
+    return parameters
+
+
+def encode_video(
+    file_input: Path,
+    start: timedelta,
+    end: Optional[timedelta],
+    file_output: Path,
+    *,
+    threads: int,
+) -> None:
+    """Encode only the first video stream in the range in the same way as `compress()`.
+
+    Args:
+        file_input: Input file.
+        start: The start of the range relative to the start of the file, the key frame to split without gap.
+        end: The end of the range, exclusive, the end of the file if None.
+        file_output: Output file in the container that the concat demuxer can read, for example, Matroska.
+        threads: The number of threads for decoding, filtering and encoding, to run multiple processes.
+    """
+    parameters = [
+        "-filter_threads",
+        str(threads),
+        "-threads",
+        str(threads),
+        *build_parameters_input_range(start, end),
+        "-i",
+        str(file_input),
+        "-map",
+        "0:v:0",
+        *PARAMETERS_ENCODE_VIDEO,
+        "-threads",
+        str(threads),
+        "-x265-params",
+        f"pools={threads}",
+        "-y",
+        str(file_output),
+    ]
+    execute_ffmpeg(parameters, "Failed to encode", file_output)
+
+
+def concat_video(
+    file_list: Path,
+    file_input: Path,
+    start: timedelta,
+    end: Optional[timedelta],
+    file_output: Path,
+) -> None:
+    """Join the encoded videos listed for the concat demuxer without re-encoding.
+
+    The audio and the subtitle are taken from the original input in the same range,
+    so they are muxed only once without gaps at the boundaries of the videos.
+    """
+    parameters = [
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        str(file_list),
+        *build_parameters_input_range(start, end),
+        # `-fix_sub_duration` requires to set before `-i` to load ARIB caption from input file.
+        "-fix_sub_duration",
+        "-i",
+        str(file_input),
+        "-map",
+        "0:v:0",
+        "-map",
+        "1:a:0?",
+        "-map",
+        "1:s:0?",
+        "-c:v",
+        "copy",
+        "-tag:v",
+        "hvc1",
+        "-c:a",
+        "copy",
+        *PARAMETERS_SUBTITLE,
+        "-y",
+        str(file_output),
+    ]
+    execute_ffmpeg(parameters, "Failed to concat", file_output)
+
+
 def export_subtitle(file_input: Path, file_output: Path) -> None:
     parameters = [
         "-fix_sub_duration",
@@ -1,18 +1,80 @@
+import asyncio
+from collections.abc import Callable
 from logging import getLogger
-
-# Reason: Using subprocess is necessary to call FFmpeg.
 from pathlib import Path
-import subprocess  # nosec: B404
+from typing import IO, Optional, Union
 
 from transportstreamarchiver.ffmpeg.exceptions import FFmpegProcessError
+from transportstreamarchiver.ffmpeg.progress import dispatch, Progress, ProgressParser
+from transportstreamarchiver.process import run_async
+
+logger = getLogger(__name__)
+
+# The outputs that occupy the stdout, where `-progress` can't be written.
+OUTPUTS_STDOUT = ("-", "pipe:", "pipe:1")
+
 
+async def execute_ffmpeg_async(
+    parameters: list[str],
+    error_message: str,
+    *files_output: Path,
+    timeout: Optional[float] = None,
+    callback_progress: Optional[Callable[[Progress], None]] = None,
+    stdin: Union[int, IO[bytes], None] = None,
+) -> None:
+    """Run FFmpeg with the stderr inherited and check that all outputs exist.
 
-def execute_ffmpeg(parameters: list[str], error_message: str, file_output: Path) -> None:
-    command = ["ffmpeg"]
-    command.extend(parameters)
-    logger = getLogger(__name__)
-    logger.debug(" ".join(command))
-    # Reason: Confirmed that command isn't so risky.
-    return_code = subprocess.call(command)  # noqa: S603  # nosec: S607
-    if return_code != 0 or not file_output.exists():
+    Args:
+        parameters: Parameters of FFmpeg.
+        error_message: Message of the exception when failed.
+        files_output: Outputs that must exist after FFmpeg exits.
+        timeout: Seconds to kill FFmpeg, no limit in default.
+        callback_progress: Called with the progress in addition to the callbacks registered globally.
+        stdin: The stdin for `-i pipe:0`, nothing is read in default.
+    """
+    label = str(files_output[-1]) if files_output else error_message
+
+    def report(progress: Progress) -> None:
+        dispatch(progress, *([] if callback_progress is None else [callback_progress]))
+
+    parser = ProgressParser(label, report)
+    is_stdout_free = not any(parameter in OUTPUTS_STDOUT for parameter in parameters)
+    completed_process = await run_async(
+        ["ffmpeg", *(["-progress", "pipe:1"] if is_stdout_free else []), *parameters],
+        timeout=timeout,
+        capture_stdout=False,
+        capture_stderr=False,
+        callback_stdout=parser.parse if is_stdout_free else None,
+        stdin=stdin,
+    )
+    if parser.last is not None:
+        logger.info(
+            "%s: %.1f sec, %d frames, speed %sx, %.1f MB/s",
+            label,
+            parser.last.seconds,
+            parser.last.frame,
+            parser.last.speed,
+            parser.last.bytes_per_second / 1_000_000,
+        )
+    if completed_process.return_code != 0 or not all(file_output.exists() for file_output in files_output):
         raise FFmpegProcessError(error_message)
+
+
+def execute_ffmpeg(
+    parameters: list[str],
+    error_message: str,
+    *files_output: Path,
+    timeout: Optional[float] = None,
+    callback_progress: Optional[Callable[[Progress], None]] = None,
+    stdin: Union[int, IO[bytes], None] = None,
+) -> None:
+    asyncio.run(
+        execute_ffmpeg_async(
+            parameters,
+            error_message,
+            *files_output,
+            timeout=timeout,
+            callback_progress=callback_progress,
+            stdin=stdin,
+        ),
+    )
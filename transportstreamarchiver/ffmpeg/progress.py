@@ -0,0 +1,214 @@
+"""Progress of FFmpeg reported by `-progress pipe:1`.
+
+FFmpeg writes a block of `key=value` lines periodically and ends each block with `progress=continue`
+or `progress=end`, so each block is parsed into `Progress` and passed to the callbacks.
+Sinks to write JSON lines and the textfile for the Prometheus node exporter are built in,
+and they are enabled also by environment variables for the existing scripts.
+The textfile is written by each process, so set the environment variable to another file for each process.
+"""
+
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+import json
+from logging import getLogger
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Optional
+
+__all__ = [
+    "add_callback_progress",
+    "JsonLinesSink",
+    "Progress",
+    "PrometheusTextfileSink",
+    "remove_callback_progress",
+]
+
+logger = getLogger(__name__)
+
+ENVIRONMENT_VARIABLE_JSON_LINES = "TRANSPORT_STREAM_ARCHIVER_PROGRESS_JSON_LINES"
+ENVIRONMENT_VARIABLE_PROMETHEUS_TEXTFILE = "TRANSPORT_STREAM_ARCHIVER_PROGRESS_PROMETHEUS"
+PREFIX_METRIC = "transportstreamarchiver_ffmpeg"
+STATUS_END = "end"
+
+
+@dataclass
+class Progress:
+    """Snapshot of the progress of FFmpeg process."""
+
+    # To distinguish processes, the output file in default.
+    label: str
+    frame: int = 0
+    fps: float = 0.0
+    # Times of realtime, None until FFmpeg measures it.
+    speed: Optional[float] = None
+    # Seconds of the output written.
+    out_time: float = 0.0
+    # Bytes of the output written.
+    total_size: int = 0
+    # Seconds since the process started.
+    seconds: float = 0.0
+    # Unix time when the snapshot was taken.
+    timestamp: float = 0.0
+    status: str = "continue"
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.total_size / self.seconds if self.seconds > 0 else 0.0
+
+
+class ProgressParser:
+    """Parse lines of `-progress` into `Progress` block by block."""
+
+    def __init__(self, label: str, callback: Callable[[Progress], None]) -> None:
+        self.label = label
+        self.callback = callback
+        self.time_start = time.perf_counter()
+        self.values: dict[str, str] = {}
+        self.last: Optional[Progress] = None
+
+    def parse(self, line_bytes: bytes) -> None:
+        key, separator, value = line_bytes.decode("utf-8", errors="ignore").strip().partition("=")
+        if not separator:
+            return
+        if key != "progress":
+            self.values[key] = value.strip()
+            return
+        self.last = self.create(value)
+        self.values.clear()
+        self.callback(self.last)
+
+    def create(self, status: str) -> Progress:
+        return Progress(
+            self.label,
+            frame=int(self.values.get("frame", "0") or 0),
+            fps=to_float(self.values.get("fps")) or 0.0,
+            speed=to_float(self.values.get("speed", "").rstrip("x")),
+            # out_time_us is in microseconds despite the old name out_time_ms.
+            out_time=max((to_float(self.values.get("out_time_us")) or 0.0) / 1_000_000, 0.0),
+            total_size=int(to_float(self.values.get("total_size")) or 0),
+            seconds=time.perf_counter() - self.time_start,
+            timestamp=time.time(),
+            status=status,
+        )
+
+
+def to_float(value: Optional[str]) -> Optional[float]:
+    """FFmpeg reports `N/A` when the value is not available yet."""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class JsonLinesSink:
+    """Append each snapshot into the file as a line of JSON."""
+
+    def __init__(self, file: Path) -> None:
+        self.file = file
+        self.lock = threading.Lock()
+
+    def __call__(self, progress: Progress) -> None:
+        line = json.dumps(asdict(progress), ensure_ascii=False)
+        with self.lock, self.file.open("a", encoding="utf-8") as stream:
+            stream.write(f"{line}\n")
+
+
+class PrometheusTextfileSink:
+    """Write the latest snapshot of each process as gauges for the textfile collector of the node exporter.
+
+    The file is replaced atomically so that the collector never reads partially written file.
+    The file is rewritten from the snapshots in this process only,
+    so give each process its own file, otherwise, the processes overwrite the metrics of each other.
+    The final snapshot of the finished process is written once, then dropped not to grow in the long run,
+    `last_update_timestamp_seconds` which stops increasing tells the stuck process.
+    """
+
+    METRICS = (
+        ("frame", "Frames processed."),
+        ("fps", "Frames processed per second."),
+        ("speed", "Times of realtime."),
+        ("out_time_seconds", "Seconds of the output written."),
+        ("total_size_bytes", "Bytes of the output written."),
+        ("elapsed_seconds", "Seconds since the process started."),
+        ("last_update_timestamp_seconds", "Unix time of the last progress."),
+        ("finished", "1 when the process finished."),
+    )
+
+    def __init__(self, file: Path) -> None:
+        self.file = file
+        self.lock = threading.Lock()
+        self.latest: dict[str, Progress] = {}
+
+    def __call__(self, progress: Progress) -> None:
+        with self.lock:
+            self.latest[progress.label] = progress
+            text = self.render()
+            path_temporary = self.file.with_name(f"{self.file.name}.{os.getpid()}.tmp")
+            path_temporary.write_text(text, encoding="utf-8")
+            path_temporary.replace(self.file)
+            if progress.status == STATUS_END:
+                del self.latest[progress.label]
+
+    def render(self) -> str:
+        lines = []
+        for name, description in self.METRICS:
+            lines.append(f"# HELP {PREFIX_METRIC}_{name} {description}")
+            lines.append(f"# TYPE {PREFIX_METRIC}_{name} gauge")
+            for label, progress in sorted(self.latest.items()):
+                value = self.get_value(progress, name)
+                if value is not None:
+                    lines.append(f'{PREFIX_METRIC}_{name}{{output="{escape(label)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def get_value(progress: Progress, name: str) -> Optional[float]:
+        return {
+            "frame": progress.frame,
+            "fps": progress.fps,
+            "speed": progress.speed,
+            "out_time_seconds": progress.out_time,
+            "total_size_bytes": progress.total_size,
+            "elapsed_seconds": progress.seconds,
+            "last_update_timestamp_seconds": progress.timestamp,
+            "finished": 1 if progress.status == STATUS_END else 0,
+        }[name]
+
+
+def escape(label: str) -> str:
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+callbacks_progress: list[Callable[[Progress], None]] = []
+
+
+def add_callback_progress(callback: Callable[[Progress], None]) -> None:
+    """Register the callback to receive the progress of all FFmpeg processes."""
+    callbacks_progress.append(callback)
+
+
+def remove_callback_progress(callback: Callable[[Progress], None]) -> None:
+    callbacks_progress.remove(callback)
+
+
+def register_sinks_from_environment() -> None:
+    file_json_lines = os.environ.get(ENVIRONMENT_VARIABLE_JSON_LINES)
+    if file_json_lines:
+        add_callback_progress(JsonLinesSink(Path(file_json_lines)))
+    file_prometheus = os.environ.get(ENVIRONMENT_VARIABLE_PROMETHEUS_TEXTFILE)
+    if file_prometheus:
+        add_callback_progress(PrometheusTextfileSink(Path(file_prometheus)))
+
+
+def dispatch(progress: Progress, *callbacks: Callable[[Progress], None]) -> None:
+    """Report the progress to the callbacks given and the ones registered globally."""
+    for callback in (*callbacks, *callbacks_progress):
+        try:
+            callback(progress)
+        # Reason: Failure of metrics must not stop FFmpeg.
+        except Exception:  # noqa: BLE001
+            logger.warning("Failed to report progress", exc_info=True)
+
+
+register_sinks_from_environment()
@@ -1,9 +1,13 @@
-from transportstreamarchiver.ffprobe import key_frame, metadata
+from transportstreamarchiver.ffprobe import key_frame, metadata, session, verification
 
 # Reason: To import all names from a submodule
 from transportstreamarchiver.ffprobe.key_frame import *  # noqa: F401, F403, RUF100
 from transportstreamarchiver.ffprobe.metadata import *  # noqa: F401, F403, RUF100
+from transportstreamarchiver.ffprobe.session import *  # noqa: F401, F403, RUF100
+from transportstreamarchiver.ffprobe.verification import *  # noqa: F401, F403, RUF100
 
 __all__: list[str] = []
 __all__ += key_frame.__all__
 __all__ += metadata.__all__
+__all__ += session.__all__
+__all__ += verification.__all__
@@ -0,0 +1,109 @@
+"""Comparator of metadata trees that FFprobe outputs.
+
+The paths to exclude are compiled into a trie once,
+then each tree is flattened into a sorted tuple of leaves along the trie and compared directly.
+"""
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+__all__ = ["Difference", "Schema"]
+
+# Matches any key or index.
+WILDCARD = "*"
+# Marks that the path and the descendants are excluded.
+TERMINAL = None
+
+Key = str | int
+KeyPath = tuple[Key, ...]
+Trie = dict[Key | None, Any]
+
+
+@dataclass
+class Difference:
+    changed: dict[KeyPath, tuple[Any, Any]] = field(default_factory=dict)
+    removed: dict[KeyPath, Any] = field(default_factory=dict)
+    added: dict[KeyPath, Any] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.changed or self.removed or self.added)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "values_changed": {
+                to_string(path): {"old_value": old, "new_value": new} for path, (old, new) in self.changed.items()
+            },
+            "items_removed": {to_string(path): value for path, value in self.removed.items()},
+            "items_added": {to_string(path): value for path, value in self.added.items()},
+        }
+
+
+class Schema:
+    """Projection of metadata tree except for the excluded paths.
+
+    Args:
+        exclusions: Paths to exclude with their descendants,
+                    keys separated by `.`, digits for list indices, and `*` for any key or index.
+                    For example: `streams.*.index`, `programs.1`.
+    """
+
+    def __init__(self, exclusions: Iterable[str]) -> None:
+        self.trie: Trie = {}
+        for exclusion in exclusions:
+            node = self.trie
+            for key in exclusion.split("."):
+                node = node.setdefault(int(key) if key.isdigit() else key, {})
+            node[TERMINAL] = True
+
+    def flatten(self, tree: Any) -> tuple[tuple[KeyPath, Any], ...]:
+        """Leaves of the tree in the order of paths, empty containers are also regarded as leaves."""
+        return tuple(sorted(self.iterate_leaves(tree, (), [self.trie]), key=lambda leaf: to_sort_key(leaf[0])))
+
+    def iterate_leaves(self, tree: Any, path: KeyPath, nodes: list[Trie]) -> Iterator[tuple[KeyPath, Any]]:
+        if isinstance(tree, dict):
+            items: Iterable[tuple[Key, Any]] = tree.items()
+        elif isinstance(tree, list):
+            items = enumerate(tree)
+        else:
+            yield path, tree
+            return
+        if not tree:
+            yield path, type(tree)()
+            return
+        for key, value in items:
+            nodes_child = [
+                child for node in nodes for child in (node.get(key), node.get(WILDCARD)) if child is not None
+            ]
+            if any(TERMINAL in node for node in nodes_child):
+                continue
+            yield from self.iterate_leaves(value, (*path, key), nodes_child)
+
+    def compare(self, tree_old: Any, tree_new: Any) -> Difference:
+        """Compare the trees, the details are collected only when they differ."""
+        leaves_old = self.flatten(tree_old)
+        leaves_new = self.flatten(tree_new)
+        if leaves_old == leaves_new:
+            return Difference()
+        dictionary_old = dict(leaves_old)
+        dictionary_new = dict(leaves_new)
+        difference = Difference()
+        for path, value in dictionary_old.items():
+            if path not in dictionary_new:
+                difference.removed[path] = value
+            elif dictionary_new[path] != value:
+                difference.changed[path] = (value, dictionary_new[path])
+        for path, value in dictionary_new.items():
+            if path not in dictionary_old:
+                difference.added[path] = value
+        return difference
+
+
+def to_sort_key(path: KeyPath) -> tuple[tuple[int, Key], ...]:
+    # Indices are sorted numerically and before keys.
+    return tuple((0 if isinstance(key, int) else 1, key) for key in path)
+
+
+def to_string(path: KeyPath) -> str:
+    """Format in the same way as DeepDiff, for example: root['streams'][0]['index']."""
+    return "root" + "".join(f"[{key}]" if isinstance(key, int) else f"['{key}']" for key in path)
@@ -1,8 +1,21 @@
+import asyncio
 from pathlib import Path
-import subprocess
+from typing import Optional
 
+from transportstreamarchiver.ffprobe.execution import execute_ffprobe_async
+from transportstreamarchiver.ffprobe.session import get_default_session, ProbeSession
+from transportstreamarchiver.mpegts import MpegTsError, read_timestamps
 
-def get_duration(file_make_zero: Path) -> float:
+
+def get_duration(file_make_zero: Path, *, session: Optional[ProbeSession] = None) -> float:
+    return get_default_session(session).get("duration", file_make_zero, probe_duration, persistent=True)
+
+
+def probe_duration(file_make_zero: Path, *, timeout: Optional[float] = None) -> float:
+    return asyncio.run(probe_duration_async(file_make_zero, timeout=timeout))
+
+
+async def probe_duration_async(file_make_zero: Path, *, timeout: Optional[float] = None) -> float:
     """Check duration of video file.
 
     - Answer: ffmpeg - How to get video duration in seconds? - Super User
@@ -16,7 +29,15 @@ def get_duration(file_make_zero: Path) -> float:
         "-loglevel",
         "repeat+fatal",
     ]
-    command = ["ffprobe", *args, str(file_make_zero)]
-    # Reason: Confirmed that command isn't so risky.
-    completed_process = subprocess.run(command, text=True, capture_output=True, check=True)  # noqa: S603
-    return float(completed_process.stdout)
+    return float(await execute_ffprobe_async(args, file_make_zero, timeout=timeout))
+
+
+def get_duration_quickly(file: Path, *, session: Optional[ProbeSession] = None) -> float:
+    """Check duration of video file from the timestamps in the head and the tail without FFprobe process.
+
+    Falls back to FFprobe in case when the file is not MPEG-TS.
+    """
+    try:
+        return read_timestamps(file).duration
+    except MpegTsError:
+        return get_duration(file, session=session)
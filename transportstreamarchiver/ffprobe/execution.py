@@ -0,0 +1,25 @@
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+from transportstreamarchiver.ffprobe.exceptions import FFprobeProcessError
+from transportstreamarchiver.process import run_async
+
+
+async def execute_ffprobe_async(args: list[str], file: Path, *, timeout: Optional[float] = None) -> bytes:
+    """Run FFprobe and return the stdout.
+
+    Args:
+        args: Arguments of FFprobe before the file.
+        file: File to probe.
+        timeout: Seconds to kill FFprobe, no limit in default.
+    """
+    completed_process = await run_async(["ffprobe", *args, str(file)], timeout=timeout)
+    if completed_process.return_code != 0:
+        msg = f"Failed to probe: {file}\n{completed_process.stderr.decode('utf-8', errors='ignore')}"
+        raise FFprobeProcessError(msg)
+    return completed_process.stdout
+
+
+def execute_ffprobe(args: list[str], file: Path, *, timeout: Optional[float] = None) -> bytes:
+    return asyncio.run(execute_ffprobe_async(args, file, timeout=timeout))
@@ -0,0 +1,81 @@
+"""Index of key frames to snap many times to key frames at once."""
+
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from transportstreamarchiver.ffprobe.packet import FLAG_KEY
+from transportstreamarchiver.ffprobe.packet_index import PacketIndex
+
+__all__ = ["KeyFrameIndex"]
+
+
+class KeyFrameIndex:
+    """PTS time of key frames in seconds, sorted in ascending order."""
+
+    def __init__(self, pts_time: npt.ArrayLike) -> None:
+        self.pts_time: npt.NDArray[np.float64] = np.sort(np.asarray(pts_time, dtype=np.float64))
+        if self.pts_time.size == 0:
+            msg = "Key frame is not found"
+            raise ValueError(msg)
+
+    @classmethod
+    def create(cls, file: Path, *, seconds: Optional[float] = None) -> "KeyFrameIndex":
+        """Create from the index of packets.
+
+        Args:
+            file: File path.
+            seconds: Cover at least the seconds from the first video frame without building the whole index.
+        """
+        if seconds is None:
+            return cls.from_packet_index(PacketIndex.load_or_build(file))
+        return cls.from_packet_index(PacketIndex.load_or_scan_head(file, seconds))
+
+    @classmethod
+    def from_packet_index(cls, index: PacketIndex) -> "KeyFrameIndex":
+        pts = np.asarray(index.pts, dtype=np.int64)
+        is_key = (np.asarray(index.flags, dtype=np.uint8) & FLAG_KEY).astype(bool)
+        # Round in the same way as pts_time of FFprobe,
+        # otherwise, the time at the key frame may be snapped to the previous one by the error in the last digit.
+        return cls(np.round(pts[is_key] * float(index.time_base), 6))
+
+    def __len__(self) -> int:
+        return int(self.pts_time.size)
+
+    def snap_before(self, times: npt.ArrayLike) -> npt.NDArray[np.float64]:
+        """The last key frame strictly before each time, or the first key frame if there is no such frame."""
+        indices = np.searchsorted(self.pts_time, np.asarray(times, dtype=np.float64), side="left") - 1
+        return self.pts_time[np.clip(indices, 0, len(self) - 1)]
+
+    def snap_after(self, times: npt.ArrayLike, *, index_gap: int = 0) -> npt.NDArray[np.float64]:
+        """The last key frame at or before each time, shifted by index_gap key frames.
+
+        Args:
+            times: Times in seconds.
+            index_gap: The number of key frames to shift forward,
+                       to compensate the gap between the position FFprobe reports and the one FFmpeg seeks.
+        """
+        indices = np.searchsorted(self.pts_time, np.asarray(times, dtype=np.float64), side="right") - 1
+        indices = np.where(indices < 0, 0, np.minimum(indices + index_gap, len(self) - 1))
+        return self.pts_time[indices]
+
+    def to_file_times(self, delta_offset: timedelta) -> npt.NDArray[np.float64]:
+        """Times relative to the start of the file, the same timeline as `-ss` of FFmpeg.
+
+        Args:
+            delta_offset: The gap between the start of the file and the first video frame.
+        """
+        return self.pts_time - (float(self.pts_time[0]) - delta_offset.total_seconds())
+
+    def get_delta_accurate(self, delta: timedelta) -> list[timedelta]:
+        """The key frames just before, at or after, and next of the delta."""
+        index = int(np.searchsorted(self.pts_time, delta.total_seconds(), side="left"))
+        return [timedelta(seconds=float(self.pts_time[position])) for position in (index - 1, index, index + 1)]
+
+    @staticmethod
+    def to_strings(pts_time: npt.NDArray[np.float64]) -> list[str]:
+        """Format in the same way as pts_time of FFprobe."""
+        return [f"{value:.6f}" for value in pts_time.tolist()]
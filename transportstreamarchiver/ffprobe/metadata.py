@@ -1,35 +1,75 @@
+import asyncio
 from collections.abc import Callable
-from copy import deepcopy
 from dataclasses import dataclass
 import difflib
 import json
 from pathlib import Path
-import subprocess
 from textwrap import dedent
-from typing import Any
-
-from deepdiff import DeepDiff
+from typing import Any, Optional
 
+from transportstreamarchiver.ffprobe.comparator import Schema
 from transportstreamarchiver.ffprobe.exceptions import FFprobeProcessError
+from transportstreamarchiver.ffprobe.execution import execute_ffprobe_async
+from transportstreamarchiver.ffprobe.session import get_default_session, ProbeSession
+
+__all__ = ["is_preserving_metadata", "probe_metadata_async"]
+
+ENTRIES_METADATA = "program:stream:program_tags:stream_tags:format_tags"
+INDEX_PROGRAM_EMPTY = 1
+SCHEMA_CUT = Schema(
+    [
+        # The metadata that is changed by cut by FFmpeg.
+        "programs.*.pcr_pid",
+        "programs.*.streams.*.index",
+        "programs.*.streams.*.ts_id",
+        "programs.*.streams.*.id",
+        "programs.*.streams.*.start_pts",
+        "programs.*.streams.*.start_time",
+        "programs.*.streams.*.duration_ts",
+        "programs.*.streams.*.duration",
+        "programs.*.streams.*.bit_rate",
+        "streams.*.index",
+        "streams.*.ts_id",
+        "streams.*.id",
+        "streams.*.r_frame_rate",
+        "streams.*.avg_frame_rate",
+        "streams.*.start_pts",
+        "streams.*.start_time",
+        "streams.*.duration_ts",
+        "streams.*.duration",
+        "streams.*.bit_rate",
+        # Since FFmpeg can't create empty program.
+        f"programs.{INDEX_PROGRAM_EMPTY}",
+        # Since FFmpeg can't copy unrecognized codec.
+        "streams.0.codec_name",
+        "streams.0.codec_long_name",
+        "streams.0.codec_type",
+        # Since service_provider was empty.
+        "programs.0.tags.service_provider",
+    ],
+)
+
+
+def get_metadata(file: Path, *, session: Optional[ProbeSession] = None) -> Any:
+    return get_default_session(session).get("metadata", file, probe_metadata, persistent=True)
+
 
-__all__ = ["is_preserving_metadata"]
+def probe_metadata(file: Path, *, timeout: Optional[float] = None) -> Any:
+    return asyncio.run(probe_metadata_async(file, timeout=timeout))
 
 
-def get_metadata(file: Path) -> Any:
+async def probe_metadata_async(file: Path, *, timeout: Optional[float] = None) -> Any:
     # video - ffmpeg Cut a media preserving all streams but also all metadata, timecodes and everything else - Video Production Stack Exchange
     # https://video.stackexchange.com/a/34334
     args = [
         "-show_entries",
-        "program:stream:program_tags:stream_tags:format_tags",
+        ENTRIES_METADATA,
         "-output_format",
         "json",
         "-loglevel",
         "repeat+fatal",
     ]
-    command = ["ffprobe", *args, str(file)]
-    # Reason: Confirmed that command isn't so risky.
-    completed_process = subprocess.run(command, text=True, capture_output=True)  # noqa: S603
-    return json.loads(completed_process.stdout)
+    return json.loads(await execute_ffprobe_async(args, file, timeout=timeout))
 
 
 RED: Callable[[str], str] = lambda text: f"\u001b[31m{text}\033\u001b[0m"
@@ -60,58 +100,36 @@ def get_edits_string(old: str, new: str) -> str:
     return result
 
 
-def is_preserving_metadata(file_input: Path, file_output: Path) -> None:
-    metadata_input = get_metadata(file_input)
-    metadata_output = get_metadata(file_output)
+def is_preserving_metadata(file_input: Path, file_output: Path, *, session: Optional[ProbeSession] = None) -> None:
+    message = find_difference(get_metadata(file_input, session=session), get_metadata(file_output, session=session))
+    if message is not None:
+        raise FFprobeProcessError(message)
+
+
+def find_difference(metadata_input: Any, metadata_output: Any) -> Optional[str]:
+    """Compare metadata except for the items that are changed by cut.
+
+    Returns:
+        The human readable difference, or None if metadata is preserved.
+    """
     # Since FFmpeg doesn't preserve the order of streams even if we specify stream order by `-map` option.
     # The option `-program` might block to preserve the order of streams.
-    last_stream = metadata_output["streams"].pop(-1)
-    metadata_output["streams"].insert(0, last_stream)
-    index_program_empty = "1"
-    exclude_regex_paths = [
-        # The metadata that is changed by cut by FFmpeg.
-        r"root\['programs'\]\[\d+\]\['pcr_pid'\]",
-        r"root\['programs'\]\[\d+\]\['streams'\]\[\d+\]\['index'\]",
-        r"root\['programs'\]\[\d+\]\['streams'\]\[\d+\]\['ts_id'\]",
-        r"root\['programs'\]\[\d+\]\['streams'\]\[\d+\]\['id'\]",
-        r"root\['programs'\]\[\d+\]\['streams'\]\[\d+\]\['start_pts'\]",
-        r"root\['programs'\]\[\d+\]\['streams'\]\[\d+\]\['start_time'\]",
-        r"root\['programs'\]\[\d+\]\['streams'\]\[\d+\]\['duration_ts'\]",
-        r"root\['programs'\]\[\d+\]\['streams'\]\[\d+\]\['duration'\]",
-        r"root\['programs'\]\[\d+\]\['streams'\]\[\d+\]\['bit_rate'\]",
-        r"root\['streams'\]\[\d+\]\['index'\]",
-        r"root\['streams'\]\[\d+\]\['ts_id'\]",
-        r"root\['streams'\]\[\d+\]\['id'\]",
-        r"root\['streams'\]\[\d+\]\['r_frame_rate'\]",
-        r"root\['streams'\]\[\d+\]\['avg_frame_rate'\]",
-        r"root\['streams'\]\[\d+\]\['start_pts'\]",
-        r"root\['streams'\]\[\d+\]\['start_time'\]",
-        r"root\['streams'\]\[\d+\]\['duration_ts'\]",
-        r"root\['streams'\]\[\d+\]\['duration'\]",
-        r"root\['streams'\]\[\d+\]\['bit_rate'\]",
-        # Since FFmpeg can't create empty program.
-        rf"root\['programs'\]\[{index_program_empty}\]",
-        # Since FFmpeg can't copy unrecognized codec.
-        r"root\['streams'\]\[0\]\['codec_name'\]",
-        r"root\['streams'\]\[0\]\['codec_long_name'\]",
-        r"root\['streams'\]\[0\]\['codec_type'\]",
-        # Since service_provider was empty.
-        r"root\['programs'\]\[0\]\['tags'\]\['service_provider'\]",
-    ]
-    deep_diff = DeepDiff(metadata_input, metadata_output, exclude_regex_paths=exclude_regex_paths)
-    if not deep_diff:
-        return
+    # The metadata may be shared by ProbeSession, so it's not mutated.
+    streams = metadata_output["streams"]
+    metadata_output = {**metadata_output, "streams": [streams[-1], *streams[:-1]]}
+    difference = SCHEMA_CUT.compare(metadata_input, metadata_output)
+    if not difference:
+        return None
     metadata_input_string = json.dumps(metadata_input, indent=2, sort_keys=True)
     metadata_output_string = json.dumps(metadata_output, indent=2, sort_keys=True)
     human_readable_diff = get_edits_string(metadata_input_string, metadata_output_string)
-    msg = dedent(
+    return dedent(
         f"""
             Metadata is not preserved.
             {human_readable_diff}
-            {json.dumps(json.loads(deep_diff.to_json()), indent=2)}
+            {json.dumps(difference.to_dict(), indent=2)}
         """,
     )
-    raise FFprobeProcessError(msg)
 
 
 @dataclass
@@ -141,8 +159,8 @@ def create_program(program: dict[str, Any]) -> Program:
     return Program(program_id, stream_indices, tags)
 
 
-def get_dict_stream(file: Path) -> dict[int, Stream]:
-    metadata = get_metadata(file)
+def get_dict_stream(file: Path, *, session: Optional[ProbeSession] = None) -> dict[int, Stream]:
+    metadata = get_metadata(file, session=session)
     print(json.dumps(metadata, indent=2))
     programs = {stream["index"]: create_program(prog) for prog in metadata["programs"] for stream in prog["streams"]}
     streams = {
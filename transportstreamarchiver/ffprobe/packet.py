@@ -0,0 +1,172 @@
+"""Parser of packets that FFprobe outputs.
+
+The output of FFprobe for whole of packets in a 2-hour broadcast has hundreds of thousands lines,
+so it's read in large binary chunks and the columns are parsed in bulk into parallel typed arrays.
+"""
+
+from array import array
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from fractions import Fraction
+from itertools import product
+from logging import getLogger
+from pathlib import Path
+
+# Reason: Using subprocess is necessary to call FFprobe.
+import subprocess  # nosec: B404
+from typing import BinaryIO, Optional
+
+from transportstreamarchiver.ffprobe.duration import get_duration_quickly
+from transportstreamarchiver.ffprobe.session import ProbeSession
+from transportstreamarchiver.process import popen
+
+__all__ = ["iterate_packet_table", "PacketTable", "process_open", "read_packet_table"]
+
+logger = getLogger(__name__)
+
+# The order of columns follows the order FFprobe outputs, not the order of this option.
+ENTRIES_PACKET = "packet=pts,pos,flags:stream=time_base"
+COUNT_COLUMN_PACKET = 4
+SIZE_CHUNK = 1024 * 1024
+FLAG_KEY = 0x01
+FLAG_DISCARD = 0x02
+FLAG_CORRUPT = 0x04
+# FFprobe outputs flags as 3 characters, for example: "K__", "K_C".
+DICTIONARY_FLAG = {
+    "".join(characters).encode(): (FLAG_KEY if characters[0] == "K" else 0)
+    | (FLAG_DISCARD if characters[1] == "D" else 0)
+    | (FLAG_CORRUPT if characters[2] == "C" else 0)
+    for characters in product("K_", "D_", "C_")
+}
+NOT_AVAILABLE = b"N/A"
+# FFprobe follows the packet that has side data by an empty section of it, for example:
+# "packet,166020,7332,K__,side_data,\n\n"
+SECTION_SIDE_DATA = b",side_data,"
+
+
+@dataclass
+class PacketTable:
+    """PTS in ticks of time_base, byte positions (-1 when unknown) and flags as bitmask of packets."""
+
+    pts: "array[int]" = field(default_factory=lambda: array("q"))
+    positions: "array[int]" = field(default_factory=lambda: array("q"))
+    flags: "array[int]" = field(default_factory=lambda: array("B"))
+    time_base: Optional[Fraction] = None
+
+    def __len__(self) -> int:
+        return len(self.pts)
+
+    def extend(self, other: "PacketTable") -> None:
+        self.pts.extend(other.pts)
+        self.positions.extend(other.positions)
+        self.flags.extend(other.flags)
+        if other.time_base is not None:
+            self.time_base = other.time_base
+
+
+def process_open(
+    file_make_zero: Path,
+    *,
+    only_head: bool | None = None,
+    entries: str = ENTRIES_PACKET,
+    session: Optional[ProbeSession] = None,
+) -> subprocess.Popen[bytes]:
+    """Run FFprobe process for the first video stream.
+
+    Args:
+        file_make_zero: File path.
+        only_head: If True, read only the first 16 frames. If False, read only the last 0.7 seconds.
+        entries: Entries to show.
+        session: Session to memoize the duration.
+    """
+    args = [
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        entries,
+        "-output_format",
+        "csv",
+    ]
+    if only_head is True:
+        args.append("-read_intervals")
+        args.append("%+#16")
+    elif only_head is False:
+        duration = get_duration_quickly(file_make_zero, session=session) - 0.7
+        args.append("-read_intervals")
+        args.append(str(duration))
+    return popen(["ffprobe", *args, str(file_make_zero)])
+
+
+def iterate_packet_table(stream: BinaryIO, *, size_chunk: int = SIZE_CHUNK) -> Iterator[PacketTable]:
+    """Parse the CSV of `ENTRIES_PACKET` chunk by chunk for streaming consumers.
+
+    This reads until EOF, so no line remains in the buffer when the process exits.
+    """
+    leftover = b""
+    while chunk := stream.read(size_chunk):
+        # May '\r' in case when .ts renamed from .m2ts, or FFprobe runs on Windows.
+        block = (leftover + chunk).replace(b"\r", b"")
+        index_last_line = block.rfind(b"\n") + 1
+        leftover = block[index_last_line:]
+        yield parse_block(block[:index_last_line])
+    if leftover:
+        yield parse_block(leftover)
+
+
+def read_packet_table(stream: BinaryIO, *, size_chunk: int = SIZE_CHUNK) -> PacketTable:
+    table = PacketTable()
+    for each_table in iterate_packet_table(stream, size_chunk=size_chunk):
+        table.extend(each_table)
+    return table
+
+
+def parse_block(block: bytes) -> PacketTable:
+    """Parse complete lines."""
+    table = PacketTable()
+    block = block.replace(SECTION_SIDE_DATA, b"").replace(b"\n\n", b"\n")
+    # FFprobe outputs streams after all packets.
+    index_stream = block.find(b"stream,")
+    if index_stream != -1:
+        for line in block[index_stream:].splitlines():
+            if line.startswith(b"stream,"):
+                table.time_base = Fraction(line.split(b",")[1].decode())
+        block = block[:index_stream]
+    block = block.strip(b"\n")
+    if not block:
+        return table
+    count_line = block.count(b"\n") + 1
+    columns = block.replace(b"\n", b",").split(b",")
+    if (
+        len(columns) != count_line * COUNT_COLUMN_PACKET
+        or columns[0::COUNT_COLUMN_PACKET].count(b"packet") != count_line
+        or NOT_AVAILABLE in columns
+    ):
+        # Slow path for the lines that lack some column.
+        return parse_lines_one_by_one(block.split(b"\n"), table)
+    table.pts = array("q", map(int, columns[1::COUNT_COLUMN_PACKET]))
+    table.positions = array("q", map(int, columns[2::COUNT_COLUMN_PACKET]))
+    list_flags = columns[3::COUNT_COLUMN_PACKET]
+    try:
+        table.flags = array("B", map(DICTIONARY_FLAG.__getitem__, list_flags))
+    except KeyError:
+        table.flags = array("B", map(get_flag, list_flags))
+    return table
+
+
+def parse_lines_one_by_one(lines_packet: list[bytes], table: PacketTable) -> PacketTable:
+    for line in lines_packet:
+        columns = line.split(b",")
+        if len(columns) != COUNT_COLUMN_PACKET or columns[0] != b"packet" or columns[1] == NOT_AVAILABLE:
+            continue
+        table.pts.append(int(columns[1]))
+        table.positions.append(int(columns[2]) if columns[2] != NOT_AVAILABLE else -1)
+        table.flags.append(get_flag(columns[3]))
+    return table
+
+
+def get_flag(flags: bytes) -> int:
+    flag = DICTIONARY_FLAG.get(flags)
+    return flag if flag is not None else (FLAG_KEY if flags.startswith(b"K") else 0)
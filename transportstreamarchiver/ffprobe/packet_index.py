@@ -0,0 +1,237 @@
+"""Persistent index of video packets.
+
+Scanning whole of packets in a 2-hour broadcast takes long time,
+so the result is stored as binary sidecar in the cache directory and memory-mapped on load.
+The sidecar is named by the fingerprint of the source file, so it's invalidated when the source file changes.
+
+Layout of the sidecar (little endian):
+
+- header: magic, size, mtime_ns, digest, time_base numerator, time_base denominator, count of packets
+- pts: int64 x count
+- positions: int64 x count (-1 when unknown)
+- flags: uint8 x count
+"""
+
+from array import array
+from collections.abc import Sequence
+from collections import OrderedDict
+from datetime import timedelta
+from fractions import Fraction
+from logging import getLogger
+import mmap
+from pathlib import Path
+import struct
+import threading
+from typing import ClassVar, Optional
+
+import numpy as np
+
+from transportstreamarchiver.cache import Fingerprint, get_directory_cache
+from transportstreamarchiver.ffprobe.exceptions import FFprobeProcessError
+from transportstreamarchiver.ffprobe.packet import FLAG_KEY, process_open, read_packet_table
+from transportstreamarchiver.ffprobe.session import ProbeSession
+from transportstreamarchiver.mpegts.exceptions import MpegTsError
+from transportstreamarchiver.mpegts.scanner import scan_video
+
+__all__ = ["PacketIndex"]
+
+logger = getLogger(__name__)
+
+MAGIC = b"TSAPIDX1"
+# 64 bytes to align following arrays.
+FORMAT_HEADER = "<8sqq16sqqq"
+SIZE_HEADER = struct.calcsize(FORMAT_HEADER)
+# Bytes of pts, position and flags of each packet.
+SIZE_PER_PACKET = 8 + 8 + 1
+MAX_SIZE_MEMO = 16
+
+
+class PacketIndex:
+    """PTS, flags and byte positions of video packets in the order of packets."""
+
+    # In-process memo keyed by fingerprint with LRU eviction.
+    memo: ClassVar[OrderedDict[Fingerprint, "PacketIndex"]] = OrderedDict()
+    lock_memo: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(
+        self,
+        pts: Sequence[int],
+        positions: Sequence[int],
+        flags: Sequence[int],
+        time_base: Fraction,
+    ) -> None:
+        self.pts = pts
+        self.positions = positions
+        self.flags = flags
+        self.time_base = time_base
+
+    def __len__(self) -> int:
+        return len(self.pts)
+
+    @classmethod
+    def load_or_build(cls, file: Path) -> "PacketIndex":
+        index = cls.load(file)
+        if index is not None:
+            return index
+        index = cls.build(file)
+        fingerprint = Fingerprint.create(file)
+        index.save(cls.get_path(fingerprint), fingerprint)
+        cls.remember(fingerprint, index)
+        return index
+
+    @classmethod
+    def load_or_scan_head(cls, file: Path, seconds: float) -> "PacketIndex":
+        """The stored index, otherwise, scan only the head of MPEG-TS without storing it.
+
+        To start processing the head without reading whole of the file in advance.
+        Other than MPEG-TS, the whole index is probed and stored since FFprobe can't stop in the middle.
+
+        Args:
+            file: File path.
+            seconds: The seconds from the first video packet that the index has to cover at least.
+        """
+        index = cls.load(file)
+        if index is not None:
+            return index
+        try:
+            return cls.scan(file, seconds=seconds)
+        except MpegTsError:
+            logger.debug("Failed to scan as MPEG-TS, fall back to FFprobe: %s", file, exc_info=True)
+        index = cls.probe(file)
+        fingerprint = Fingerprint.create(file)
+        index.save(cls.get_path(fingerprint), fingerprint)
+        cls.remember(fingerprint, index)
+        return index
+
+    @classmethod
+    def load(cls, file: Path) -> Optional["PacketIndex"]:
+        """Load the index only when it has already been built."""
+        fingerprint = Fingerprint.create(file)
+        with cls.lock_memo:
+            if fingerprint in cls.memo:
+                cls.memo.move_to_end(fingerprint)
+                return cls.memo[fingerprint]
+        path = cls.get_path(fingerprint)
+        if not path.exists():
+            return None
+        try:
+            with path.open("rb") as stream:
+                mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, size, mtime_ns, digest, numerator, denominator, count = struct.unpack_from(FORMAT_HEADER, mapped)
+        # The sidecar may be empty or truncated, for example, by the disk full or the interrupted copy of the cache.
+        except (ValueError, struct.error):
+            logger.warning("Ignore broken index: %s", path)
+            return None
+        if (
+            magic != MAGIC
+            or Fingerprint(size, mtime_ns, digest.hex()) != fingerprint
+            or len(mapped) < SIZE_HEADER + count * SIZE_PER_PACKET
+        ):
+            logger.warning("Ignore invalid index: %s", path)
+            return None
+        view = memoryview(mapped)
+        offset_positions = SIZE_HEADER + count * 8
+        offset_flags = offset_positions + count * 8
+        index = cls(
+            view[SIZE_HEADER:offset_positions].cast("q"),
+            view[offset_positions:offset_flags].cast("q"),
+            view[offset_flags : offset_flags + count],
+            Fraction(numerator, denominator),
+        )
+        cls.remember(fingerprint, index)
+        return index
+
+    @classmethod
+    def remember(cls, fingerprint: Fingerprint, index: "PacketIndex") -> None:
+        with cls.lock_memo:
+            cls.memo[fingerprint] = index
+            cls.memo.move_to_end(fingerprint)
+            while len(cls.memo) > MAX_SIZE_MEMO:
+                cls.memo.popitem(last=False)
+
+    @classmethod
+    def build(cls, file: Path) -> "PacketIndex":
+        """Scan MPEG-TS natively since it's several times faster than FFprobe, otherwise, probe by FFprobe."""
+        try:
+            return cls.scan(file)
+        except MpegTsError:
+            logger.debug("Failed to scan as MPEG-TS, fall back to FFprobe: %s", file, exc_info=True)
+        return cls.probe(file)
+
+    @classmethod
+    def scan(cls, file: Path, *, seconds: Optional[float] = None) -> "PacketIndex":
+        video_packets = scan_video(file, seconds=seconds)
+        flags = np.where(video_packets.is_key, FLAG_KEY, 0).astype(np.uint8)
+        return cls(
+            array("q", video_packets.pts.tobytes()),
+            array("q", video_packets.positions.tobytes()),
+            array("B", flags.tobytes()),
+            video_packets.time_base,
+        )
+
+    @classmethod
+    def probe(
+        cls,
+        file: Path,
+        *,
+        only_head: bool | None = None,
+        session: Optional[ProbeSession] = None,
+    ) -> "PacketIndex":
+        """Probe packets without storing the index.
+
+        Args:
+            file: File path.
+            only_head: If True, probe only the head. If False, probe only the tail.
+            session: Session to memoize the duration.
+        """
+        if not file.exists():
+            msg = f"{file} does not exist"
+            raise FileNotFoundError(msg)
+        with process_open(file, only_head=only_head, session=session) as process:
+            # Reason: The stdout is piped.
+            table = read_packet_table(process.stdout)  # type: ignore[arg-type]
+        if process.returncode != 0 or table.time_base is None:
+            msg = f"Failed to probe packets: {file}"
+            raise FFprobeProcessError(msg)
+        return cls(table.pts, table.positions, table.flags, table.time_base)
+
+    def save(self, path: Path, fingerprint: Fingerprint) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path_temporary = path.with_suffix(".tmp")
+        with path_temporary.open("wb") as stream:
+            stream.write(
+                struct.pack(
+                    FORMAT_HEADER,
+                    MAGIC,
+                    fingerprint.size,
+                    fingerprint.mtime_ns,
+                    bytes.fromhex(fingerprint.digest),
+                    self.time_base.numerator,
+                    self.time_base.denominator,
+                    len(self),
+                ),
+            )
+            stream.write(array("q", self.pts).tobytes())
+            stream.write(array("q", self.positions).tobytes())
+            stream.write(array("B", self.flags).tobytes())
+        path_temporary.replace(path)
+
+    @staticmethod
+    def get_path(fingerprint: Fingerprint) -> Path:
+        return get_directory_cache() / "packet_index" / f"{fingerprint}.idx"
+
+    def is_key(self, index: int) -> bool:
+        return bool(self.flags[index] & FLAG_KEY)
+
+    def to_seconds(self, pts: int) -> float:
+        return float(pts * self.time_base)
+
+    def to_timedelta(self, pts: int) -> timedelta:
+        return timedelta(microseconds=round(pts * self.time_base * 1_000_000))
+
+    def to_string(self, pts: int) -> str:
+        """Format in the same way as pts_time of FFprobe."""
+        return f"{self.to_seconds(pts):.6f}"
+
+    def list_pts_key_frame(self) -> list[int]:
+        return [pts for pts, flag in zip(self.pts, self.flags, strict=True) if flag & FLAG_KEY]
@@ -0,0 +1,120 @@
+"""Session to memoize the results of FFprobe.
+
+The same source file is probed many times in one run: for mapping streams to cut,
+for verifying metadata of each output and for reading duration.
+The session memoizes every query keyed by the query, the path and the fingerprint of the file,
+so the result is reused until the file changes.
+"""
+
+from collections.abc import Callable
+from collections import OrderedDict
+from logging import getLogger
+from pathlib import Path
+import threading
+from typing import Any, Optional, TypeVar
+
+from transportstreamarchiver.cache import Fingerprint, JsonCache
+
+__all__ = ["get_default_session", "ProbeSession"]
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+MAX_SIZE = 256
+
+
+class ProbeSession:
+    """Memoize the results of FFprobe with LRU eviction.
+
+    The results are shared among the callers, so don't mutate them.
+
+    Args:
+        max_size: The number of results to keep in memory.
+        cache: On-disk tier for the results that can be serialized into JSON.
+    """
+
+    def __init__(self, *, max_size: int = MAX_SIZE, cache: Optional[JsonCache] = None) -> None:
+        self.max_size = max_size
+        self.cache = cache
+        self.memo: OrderedDict[tuple[str, str, Fingerprint], Any] = OrderedDict()
+        # Set when the first caller finishes probing, for the concurrent callers of the same key to wait for it.
+        self.in_flight: dict[tuple[str, str, Fingerprint], threading.Event] = {}
+        self.lock = threading.Lock()
+        self.count_hit = 0
+        self.count_miss = 0
+
+    def get(self, query: str, file: Path, probe: Callable[[Path], T], *, persistent: bool = False) -> T:
+        """Get the result of the query, probe only when it's not memoized.
+
+        The concurrent callers of the same query wait for the first one instead of probing again.
+
+        Args:
+            query: Name of the query, including the arguments which change the result.
+            file: File to probe.
+            probe: Function to probe the file.
+            persistent: Whether to store the result into the on-disk tier, the result must be JSON serializable.
+        """
+        key = (query, str(file.resolve()), Fingerprint.create(file))
+        while True:
+            with self.lock:
+                if key in self.memo:
+                    self.memo.move_to_end(key)
+                    self.count_hit += 1
+                    return self.memo[key]  # type: ignore[no-any-return]
+                event = self.in_flight.get(key)
+                if event is None:
+                    self.in_flight[key] = threading.Event()
+                    break
+            # Probes by itself in the next loop in case when the first caller failed.
+            event.wait()
+        try:
+            return self.fetch(key, file, probe, persistent=persistent)
+        finally:
+            with self.lock:
+                self.in_flight.pop(key).set()
+
+    def fetch(
+        self,
+        key: tuple[str, str, Fingerprint],
+        file: Path,
+        probe: Callable[[Path], T],
+        *,
+        persistent: bool,
+    ) -> T:
+        """Load the result from the on-disk tier, otherwise, probe the file."""
+        query = key[0]
+        if persistent and self.cache is not None:
+            entries = self.cache.get(file) or {}
+            if query in entries:
+                self.put(key, entries[query], is_hit=True)
+                return entries[query]  # type: ignore[no-any-return]
+        logger.debug("Probe %s: %s", query, file)
+        value = probe(file)
+        self.put(key, value, is_hit=False)
+        if persistent and self.cache is not None:
+            self.cache.update(file, {query: value})
+        return value
+
+    def put(self, key: tuple[str, str, Fingerprint], value: Any, *, is_hit: bool) -> None:
+        with self.lock:
+            if is_hit:
+                self.count_hit += 1
+            else:
+                self.count_miss += 1
+            self.memo[key] = value
+            self.memo.move_to_end(key)
+            while len(self.memo) > self.max_size:
+                self.memo.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.memo.clear()
+
+
+default_session = ProbeSession(cache=JsonCache("probe"))
+
+
+def get_default_session(session: Optional[ProbeSession] = None) -> ProbeSession:
+    """The session given, otherwise, the session shared in the process."""
+    return session if session is not None else default_session
@@ -0,0 +1,169 @@
+"""Verify cut output by single FFprobe process.
+
+Packets in the head and the tail and the metadata are probed at once by multiple read intervals,
+then checked by the same rules as `is_cut_by_key_frame_at_start()`, `is_cut_by_key_frame_at_end()`
+and `is_preserving_metadata()`.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from fractions import Fraction
+from itertools import pairwise
+import json
+from logging import getLogger
+from pathlib import Path
+import subprocess  # nosec: B404
+from typing import Any, Optional
+
+from transportstreamarchiver.ffprobe.duration import get_duration_quickly
+from transportstreamarchiver.ffprobe.exceptions import FFprobeProcessError
+from transportstreamarchiver.ffprobe.execution import execute_ffprobe
+from transportstreamarchiver.ffprobe.key_frame import COUNT_HEAD, COUNT_TAIL, find_error_at_end, find_error_at_start
+from transportstreamarchiver.ffprobe.metadata import ENTRIES_METADATA, find_difference, get_metadata
+from transportstreamarchiver.ffprobe.session import get_default_session, ProbeSession
+from transportstreamarchiver.mpegts import MpegTsError
+
+__all__ = ["CutReport", "verify_cut", "verify_cuts"]
+
+logger = getLogger(__name__)
+
+ENTRIES_PACKET = "packet=stream_index,pts,pos,flags"
+# Seconds to read from the head, enough to contain more than COUNT_HEAD frames.
+SECONDS_HEAD = 2
+# Seconds to read from the tail, the same as `process_open()`.
+SECONDS_TAIL = 0.7
+# The number of packets to have a gap of byte position between them.
+COUNT_PACKET_GAP = 2
+
+
+@dataclass
+class CutReport:
+    file_output: Path
+    error_key_frame_at_start: Optional[str] = None
+    error_key_frame_at_end: Optional[str] = None
+    error_metadata: Optional[str] = None
+
+    @property
+    def errors(self) -> list[str]:
+        return [
+            error
+            for error in (self.error_key_frame_at_start, self.error_key_frame_at_end, self.error_metadata)
+            if error is not None
+        ]
+
+    @property
+    def is_ok(self) -> bool:
+        return not self.errors
+
+
+@dataclass
+class Probe:
+    """Result of probe for the verification."""
+
+    metadata: dict[str, Any]
+    head: list[tuple[str, bool]]
+    tail: list[tuple[str, bool]]
+
+
+def verify_cut(
+    file_input: Path,
+    file_output: Path,
+    *,
+    metadata_input: Optional[Any] = None,
+    session: Optional[ProbeSession] = None,
+) -> CutReport:
+    """Verify the cut output without raising on the first failure.
+
+    The output which can't be probed is reported as failed in every check.
+
+    Args:
+        file_input: The input of the cut.
+        file_output: The output of the cut.
+        metadata_input: Metadata of the input to reuse among the outputs from the same input.
+        session: Session to memoize the results of FFprobe.
+    """
+    if metadata_input is None:
+        metadata_input = get_metadata(file_input, session=session)
+    try:
+        probe = get_default_session(session).get(
+            "verification",
+            file_output,
+            lambda file: probe_output(file, session=session),
+        )
+    # The output may be missing, empty or broken, which is what the report is for.
+    except (FFprobeProcessError, FileNotFoundError, subprocess.CalledProcessError, ValueError, MpegTsError) as error:
+        message = f"{type(error).__name__}: {error}"
+        logger.warning("Failed to verify %s: %s", file_output, message)
+        return CutReport(file_output, message, message, message)
+    return CutReport(
+        file_output,
+        find_error_at_start(probe.head),
+        find_error_at_end(probe.tail),
+        find_difference(metadata_input, probe.metadata),
+    )
+
+
+def verify_cuts(
+    file_input: Path,
+    files_output: Iterable[Path],
+    *,
+    session: Optional[ProbeSession] = None,
+) -> list[CutReport]:
+    """Verify the outputs cut from the same input by probing the input only once."""
+    metadata_input = get_metadata(file_input, session=session)
+    return [
+        verify_cut(file_input, file_output, metadata_input=metadata_input, session=session)
+        for file_output in files_output
+    ]
+
+
+def probe_output(file_output: Path, *, session: Optional[ProbeSession] = None) -> Probe:
+    if not file_output.exists():
+        msg = f"{file_output} does not exist"
+        raise FileNotFoundError(msg)
+    time_tail = max(get_duration_quickly(file_output, session=session) - SECONDS_TAIL, 0)
+    args = [
+        "-show_entries",
+        f"{ENTRIES_PACKET}:{ENTRIES_METADATA}",
+        "-read_intervals",
+        f"%+{SECONDS_HEAD},{time_tail}",
+        "-output_format",
+        "json",
+        "-loglevel",
+        "repeat+fatal",
+    ]
+    return parse(json.loads(execute_ffprobe(args, file_output)), time_tail)
+
+
+def parse(result: dict[str, Any], time_tail: float) -> Probe:
+    """Split the output of FFprobe into the metadata and the packets of the first video stream."""
+    packets = result.pop("packets", [])
+    stream_video = next((stream for stream in result["streams"] if stream.get("codec_type") == "video"), None)
+    if stream_video is None:
+        msg = "Video stream is not found"
+        raise FFprobeProcessError(msg)
+    time_base = Fraction(stream_video["time_base"])
+    # The read intervals may overlap in case when the file is short.
+    dictionary_packet = {
+        int(packet["pos"]): packet
+        for packet in packets
+        if packet["stream_index"] == stream_video["index"] and "pts" in packet and "pos" in packet
+    }
+    list_packet = [dictionary_packet[position] for position in sorted(dictionary_packet)]
+    list_is_key_frame = [
+        (f"{float(packet['pts'] * time_base):.6f}", packet["flags"].startswith("K")) for packet in list_packet
+    ]
+    index_start_tail = max(get_index_start_tail(list_packet, time_tail), len(list_is_key_frame) - COUNT_TAIL)
+    return Probe(result, list_is_key_frame[:COUNT_HEAD], list_is_key_frame[index_start_tail:])
+
+
+def get_index_start_tail(list_packet: list[dict[str, Any]], time_tail: float) -> int:
+    """Packets read for the head interval are not regarded as the tail unless the intervals overlap.
+
+    The boundary is the largest jump of byte position between adjacent packets.
+    """
+    if len(list_packet) < COUNT_PACKET_GAP or time_tail <= SECONDS_HEAD * 2:
+        return 0
+    positions = [int(packet["pos"]) for packet in list_packet]
+    gaps = [after - before for before, after in pairwise(positions)]
+    return gaps.index(max(gaps)) + 1
@@ -0,0 +1,11 @@
+from transportstreamarchiver.mpegts import exceptions, scanner, timestamp
+
+# Reason: To import all names from a submodule
+from transportstreamarchiver.mpegts.exceptions import *  # noqa: F401, F403, RUF100
+from transportstreamarchiver.mpegts.scanner import *  # noqa: F401, F403, RUF100
+from transportstreamarchiver.mpegts.timestamp import *  # noqa: F401, F403, RUF100
+
+__all__: list[str] = []
+__all__ += exceptions.__all__
+__all__ += scanner.__all__
+__all__ += timestamp.__all__
@@ -0,0 +1,14 @@
+"""This module implements exceptions for this package."""
+
+__all__ = ["MpegTsError"]
+
+
+class Error(Exception):
+    """Base class for exceptions in this module.
+
+    @see https://docs.python.org/3/tutorial/errors.html#user-defined-exceptions
+    """
+
+
+class MpegTsError(Error):
+    """The file is not MPEG-TS or doesn't contain required information."""
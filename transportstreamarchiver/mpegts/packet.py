@@ -0,0 +1,128 @@
+"""Parser of MPEG-TS packets and PES headers.
+
+- ISO/IEC 13818-1 Transport stream
+  https://www.itu.int/rec/T-REC-H.222.0
+"""
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+import mmap
+import os
+from typing import BinaryIO
+
+from transportstreamarchiver.mpegts.exceptions import MpegTsError
+
+__all__ = ["detect_packet_format", "iterate_pes", "PacketFormat", "Pes"]
+
+SYNC_BYTE = 0x47
+SIZE_PACKET_TS = 188
+# The .m2ts (BDAV) adds 4 bytes TP_extra_header before each TS packet.
+SIZE_PACKET_M2TS = 192
+# The number of packets to confirm sync bytes.
+COUNT_PACKET_CONFIRM_SYNC = 8
+# PTS and DTS are 33 bit counter in 90 kHz.
+CLOCK_PTS = 90000
+WRAP_PTS = 1 << 33
+STREAM_ID_VIDEO = range(0xE0, 0xF0)
+STREAM_ID_AUDIO = range(0xC0, 0xE0)
+# ARIB caption is carried by private_stream_1.
+STREAM_ID_PRIVATE_STREAM_1 = 0xBD
+
+
+def map_file(stream: BinaryIO) -> mmap.mmap:
+    """Memory-map whole of the file read-only.
+
+    Raises MpegTsError for an empty file, which mmap can't map, so that callers fall back as for other invalid files.
+    """
+    if os.fstat(stream.fileno()).st_size == 0:
+        msg = "File is empty"
+        raise MpegTsError(msg)
+    return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@dataclass(frozen=True)
+class PacketFormat:
+    size: int
+    # Offset of the sync byte in each packet.
+    offset_sync: int
+
+
+@dataclass(frozen=True)
+class Pes:
+    pid: int
+    stream_id: int
+    pts: int
+    # Offset of the TS packet in the file (or the buffer).
+    position: int
+    is_random_access: bool
+
+
+def detect_packet_format(data: bytes | memoryview) -> PacketFormat:
+    for size, offset_sync in ((SIZE_PACKET_TS, 0), (SIZE_PACKET_M2TS, 4)):
+        count = min(COUNT_PACKET_CONFIRM_SYNC, len(data) // size)
+        if count > 0 and all(data[index * size + offset_sync] == SYNC_BYTE for index in range(count)):
+            return PacketFormat(size, offset_sync)
+    msg = "Sync byte is not found"
+    raise MpegTsError(msg)
+
+
+def find_first_packet(data: bytes | memoryview, packet_format: PacketFormat) -> int:
+    """Find the first packet in the buffer which may start in the middle of a packet."""
+    size = packet_format.size
+    for position in range(min(size, len(data))):
+        count = min(COUNT_PACKET_CONFIRM_SYNC, (len(data) - position) // size)
+        offset = position + packet_format.offset_sync
+        if count > 0 and all(data[offset + index * size] == SYNC_BYTE for index in range(count)):
+            return position
+    msg = "Sync byte is not found"
+    raise MpegTsError(msg)
+
+
+def parse_pts(data: bytes | memoryview, offset: int) -> int:
+    return (
+        ((data[offset] >> 1) & 0x07) << 30
+        | data[offset + 1] << 22
+        | (data[offset + 2] >> 1) << 15
+        | data[offset + 3] << 7
+        | data[offset + 4] >> 1
+    )
+
+
+def iterate_pes(
+    data: bytes | memoryview,
+    packet_format: PacketFormat,
+    *,
+    position_base: int = 0,
+) -> Iterator[Pes]:
+    """Iterate PES headers which have PTS.
+
+    Args:
+        data: Buffer of TS packets.
+        packet_format: Format of packets.
+        position_base: Offset of the buffer in the file.
+    """
+    size = packet_format.size
+    for position in range(find_first_packet(data, packet_format), len(data) - size + 1, size):
+        header = position + packet_format.offset_sync
+        if data[header] != SYNC_BYTE:
+            continue
+        # payload_unit_start_indicator
+        if not data[header + 1] & 0x40:
+            continue
+        pid = (data[header + 1] & 0x1F) << 8 | data[header + 2]
+        adaptation_field_control = (data[header + 3] >> 4) & 0x03
+        if not adaptation_field_control & 0x01:
+            continue
+        payload = header + 4
+        is_random_access = False
+        if adaptation_field_control & 0x02:
+            length_adaptation_field = data[payload]
+            is_random_access = length_adaptation_field > 0 and bool(data[payload + 1] & 0x40)
+            payload += 1 + length_adaptation_field
+        # packet_start_code_prefix, stream_id, PES_packet_length, flags, PES_header_data_length and PTS.
+        if payload + 14 > header + SIZE_PACKET_TS or data[payload : payload + 3] != b"\x00\x00\x01":
+            continue
+        # PTS_DTS_flags
+        if not data[payload + 7] & 0x80:
+            continue
+        yield Pes(pid, data[payload + 3], parse_pts(data, payload + 9), position_base + position, is_random_access)
@@ -0,0 +1,161 @@
+"""Scanner of video packets in MPEG-TS without FFprobe.
+
+The file is memory-mapped and filtered by sync byte and PID for each block of packets by NumPy,
+then only the packets that start PES of the video are parsed.
+Whether the frame is key frame is judged by random_access_indicator in the adaptation field.
+"""
+
+from dataclasses import dataclass
+from fractions import Fraction
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from transportstreamarchiver.mpegts.exceptions import MpegTsError
+from transportstreamarchiver.mpegts.packet import (
+    CLOCK_PTS,
+    detect_packet_format,
+    find_first_packet,
+    iterate_pes,
+    map_file,
+    PacketFormat,
+    STREAM_ID_VIDEO,
+    SYNC_BYTE,
+    WRAP_PTS,
+)
+
+__all__ = ["scan_video", "VideoPackets"]
+
+# The number of packets to process at once to keep memory usage flat.
+COUNT_PACKET_BLOCK = 1 << 20
+SIZE_HEAD_TO_FIND_VIDEO = 4 * 1024 * 1024
+# Header of PES until PTS: start code (3), stream_id (1), length (2), flags (2), header length (1) and PTS (5).
+SIZE_PES_HEADER_UNTIL_PTS = 14
+SIZE_TS_PACKET = 188
+
+
+@dataclass
+class VideoPackets:
+    """Packets that start PES of the video in the order in the file."""
+
+    pid: int
+    pts: npt.NDArray[np.int64]
+    positions: npt.NDArray[np.int64]
+    is_key: npt.NDArray[np.bool_]
+    time_base: Fraction = Fraction(1, CLOCK_PTS)
+
+
+def scan_video(file: Path, *, pid: int | None = None, seconds: float | None = None) -> VideoPackets:
+    """Scan PTS of the video.
+
+    Args:
+        file: MPEG-TS file, including .m2ts which has 192-byte packets.
+        pid: PID of the video, the first video found in the head of the file in default.
+        seconds: Stop scanning at the block that reaches the seconds from the first packet,
+                 the whole of the file in default.
+    """
+    with file.open("rb") as stream, map_file(stream) as mapped:
+        head = memoryview(mapped)[:SIZE_HEAD_TO_FIND_VIDEO]
+        try:
+            packet_format = detect_packet_format(head)
+            position_first = find_first_packet(head, packet_format)
+            pid_video = pid if pid is not None else find_pid_video(head, packet_format)
+        finally:
+            head.release()
+        count_packet = (len(mapped) - position_first) // packet_format.size
+        packets = np.frombuffer(mapped, dtype=np.uint8, count=count_packet * packet_format.size, offset=position_first)
+        rows = packets.reshape(count_packet, packet_format.size)
+        list_pts = []
+        list_position = []
+        list_is_key = []
+        for start in range(0, count_packet, COUNT_PACKET_BLOCK):
+            pts, indices, is_key = scan_block(rows[start : start + COUNT_PACKET_BLOCK], packet_format, pid_video)
+            list_pts.append(pts)
+            list_position.append(position_first + (indices + start) * packet_format.size)
+            list_is_key.append(is_key)
+            if seconds is not None and is_reached(list_pts, seconds):
+                break
+        # The views on the mmap must be released before closing it.
+        del packets, rows
+    video_packets = VideoPackets(
+        pid_video,
+        unwrap(np.concatenate(list_pts)),
+        np.concatenate(list_position).astype(np.int64),
+        np.concatenate(list_is_key),
+    )
+    # Some muxers don't set random_access_indicator at all,
+    # raises MpegTsError so that callers fall back to FFprobe which judges key frames by the codec.
+    if not video_packets.is_key.any():
+        msg = "Random access indicator is not found in the video"
+        raise MpegTsError(msg)
+    return video_packets
+
+
+def is_reached(list_pts: list[npt.NDArray[np.int64]], seconds: float) -> bool:
+    pts = unwrap(np.concatenate(list_pts))
+    return pts.size > 0 and int(pts[-1] - pts[0]) >= seconds * CLOCK_PTS
+
+
+def find_pid_video(head: memoryview, packet_format: PacketFormat) -> int:
+    for pes in iterate_pes(head, packet_format):
+        if pes.stream_id in STREAM_ID_VIDEO:
+            return pes.pid
+    msg = "Video stream is not found"
+    raise MpegTsError(msg)
+
+
+def scan_block(
+    packets: npt.NDArray[np.uint8],
+    packet_format: PacketFormat,
+    pid_video: int,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.bool_]]:
+    """Scan the block of packets.
+
+    Returns:
+        PTS, indices of the packets in the block, and whether the packet is random access point.
+    """
+    offset = packet_format.offset_sync
+    pid = (packets[:, offset + 1].astype(np.uint16) & 0x1F) << 8 | packets[:, offset + 2]
+    mask = (
+        (packets[:, offset] == SYNC_BYTE)
+        & (pid == pid_video)
+        # payload_unit_start_indicator
+        & (packets[:, offset + 1] & 0x40 != 0)
+        # Has payload.
+        & (packets[:, offset + 3] & 0x10 != 0)
+    )
+    indices = np.flatnonzero(mask)
+    rows = packets[indices, offset : offset + SIZE_TS_PACKET].astype(np.int64)
+    rows_index = np.arange(len(rows))
+    has_adaptation_field = rows[:, 3] & 0x20 != 0
+    length_adaptation_field = np.where(has_adaptation_field, rows[:, 4], 0)
+    is_random_access = has_adaptation_field & (length_adaptation_field > 0) & (rows[:, 5] & 0x40 != 0)
+    payload = 4 + np.where(has_adaptation_field, 1 + length_adaptation_field, 0)
+    is_valid = payload + SIZE_PES_HEADER_UNTIL_PTS <= SIZE_TS_PACKET
+    payload = np.where(is_valid, payload, 4)
+
+    def byte_at(offset_payload: int) -> npt.NDArray[np.int64]:
+        values: npt.NDArray[np.int64] = rows[rows_index, payload + offset_payload]
+        return values
+
+    is_valid &= (byte_at(0) == 0x00) & (byte_at(1) == 0x00) & (byte_at(2) == 0x01)
+    # PTS_DTS_flags
+    is_valid &= byte_at(7) & 0x80 != 0
+    pts = (
+        ((byte_at(9) >> 1) & 0x07) << 30
+        | byte_at(10) << 22
+        | (byte_at(11) >> 1) << 15
+        | byte_at(12) << 7
+        | byte_at(13) >> 1
+    )
+    return pts[is_valid], indices[is_valid], is_random_access[is_valid]
+
+
+def unwrap(pts: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    """Unwrap 33 bit PTS assuming that the gap between adjacent packets is less than half of the cycle."""
+    if pts.size == 0:
+        return pts
+    difference = np.diff(pts)
+    wrap = np.where(difference < -WRAP_PTS // 2, WRAP_PTS, 0) - np.where(difference > WRAP_PTS // 2, WRAP_PTS, 0)
+    return pts + np.concatenate(([0], np.cumsum(wrap)))
@@ -0,0 +1,122 @@
+"""Read the first and the last timestamps of MPEG-TS only from the head and the tail of the file.
+
+This doesn't run any process nor write any file,
+so the time doesn't depend on the size of the file.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import pairwise
+from pathlib import Path
+from typing import Optional
+
+from transportstreamarchiver.mpegts.exceptions import MpegTsError
+from transportstreamarchiver.mpegts.packet import (
+    CLOCK_PTS,
+    detect_packet_format,
+    iterate_pes,
+    map_file,
+    Pes,
+    STREAM_ID_AUDIO,
+    STREAM_ID_PRIVATE_STREAM_1,
+    STREAM_ID_VIDEO,
+    WRAP_PTS,
+)
+
+__all__ = ["read_timestamps", "Timestamps"]
+
+# Size to read from each of the head and the tail.
+SIZE_SAMPLE = 4 * 1024 * 1024
+# FFmpeg takes into account the start time of subtitle streams
+# only when it's earlier than the start time of the others within 1 second.
+LIMIT_EARLY_SUBTITLE = CLOCK_PTS
+
+
+@dataclass(frozen=True)
+class Timestamps:
+    """Timestamps in 90 kHz, the ones in the tail are unwrapped to be later than the ones in the head."""
+
+    # The start time of the file that FFmpeg regards as zero.
+    start_pts: int
+    first_video_pts: int
+    last_video_pts: int
+    # The end of the last video frame.
+    end_pts: int
+
+    @property
+    def offset(self) -> timedelta:
+        """The gap between the start of the file and the first video frame."""
+        return timedelta(microseconds=(self.first_video_pts - self.start_pts) * 1_000_000 // CLOCK_PTS)
+
+    @property
+    def duration(self) -> float:
+        return (self.end_pts - self.start_pts) / CLOCK_PTS
+
+
+def read_timestamps(file: Path, *, size_sample: int = SIZE_SAMPLE) -> Timestamps:
+    with file.open("rb") as stream, map_file(stream) as mapped:
+        size = len(mapped)
+        head = memoryview(mapped)[:size_sample]
+        position_tail = max(size - size_sample, 0)
+        tail = memoryview(mapped)[position_tail:]
+        try:
+            packet_format = detect_packet_format(head)
+            list_pes_head = list(iterate_pes(head, packet_format))
+            list_pes_tail = list(iterate_pes(tail, packet_format, position_base=position_tail))
+        finally:
+            # Views must be released before closing mmap.
+            head.release()
+            tail.release()
+    return summarize(list_pes_head, list_pes_tail)
+
+
+def summarize(list_pes_head: list[Pes], list_pes_tail: list[Pes]) -> Timestamps:
+    list_video_head = [pes for pes in list_pes_head if pes.stream_id in STREAM_ID_VIDEO]
+    if not list_video_head:
+        msg = "Video stream is not found"
+        raise MpegTsError(msg)
+    pid_video = list_video_head[0].pid
+    # FFmpeg drops video packets before the first key frame when copy stream.
+    first_key_frame = next((pes for pes in list_video_head if pes.is_random_access), list_video_head[0])
+    base = first_key_frame.pts
+    start_pts = get_start_pts(list_pes_head, base)
+    list_pts_tail_video = [unwrap(pes.pts, base) for pes in list_pes_tail if pes.pid == pid_video]
+    if not list_pts_tail_video:
+        msg = "Video stream is not found in the tail"
+        raise MpegTsError(msg)
+    return Timestamps(start_pts, base, max(list_pts_tail_video), get_end_pts(list_pts_tail_video))
+
+
+def get_start_pts(list_pes: Iterable[Pes], base: int) -> int:
+    """Emulate how FFmpeg decides the start time: the minimum of the start time of all streams."""
+    start_pts = base
+    start_pts_text: Optional[int] = None
+    for pes in list_pes:
+        pts = unwrap(pes.pts, base)
+        if pes.stream_id in STREAM_ID_VIDEO or pes.stream_id in STREAM_ID_AUDIO:
+            start_pts = min(start_pts, pts)
+        elif pes.stream_id == STREAM_ID_PRIVATE_STREAM_1:
+            start_pts_text = pts if start_pts_text is None else min(start_pts_text, pts)
+    if start_pts_text is not None and start_pts - LIMIT_EARLY_SUBTITLE < start_pts_text < start_pts:
+        return start_pts_text
+    return start_pts
+
+
+def get_end_pts(list_pts_video: list[int]) -> int:
+    """The end of the last video frame.
+
+    The duration of the frame is estimated as the minimum interval of frames.
+    Audio streams are not taken into account since a PES of audio may contain multiple frames.
+    """
+    list_pts = sorted(list_pts_video)
+    duration_frame = min(
+        (after - before for before, after in pairwise(list_pts) if after > before),
+        default=0,
+    )
+    return list_pts[-1] + duration_frame
+
+
+def unwrap(pts: int, base: int) -> int:
+    """Unwrap 33 bit PTS to the nearest value to the base."""
+    return pts + round((base - pts) / WRAP_PTS) * WRAP_PTS
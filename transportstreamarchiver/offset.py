@@ -2,30 +2,54 @@ from datetime import timedelta
 from logging import getLogger
 from pathlib import Path
 
+from transportstreamarchiver.cache import JsonCache
 from transportstreamarchiver.ffmpeg.make_zero import make_zero
 from transportstreamarchiver.ffmpeg.seek_range import SeekRange
-from transportstreamarchiver.ffprobe.key_frame import inspect_frame
+from transportstreamarchiver.ffprobe.packet_index import PacketIndex
+from transportstreamarchiver.mpegts import MpegTsError, read_timestamps
 
 
 class OffsetChecker:
+    # Offset in microseconds keyed by the fingerprint of the file.
+    cache = JsonCache("offset")
+
     def __init__(self, file: Path) -> None:
         self.logger = getLogger(__name__)
         self.file = file
-        self._offset = None
+        self._offset: timedelta | None = None
 
     @property
     def offset(self) -> timedelta:
-        return self._offset if self._offset else self.get_offset()
+        if self._offset is None:
+            self._offset = self.get_offset_cached()
+        return self._offset
+
+    def get_offset_cached(self) -> timedelta:
+        if not self.file.exists():
+            msg = f"{self.file} does not exist"
+            raise FileNotFoundError(msg)
+        microseconds = self.cache.get(self.file)
+        if microseconds is not None:
+            self.logger.debug("Offset cache hit: %s", self.file)
+            return timedelta(microseconds=microseconds)
+        offset = self.get_offset()
+        self.cache.set(self.file, offset // timedelta(microseconds=1))
+        return offset
 
     def get_offset(self) -> timedelta:
         if not self.file.exists():
             msg = f"{self.file} does not exist"
             raise FileNotFoundError(msg)
+        try:
+            return read_timestamps(self.file).offset
+        except MpegTsError:
+            self.logger.debug("Failed to read timestamps directly, fall back to FFmpeg: %s", self.file, exc_info=True)
         self.copy_only_beginning_with_making_zero()
         file_make_zero = self.file.parent / Path(f"{self.file.stem}_make_zero.ts")
-        list_frame = inspect_frame(file_make_zero)
+        # The index of the temporary file is not stored.
+        index = PacketIndex.build(file_make_zero)
         file_make_zero.unlink()
-        return list_frame[0].time
+        return index.to_timedelta(index.pts[0])
 
     def copy_only_beginning_with_making_zero(self) -> None:
         ffmpeg_seek_range = SeekRange(
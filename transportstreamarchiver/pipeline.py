@@ -0,0 +1,126 @@
+"""Pipeline to verify outputs while the following segments are being cut.
+
+Cutting by stream copy is I/O bound and verification by FFprobe reads only the head and the tail of the output,
+so the verification runs on its own worker pool behind the cuts.
+The number of outputs that are being cut or waiting for verification is limited,
+so unverified outputs don't pile up on the disk when the verification falls behind.
+"""
+
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import getLogger
+from pathlib import Path
+import threading
+import time
+from typing import Any, Optional
+
+from transportstreamarchiver import ffmpeg
+from transportstreamarchiver.ffmpeg.seek_range import SeekRange
+from transportstreamarchiver.ffprobe.metadata import get_metadata
+from transportstreamarchiver.ffprobe.session import ProbeSession
+from transportstreamarchiver.ffprobe.verification import CutReport, verify_cut
+
+__all__ = ["CutVerifyPipeline"]
+
+logger = getLogger(__name__)
+
+MAX_WORKERS_CUT = 1
+MAX_WORKERS_VERIFY = 2
+# The number of outputs that are being cut or waiting for verification at the same time.
+MAX_PENDING = 4
+
+
+class CutVerifyPipeline:
+    """Cut segments from the same input and verify each output as soon as it's cut.
+
+    Args:
+        file_input: The input of the cut.
+        max_workers_cut: The number of FFmpeg processes to cut at the same time.
+        max_workers_verify: The number of FFprobe processes to verify at the same time.
+        max_pending: The number of outputs that are being cut or not verified yet, to apply backpressure to cuts.
+        session: Session to memoize the results of FFprobe.
+    """
+
+    def __init__(
+        self,
+        file_input: Path,
+        *,
+        max_workers_cut: int = MAX_WORKERS_CUT,
+        max_workers_verify: int = MAX_WORKERS_VERIFY,
+        max_pending: int = MAX_PENDING,
+        session: Optional[ProbeSession] = None,
+    ) -> None:
+        for limit in (max_workers_cut, max_workers_verify, max_pending):
+            if limit < 1:
+                msg = f"The number of workers must be positive: {limit}"
+                raise ValueError(msg)
+        self.file_input = file_input
+        self.max_workers_cut = max_workers_cut
+        self.max_workers_verify = max_workers_verify
+        self.max_pending = max_pending
+        self.session = session
+
+    def run(self, segments: Iterable[tuple[SeekRange, Path]]) -> list[CutReport]:
+        """Returns reports in the order of segments regardless of the order of completion."""
+        if not self.file_input.exists():
+            msg = f"{self.file_input} does not exist"
+            raise FileNotFoundError(msg)
+        metadata_input = get_metadata(self.file_input, session=self.session)
+        pending = threading.BoundedSemaphore(self.max_pending)
+        time_start = time.perf_counter()
+        # The pool to cut is shut down first since it submits into the pool to verify.
+        with ThreadPoolExecutor(max_workers=self.max_workers_verify) as executor_verify, ThreadPoolExecutor(
+            max_workers=self.max_workers_cut,
+        ) as executor_cut:
+            futures = []
+            for seek_range, file_output in segments:
+                # Blocks until one of the pending outputs is verified.
+                pending.acquire()
+                futures.append(
+                    executor_cut.submit(self.cut, seek_range, file_output, executor_verify, metadata_input, pending),
+                )
+            reports = [future.result().result() for future in futures]
+        logger.info("Cut and verified %d segments in %.1f sec", len(reports), time.perf_counter() - time_start)
+        return reports
+
+    def cut(
+        self,
+        seek_range: SeekRange,
+        file_output: Path,
+        executor_verify: ThreadPoolExecutor,
+        metadata_input: Any,
+        pending: threading.BoundedSemaphore,
+    ) -> "Future[CutReport]":
+        """Cut and submit the verification, the pending output is released when the verification finishes."""
+        time_start = time.perf_counter()
+        try:
+            ffmpeg.cut(self.file_input, seek_range, file_output)
+        # To continue the rest of segments and report the failure.
+        except Exception as error:
+            pending.release()
+            message = f"{type(error).__name__}: {error}"
+            logger.exception("%s: %s", file_output, message)
+            future: Future[CutReport] = Future()
+            future.set_result(CutReport(file_output, message, message, message))
+            return future
+        logger.info("Cut %s in %.1f sec", file_output, time.perf_counter() - time_start)
+        return executor_verify.submit(self.verify, file_output, metadata_input, pending)
+
+    def verify(
+        self,
+        file_output: Path,
+        metadata_input: Any,
+        pending: threading.BoundedSemaphore,
+    ) -> CutReport:
+        time_start = time.perf_counter()
+        try:
+            report = verify_cut(self.file_input, file_output, metadata_input=metadata_input, session=self.session)
+        # Reason: To continue the rest of segments and report the failure.
+        except Exception as error:  # noqa: BLE001
+            message = f"{type(error).__name__}: {error}"
+            report = CutReport(file_output, message, message, message)
+        finally:
+            pending.release()
+        seconds = time.perf_counter() - time_start
+        logger.info("Verified %s in %.1f sec: %s", file_output, seconds, "OK" if report.is_ok else "NG")
+        return report
@@ -0,0 +1,303 @@
+"""Execution core of FFmpeg and FFprobe processes on asyncio.
+
+Every process is started in its own process group, so it is killed with its children
+when it times out or the awaiting task is cancelled.
+The number of processes of each tool running at the same time is limited by a semaphore in the process,
+shared among the event loops since each synchronous wrapper runs its own event loop in a worker thread,
+and among the threads that read the pipe of `popen()` synchronously,
+so an orchestrator can keep many probes and remuxes in flight without a thread for each process.
+The synchronous wrappers run the coroutine in a new event loop for the existing scripts.
+"""
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from logging import getLogger
+import os
+from pathlib import Path
+import signal
+
+# Reason: Using subprocess is necessary to call FFmpeg and FFprobe.
+import subprocess  # nosec: B404
+import sys
+import threading
+from typing import Any, IO, Optional, Union
+
+__all__ = ["CompletedProcess", "popen", "run", "run_async", "set_max_processes"]
+
+logger = getLogger(__name__)
+
+# Remux and encode are heavy, probes are light.
+MAX_PROCESSES = {
+    "ffmpeg": os.cpu_count() or 1,
+    "ffprobe": (os.cpu_count() or 1) * 4,
+}
+semaphores: dict[str, "ProcessSemaphore"] = {}
+lock_semaphores = threading.Lock()
+IS_WINDOWS = sys.platform == "win32"
+
+
+@dataclass
+class CompletedProcess:
+    command: list[str]
+    return_code: int
+    # Empty when not captured.
+    stdout: bytes = b""
+    stderr: bytes = b""
+
+
+def set_max_processes(tool: str, max_processes: int) -> None:
+    """Set the limit of the tool, applied to the processes started after this call."""
+    if max_processes < 1:
+        msg = f"The number of processes must be positive: {max_processes}"
+        raise ValueError(msg)
+    with lock_semaphores:
+        MAX_PROCESSES[tool] = max_processes
+        # The processes running hold the previous semaphore and release it.
+        semaphores.pop(tool, None)
+
+
+class ProcessSemaphore:
+    """Semaphore shared among event loops and threads, which grants in the order of requests.
+
+    Not asyncio.Semaphore, which is bound to the event loop while `asyncio.run()` creates a new loop for each call.
+    A released slot is handed over to the first waiter directly, so no waiter polls.
+    """
+
+    def __init__(self, value: int) -> None:
+        self.value = value
+        self.limit = value
+        self.lock = threading.Lock()
+        # Each waiter is called to be granted, and returns False when it has gone.
+        self.waiters: deque[Callable[[], bool]] = deque()
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[None] = loop.create_future()
+
+        def grant() -> bool:
+            try:
+                loop.call_soon_threadsafe(resolve, future)
+            # The event loop has been closed.
+            except RuntimeError:
+                return False
+            return True
+
+        with self.lock:
+            if self.value > 0 and not self.waiters:
+                self.value -= 1
+                return
+            self.waiters.append(grant)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self.lock:
+                is_waiting = grant in self.waiters
+                if is_waiting:
+                    self.waiters.remove(grant)
+            # The slot has been handed over to the cancelled task.
+            if not is_waiting:
+                self.release()
+            raise
+
+    def acquire(self) -> None:
+        event = threading.Event()
+
+        def grant() -> bool:
+            event.set()
+            return True
+
+        with self.lock:
+            if self.value > 0 and not self.waiters:
+                self.value -= 1
+                return
+            self.waiters.append(grant)
+        event.wait()
+
+    def release(self) -> None:
+        with self.lock:
+            while self.waiters:
+                if self.waiters.popleft()():
+                    return
+            if self.value >= self.limit:
+                msg = "Semaphore released too many times"
+                raise ValueError(msg)
+            self.value += 1
+
+
+def resolve(future: "asyncio.Future[None]") -> None:
+    # The waiting task may have been cancelled after the slot was handed over.
+    if not future.done():
+        future.set_result(None)
+
+
+def get_semaphore(tool: str) -> ProcessSemaphore:
+    with lock_semaphores:
+        if tool not in semaphores:
+            semaphores[tool] = ProcessSemaphore(MAX_PROCESSES.get(tool, os.cpu_count() or 1))
+        return semaphores[tool]
+
+
+@asynccontextmanager
+async def acquire(tool: str) -> AsyncIterator[None]:
+    """Acquire the semaphore of the tool without blocking the event loop."""
+    semaphore = get_semaphore(tool)
+    await semaphore.acquire_async()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def get_options_process_group() -> dict[str, Any]:
+    # Inline check rather than IS_WINDOWS, for type checkers to narrow the platform.
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill(pid: int) -> None:
+    """Kill the process group, the process itself on Windows."""
+    try:
+        if IS_WINDOWS:
+            os.kill(pid, signal.SIGTERM)
+        else:
+            os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        logger.debug("Process has already exited: %d", pid)
+
+
+# Reason: The keyword-only options for each stream mirror the ones of subprocess.run().
+async def run_async(  # noqa: PLR0913
+    command: Sequence[str],
+    *,
+    timeout: Optional[float] = None,
+    capture_stdout: bool = True,
+    capture_stderr: bool = True,
+    callback_stdout: Optional[Callable[[bytes], None]] = None,
+    callback_stderr: Optional[Callable[[bytes], None]] = None,
+    stdin: Union[int, IO[bytes], None] = None,
+) -> CompletedProcess:
+    """Run the command and wait for it without blocking the event loop.
+
+    Args:
+        command: The command, the first element is the tool to limit the concurrency by.
+        timeout: Seconds to kill the process group, no limit in default.
+        capture_stdout: Capture the stdout, otherwise, it's inherited unless the callback is set.
+        capture_stderr: Capture the stderr, otherwise, it's inherited unless the callback is set.
+        callback_stdout: Called for each line of the stdout as soon as it's read, instead of capturing.
+        callback_stderr: Called for each line of the stderr as soon as it's read, instead of capturing.
+        stdin: The stdin, for example, the stdout of the upstream process, nothing is read in default.
+    """
+    list_command = list(command)
+    is_piped_stdout = capture_stdout or callback_stdout is not None
+    is_piped_stderr = capture_stderr or callback_stderr is not None
+    async with acquire(Path(list_command[0]).stem):
+        logger.debug(" ".join(list_command))
+        process = await asyncio.create_subprocess_exec(
+            *list_command,
+            stdin=asyncio.subprocess.DEVNULL if stdin is None else stdin,
+            stdout=asyncio.subprocess.PIPE if is_piped_stdout else None,
+            stderr=asyncio.subprocess.PIPE if is_piped_stderr else None,
+            **get_options_process_group(),
+        )
+        try:
+            stdout, stderr, return_code = await asyncio.wait_for(
+                asyncio.gather(
+                    read(process.stdout, callback_stdout),
+                    read(process.stderr, callback_stderr),
+                    process.wait(),
+                ),
+                timeout,
+            )
+        except TimeoutError:
+            await kill_and_wait(process)
+            msg = f"Timed out in {timeout} seconds: {' '.join(list_command)}"
+            raise TimeoutError(msg) from None
+        except BaseException:
+            # Cancelled, or the callback raised, then no one reads the pipe and the process would be blocked on it.
+            await kill_and_wait(process)
+            raise
+    return CompletedProcess(list_command, return_code, stdout, stderr)
+
+
+async def kill_and_wait(process: asyncio.subprocess.Process) -> None:
+    kill(process.pid)
+    # To reap the process not to leave zombie.
+    await process.wait()
+
+
+async def read(stream: Optional[asyncio.StreamReader], callback: Optional[Callable[[bytes], None]]) -> bytes:
+    """Read until EOF, passing each line to the callback instead of keeping it when the callback is set."""
+    if stream is None:
+        return b""
+    if callback is None:
+        return await stream.read()
+    async for line in stream:
+        callback(line)
+    return b""
+
+
+def run(command: Sequence[str], **kwargs: Any) -> CompletedProcess:
+    """Synchronous wrapper of `run_async()`, can't be called in a running event loop."""
+    return asyncio.run(run_async(command, **kwargs))
+
+
+class LimitedPopen(subprocess.Popen[bytes]):
+    """Popen that releases the semaphore of the tool once the process has been reaped."""
+
+    semaphore: Optional[ProcessSemaphore] = None
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        try:
+            return super().wait(timeout)
+        finally:
+            self.release_if_exited()
+
+    def poll(self) -> Optional[int]:
+        return_code = super().poll()
+        self.release_if_exited()
+        return return_code
+
+    def release_if_exited(self) -> None:
+        if self.returncode is None or self.semaphore is None:
+            return
+        semaphore, self.semaphore = self.semaphore, None
+        semaphore.release()
+
+
+def popen(
+    command: Sequence[str],
+    *,
+    stdout: Optional[int] = subprocess.PIPE,
+    stderr: Optional[int] = None,
+    is_limited: bool = True,
+) -> "subprocess.Popen[bytes]":
+    """Start the process in its own process group for the consumers that read the pipe synchronously.
+
+    Args:
+        command: The command, the first element is the tool to limit the concurrency by.
+        stdout: The stdout, piped in default.
+        stderr: The stderr, inherited in default.
+        is_limited: Wait for the semaphore of the tool, released when the process is reaped by `wait()`.
+    """
+    list_command = list(command)
+    semaphore = get_semaphore(Path(list_command[0]).stem) if is_limited else None
+    if semaphore is not None:
+        semaphore.acquire()
+    logger.debug(" ".join(list_command))
+    try:
+        process = LimitedPopen(
+            list_command,
+            stdout=stdout,
+            stderr=stderr,
+            **get_options_process_group(),
+        )
+    except BaseException:
+        if semaphore is not None:
+            semaphore.release()
+        raise
+    process.semaphore = semaphore
+    return process
@@ -0,0 +1,19 @@
+from transportstreamarchiver.scene import detector, fast, index, parallel, scenes, score, showinfo
+
+# Reason: To import all names from a submodule
+from transportstreamarchiver.scene.detector import *  # noqa: F401, F403, RUF100
+from transportstreamarchiver.scene.fast import *  # noqa: F401, F403, RUF100
+from transportstreamarchiver.scene.index import *  # noqa: F401, F403, RUF100
+from transportstreamarchiver.scene.parallel import *  # noqa: F401, F403, RUF100
+from transportstreamarchiver.scene.scenes import *  # noqa: F401, F403, RUF100
+from transportstreamarchiver.scene.score import *  # noqa: F401, F403, RUF100
+from transportstreamarchiver.scene.showinfo import *  # noqa: F401, F403, RUF100
+
+__all__: list[str] = []
+__all__ += detector.__all__
+__all__ += fast.__all__
+__all__ += index.__all__
+__all__ += parallel.__all__
+__all__ += scenes.__all__
+__all__ += score.__all__
+__all__ += showinfo.__all__
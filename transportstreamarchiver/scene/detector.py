@@ -0,0 +1,268 @@
+"""Scene detection that streams downscaled raw frames from FFmpeg into NumPy.
+
+FFmpeg only decodes and downscales the video, and writes its luma plane as raw frames on stdout,
+and the `showinfo` filter reports the timestamp of each frame on stderr.
+The scene scores are calculated in this process, so no image file is written unless thumbnails are requested.
+Frames and timestamps are consumed block by block, so the scenes are yielded while FFmpeg is still decoding.
+"""
+
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import ExitStack
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+
+# Reason: Using subprocess is necessary to call FFmpeg.
+import subprocess  # nosec: B404
+from typing import IO, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from transportstreamarchiver.ffmpeg.exceptions import FFmpegProcessError
+from transportstreamarchiver.ffmpeg.execution import execute_ffmpeg
+from transportstreamarchiver.process import popen
+from transportstreamarchiver.scene.scenes import Scenes
+from transportstreamarchiver.scene.score import SceneScorer
+from transportstreamarchiver.scene.showinfo import Progress, ShowInfoParser, StderrReader
+
+__all__ = [
+    "detect_scenes",
+    "FrameScores",
+    "FrameSize",
+    "iterate_frame_scores",
+    "iterate_scenes",
+    "score_frames",
+    "write_thumbnails",
+]
+
+logger = getLogger(__name__)
+
+# The same as the default of `scene.py` before the scores were calculated in this process,
+# the score is in the same scale as `select=gt(scene,...)`, see `SceneScorer`.
+THRESHOLD_DEFAULT = 0.1
+COUNT_FRAME_BLOCK = 256
+WIDTH_THUMBNAIL = 640
+HEIGHT_THUMBNAIL = 360
+# Seconds to seek before the scene, less than the frame interval,
+# and more than the error of pts_time that FFmpeg prints in 6 significant digits, for example, "7200.03".
+SECONDS_BEFORE_SCENE = 0.01
+
+
+@dataclass(frozen=True)
+class FrameSize:
+    width: int
+    height: int
+
+
+# Small frames are enough to score and keep the pipe narrow.
+SIZE_ANALYSIS = FrameSize(160, 90)
+
+
+@dataclass
+class FrameScores:
+    """Scene scores of frames and their pts_time."""
+
+    scores: npt.NDArray[np.float64]
+    list_pts_time: list[str]
+    # The duration of the input in seconds.
+    duration: Optional[str] = None
+
+    @property
+    def end(self) -> str:
+        return self.duration or (self.list_pts_time[-1] if self.list_pts_time else "0")
+
+    def select(self, threshold: float) -> list[str]:
+        """pts_time of frames whose score is greater than the threshold."""
+        return [self.list_pts_time[frame] for frame in np.flatnonzero(self.scores > threshold).tolist()]
+
+
+def detect_scenes(
+    file_input: Path,
+    *,
+    threshold: float = THRESHOLD_DEFAULT,
+    size: FrameSize = SIZE_ANALYSIS,
+    callback_progress: Optional[Callable[[Progress], None]] = None,
+    file_log: Optional[Path] = None,
+) -> Scenes:
+    """Detect scenes of the first video stream by decoding all frames.
+
+    Args:
+        file_input: Video file.
+        threshold: Threshold of the scene score, the same as the one of `select=gt(scene,...)`.
+        size: Size of frames to analyze.
+        callback_progress: Called each time the analysis progresses by 1 percent of the duration.
+        file_log: File to write the raw stderr of FFmpeg into, not written in default.
+    """
+    times = []
+    end = "0"
+    for frame_scores in iterate_frame_scores(
+        file_input,
+        size=size,
+        callback_progress=callback_progress,
+        file_log=file_log,
+    ):
+        times.extend(frame_scores.select(threshold))
+        end = frame_scores.end
+    return Scenes(times, end)
+
+
+def iterate_scenes(
+    file_input: Path,
+    *,
+    threshold: float = THRESHOLD_DEFAULT,
+    size: FrameSize = SIZE_ANALYSIS,
+    callback_progress: Optional[Callable[[Progress], None]] = None,
+    file_log: Optional[Path] = None,
+) -> Iterator[str]:
+    """Yield the start time of each scene as soon as its frame is decoded, see `detect_scenes()` for arguments."""
+    for frame_scores in iterate_frame_scores(
+        file_input,
+        size=size,
+        callback_progress=callback_progress,
+        file_log=file_log,
+    ):
+        yield from frame_scores.select(threshold)
+
+
+def score_frames(
+    file_input: Path,
+    *,
+    parameters_input: Sequence[str] = (),
+    filters: Sequence[str] = (),
+    size: FrameSize = SIZE_ANALYSIS,
+) -> FrameScores:
+    """Score frames of the first video stream.
+
+    Args:
+        file_input: Video file.
+        parameters_input: Options for the input, for example, to seek or to skip decoding frames.
+        filters: Filters to apply before scaling, for example, to select frames.
+        size: Size of frames to analyze.
+    """
+    list_scores = []
+    list_pts_time: list[str] = []
+    duration = None
+    for frame_scores in iterate_frame_scores(
+        file_input,
+        parameters_input=parameters_input,
+        filters=filters,
+        size=size,
+    ):
+        list_scores.append(frame_scores.scores)
+        list_pts_time.extend(frame_scores.list_pts_time)
+        duration = frame_scores.duration
+    scores = np.concatenate(list_scores) if list_scores else np.empty(0, dtype=np.float64)
+    return FrameScores(scores, list_pts_time, duration)
+
+
+# Reason: The options are the union of the ones of `score_frames()` and `detect_scenes()`.
+def iterate_frame_scores(  # noqa: PLR0913
+    file_input: Path,
+    *,
+    parameters_input: Sequence[str] = (),
+    filters: Sequence[str] = (),
+    size: FrameSize = SIZE_ANALYSIS,
+    callback_progress: Optional[Callable[[Progress], None]] = None,
+    file_log: Optional[Path] = None,
+) -> Iterator[FrameScores]:
+    """Score frames block by block, see `score_frames()` and `detect_scenes()` for arguments."""
+    if not file_input.exists():
+        msg = f"{file_input} does not exist"
+        raise FileNotFoundError(msg)
+    command = [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostats",
+        *parameters_input,
+        "-i",
+        str(file_input),
+        "-map",
+        "0:v:0",
+        "-vf",
+        # The luma is extracted as it is since `format=gray` expands the limited range of YUV
+        # and scales the score up from the one of `select=gt(scene,...)`.
+        ",".join(
+            [*filters, f"scale={size.width}:{size.height}", "format=yuv420p", "extractplanes=y", "showinfo"],
+        ),
+        # To prevent duplicate frames in same timestamp.
+        "-fps_mode",
+        "passthrough",
+        "-f",
+        "rawvideo",
+        "pipe:1",
+    ]
+    with ExitStack() as stack:
+        log = stack.enter_context(file_log.open("wb")) if file_log is not None else None
+        process = stack.enter_context(popen(command, stderr=subprocess.PIPE))
+        # Reason: The stdout and the stderr are piped.
+        reader = StderrReader(
+            process.stderr,  # type: ignore[arg-type]
+            parser=ShowInfoParser(callback_progress=callback_progress),
+            log=log,
+        )
+        reader.start()
+        scorer = SceneScorer()
+        is_matched = True
+        # Reason: The stdout is piped.
+        for frames in iterate_frames(process.stdout, size):  # type: ignore[arg-type]
+            list_pts_time = reader.take(len(frames))
+            is_matched = len(list_pts_time) == len(frames)
+            if not is_matched:
+                break
+            yield FrameScores(scorer.update(frames), list_pts_time, reader.duration)
+        return_code = process.wait()
+        reader.join()
+        if return_code != 0:
+            msg = f"Failed to score frames: {file_input}"
+            raise FFmpegProcessError(msg)
+        if not is_matched or reader.take(1):
+            msg = f"The number of timestamps doesn't match frames: {file_input}"
+            raise FFmpegProcessError(msg)
+
+
+def iterate_frames(
+    stream: IO[bytes],
+    size: FrameSize,
+    *,
+    count_frame_block: int = COUNT_FRAME_BLOCK,
+) -> Iterator[npt.NDArray[np.uint8]]:
+    """Read raw frames of the luma block by block to keep memory usage flat."""
+    size_frame = size.width * size.height
+    while block := stream.read(size_frame * count_frame_block):
+        count = len(block) // size_frame
+        yield np.frombuffer(block, dtype=np.uint8, count=count * size_frame).reshape(count, size.height, size.width)
+
+
+def write_thumbnails(file_input: Path, scenes: Scenes, directory: Path) -> None:
+    """Write the first frame of each scene as `%06d.jpg` numbered by the index of the scene.
+
+    Each frame is written by its own FFmpeg process that seeks to the scene,
+    so the thumbnails are numbered by the scenes even if the time of a frame differs from the one of the scene.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    # The thumbnails of the previous detection would be taken as scenes to keep.
+    for file in directory.glob("[0-9]*.jpg"):
+        file.unlink()
+    for index, time in enumerate(["0", *scenes.times]):
+        file_output = directory / f"{index:06d}.jpg"
+        seconds = max(float(time) - SECONDS_BEFORE_SCENE, 0)
+        parameters = [
+            "-hide_banner",
+            *(["-ss", f"{seconds:.6f}"] if seconds > 0 else []),
+            "-i",
+            str(file_input),
+            "-map",
+            "0:v:0",
+            "-vf",
+            f"scale={WIDTH_THUMBNAIL}:{HEIGHT_THUMBNAIL}",
+            "-frames:v",
+            "1",
+            "-y",
+            str(file_output),
+        ]
+        execute_ffmpeg(parameters, "Failed to write thumbnails", file_output)
+    count = len(list(directory.glob("[0-9]*.jpg")))
+    if count != len(scenes):
+        msg = f"The number of thumbnails doesn't match scenes: {count} != {len(scenes)}"
+        raise FFmpegProcessError(msg)
@@ -0,0 +1,106 @@
+"""Fast scene detection in two passes.
+
+The coarse pass decodes only key frames, or scores only every Nth frame, at reduced resolution.
+Then only the intervals between the sampled frames where the coarse pass finds a scene change
+are decoded frame by frame to refine the boundaries.
+"""
+
+from logging import getLogger
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from transportstreamarchiver.scene.detector import FrameSize, score_frames, SIZE_ANALYSIS, THRESHOLD_DEFAULT
+from transportstreamarchiver.scene.scenes import Scenes
+
+__all__ = ["detect_scenes_fast"]
+
+logger = getLogger(__name__)
+
+# Decoders that support it, for example, MPEG-2 of broadcast, decode in 1/2^lowres size.
+LOWRES = 2
+# To include the frame at the end of the interval.
+MARGIN_REFINE = 0.001
+# Seconds to start refining before the interval, enough to contain 2 frames to restore the previous mafd.
+SECONDS_OVERLAP_REFINE = 0.2
+# Seconds to absorb the error of timestamps to judge whether the frame is in the interval.
+TOLERANCE = 0.0005
+
+
+def detect_scenes_fast(
+    file_input: Path,
+    *,
+    threshold: float = THRESHOLD_DEFAULT,
+    step: Optional[int] = None,
+    lowres: int = LOWRES,
+    size: FrameSize = SIZE_ANALYSIS,
+) -> Scenes:
+    """Detect scenes by coarse pass and refine only where the scene changes.
+
+    Args:
+        file_input: Video file.
+        threshold: Threshold of the scene score of the downscaled luma, see `SceneScorer`.
+        step: Score every Nth frame in the coarse pass, or only key frames if None.
+        lowres: Decode in 1/2^lowres size, the decoders that don't support ignore it.
+        size: Size of frames to analyze.
+    """
+    parameters_decode = ["-lowres", str(lowres)]
+    if step is None:
+        coarse = score_frames(
+            file_input,
+            parameters_input=[*parameters_decode, "-skip_frame", "nokey"],
+            size=size,
+        )
+    else:
+        coarse = score_frames(
+            file_input,
+            parameters_input=parameters_decode,
+            filters=[f"select=not(mod(n\\,{step}))"],
+            size=size,
+        )
+    indices = np.flatnonzero(coarse.scores > threshold).tolist()
+    logger.info("Coarse pass: %d frames, %d candidates", len(coarse.scores), len(indices))
+    times = []
+    for index in indices:
+        times.extend(
+            refine(
+                file_input,
+                float(coarse.list_pts_time[index - 1]),
+                float(coarse.list_pts_time[index]),
+                threshold=threshold,
+                parameters_decode=parameters_decode,
+                size=size,
+            ),
+        )
+    return Scenes(times, coarse.end)
+
+
+# Reason: The interval and the options of the coarse pass to decode in the same way.
+def refine(  # noqa: PLR0913
+    file_input: Path,
+    start: float,
+    end: float,
+    *,
+    threshold: float,
+    parameters_decode: list[str],
+    size: FrameSize,
+) -> list[str]:
+    """Find the scene changes between the sampled frames by decoding all frames in the interval.
+
+    Decoding starts a little before the interval as `score_chunk()` of the parallel detection does,
+    otherwise, the second frame is scored against mafd of 0 and tends to be a false scene change.
+    The first frame of the interval is the sampled frame before the change, so its score is not needed.
+    The candidate is dropped in case when no frame exceeds the threshold,
+    since the sampled frames are far from each other and tend to differ even in the same scene.
+    """
+    start_overlap = max(start - SECONDS_OVERLAP_REFINE, 0.0)
+    fine = score_frames(
+        file_input,
+        parameters_input=[*parameters_decode, "-ss", f"{start_overlap:.6f}", "-to", f"{end + MARGIN_REFINE:.6f}"],
+        size=size,
+    )
+    # The timestamps restart from 0 at the position of the input-side `-ss`.
+    pts_time = np.array(fine.list_pts_time, dtype=np.float64) + start_overlap
+    indices = np.flatnonzero((fine.scores > threshold) & (pts_time > start + TOLERANCE)).tolist()
+    return [f"{pts_time[index]:.6f}" for index in indices]
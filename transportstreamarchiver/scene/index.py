@@ -0,0 +1,171 @@
+"""Persistent index of scene scores of all frames.
+
+The scene score doesn't depend on the threshold,
+so the scores are calculated once and stored as binary sidecar in the cache directory.
+Then detecting scenes by any threshold is a vectorized query without decoding the video again.
+The sidecar is named by the fingerprint of the source file, so it's invalidated when the source file changes.
+
+Layout of the sidecar (little endian):
+
+- header: magic, size, mtime_ns, digest, duration, count of frames, width, height
+- pts_time: float64 x count
+- scores: float32 x count
+"""
+
+from collections.abc import Sequence
+from logging import getLogger
+import mmap
+from pathlib import Path
+import struct
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from transportstreamarchiver.cache import Fingerprint, get_directory_cache
+from transportstreamarchiver.scene.detector import (
+    FrameScores,
+    FrameSize,
+    score_frames,
+    SIZE_ANALYSIS,
+    THRESHOLD_DEFAULT,
+)
+from transportstreamarchiver.scene.parallel import score_frames_parallel
+from transportstreamarchiver.scene.scenes import Scenes
+
+__all__ = ["SceneScoreIndex"]
+
+logger = getLogger(__name__)
+
+# Version 1 stored the scores of the luma expanded into the full range.
+MAGIC = b"TSASCOR2"
+# 64 bytes to align following arrays.
+FORMAT_HEADER = "<8sqq16sdqii"
+SIZE_HEADER = struct.calcsize(FORMAT_HEADER)
+# pts_time and score.
+SIZE_PER_FRAME = 8 + 4
+
+
+class SceneScoreIndex:
+    """Scene scores and pts_time of all frames in the order of frames."""
+
+    def __init__(self, pts_time: npt.ArrayLike, scores: npt.ArrayLike, duration: float) -> None:
+        self.pts_time: npt.NDArray[np.float64] = np.asarray(pts_time, dtype=np.float64)
+        self.scores: npt.NDArray[np.float32] = np.asarray(scores, dtype=np.float32)
+        self.duration = duration
+
+    def __len__(self) -> int:
+        return int(self.scores.size)
+
+    @classmethod
+    def load_or_build(
+        cls,
+        file: Path,
+        *,
+        max_workers: Optional[int] = None,
+        size: FrameSize = SIZE_ANALYSIS,
+    ) -> "SceneScoreIndex":
+        index = cls.load(file, size=size)
+        if index is not None:
+            return index
+        index = cls.build(file, max_workers=max_workers, size=size)
+        fingerprint = Fingerprint.create(file)
+        index.save(cls.get_path(fingerprint, size), fingerprint, size)
+        return index
+
+    @classmethod
+    def load(
+        cls,
+        file: Path,
+        *,
+        size: FrameSize = SIZE_ANALYSIS,
+    ) -> Optional["SceneScoreIndex"]:
+        """Load the index only when it has already been built."""
+        fingerprint = Fingerprint.create(file)
+        path = cls.get_path(fingerprint, size)
+        if not path.exists():
+            return None
+        try:
+            with path.open("rb") as stream:
+                mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, size_file, mtime_ns, digest, duration, count, width_index, height_index = struct.unpack_from(
+                FORMAT_HEADER,
+                mapped,
+            )
+        # The sidecar may be empty or truncated, for example, by the disk full or the interrupted copy of the cache.
+        except (ValueError, struct.error):
+            logger.warning("Ignore broken index: %s", path)
+            return None
+        if (
+            magic != MAGIC
+            or Fingerprint(size_file, mtime_ns, digest.hex()) != fingerprint
+            or FrameSize(width_index, height_index) != size
+            or len(mapped) < SIZE_HEADER + count * SIZE_PER_FRAME
+        ):
+            logger.warning("Ignore invalid index: %s", path)
+            return None
+        return cls(
+            np.frombuffer(mapped, dtype="<f8", count=count, offset=SIZE_HEADER),
+            np.frombuffer(mapped, dtype="<f4", count=count, offset=SIZE_HEADER + count * 8),
+            duration,
+        )
+
+    @classmethod
+    def build(
+        cls,
+        file: Path,
+        *,
+        max_workers: Optional[int] = None,
+        size: FrameSize = SIZE_ANALYSIS,
+    ) -> "SceneScoreIndex":
+        """Score all frames, in parallel unless max_workers is 1."""
+        if max_workers == 1:
+            frame_scores = score_frames(file, size=size)
+        else:
+            frame_scores = score_frames_parallel(file, max_workers=max_workers, size=size)
+        return cls.from_frame_scores(frame_scores)
+
+    @classmethod
+    def from_frame_scores(cls, frame_scores: FrameScores) -> "SceneScoreIndex":
+        return cls(
+            [float(pts_time) for pts_time in frame_scores.list_pts_time],
+            frame_scores.scores,
+            float(frame_scores.end),
+        )
+
+    def save(self, path: Path, fingerprint: Fingerprint, size: FrameSize) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path_temporary = path.with_suffix(".tmp")
+        with path_temporary.open("wb") as stream:
+            stream.write(
+                struct.pack(
+                    FORMAT_HEADER,
+                    MAGIC,
+                    fingerprint.size,
+                    fingerprint.mtime_ns,
+                    bytes.fromhex(fingerprint.digest),
+                    self.duration,
+                    len(self),
+                    size.width,
+                    size.height,
+                ),
+            )
+            stream.write(self.pts_time.astype("<f8").tobytes())
+            stream.write(self.scores.astype("<f4").tobytes())
+        path_temporary.replace(path)
+
+    @staticmethod
+    def get_path(fingerprint: Fingerprint, size: FrameSize) -> Path:
+        return get_directory_cache() / "scene_score" / f"{fingerprint}-{size.width}x{size.height}.idx"
+
+    def to_scenes(self, threshold: float = THRESHOLD_DEFAULT) -> Scenes:
+        """Scenes whose first frame scores greater than the threshold."""
+        # Compare in single precision as stored.
+        times = self.pts_time[self.scores > np.float32(threshold)]
+        return Scenes([f"{time:.6f}" for time in times.tolist()], f"{self.duration:.6f}")
+
+    def count_scenes(self, thresholds: Sequence[float]) -> list[int]:
+        """The number of scenes for each threshold at once, to tune the threshold."""
+        scores_sorted = np.sort(self.scores)
+        counts = self.scores.size - np.searchsorted(scores_sorted, np.asarray(thresholds, dtype=np.float32), "right")
+        return [int(count) + 1 for count in counts.tolist()]
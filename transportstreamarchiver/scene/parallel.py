@@ -0,0 +1,137 @@
+"""Scene detection split into chunks aligned to key frames, analyzed by multiple FFmpeg processes.
+
+Each chunk starts a little before its key frame so that the first frame of the chunk is scored
+against the previous frames as well as in a single pass, and only the frames from the key frame are kept.
+The frame at the boundary of chunks may be decoded by both chunks with timestamps rounded differently,
+so the frames are matched by the timestamp within half of the frame interval rather than by the formatted string.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+from logging import getLogger
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from transportstreamarchiver.ffprobe.key_frame_index import KeyFrameIndex
+from transportstreamarchiver.offset import OffsetChecker
+from transportstreamarchiver.scene.detector import (
+    FrameScores,
+    FrameSize,
+    score_frames,
+    SIZE_ANALYSIS,
+    THRESHOLD_DEFAULT,
+)
+from transportstreamarchiver.scene.scenes import Scenes
+
+__all__ = ["detect_scenes_parallel", "get_key_frame_times", "score_frames_parallel", "split_into_chunks"]
+
+logger = getLogger(__name__)
+
+# Seconds to overlap chunks, enough to contain 2 frames to restore the previous mafd.
+SECONDS_OVERLAP = 0.5
+# Seconds to absorb the error of timestamps to judge the same frame when the frame interval is unknown.
+TOLERANCE = 0.0005
+# The number of chunks for each worker to balance the load.
+COUNT_CHUNK_PER_WORKER = 4
+
+
+def get_key_frame_times(file_input: Path) -> npt.NDArray[np.float64]:
+    """Times of key frames relative to the start of the file, the same timeline as `-ss` of FFmpeg."""
+    return KeyFrameIndex.create(file_input).to_file_times(OffsetChecker(file_input).offset)
+
+
+def split_into_chunks(key_frame_times: npt.NDArray[np.float64], count_chunk: int) -> list[float]:
+    """Start times of chunks, the key frames at or after the equally divided positions."""
+    if key_frame_times.size == 0 or count_chunk <= 1:
+        return [0.0]
+    targets = np.linspace(key_frame_times[0], key_frame_times[-1], count_chunk, endpoint=False)[1:]
+    indices = np.unique(np.searchsorted(key_frame_times, targets))
+    indices = indices[(indices > 0) & (indices < key_frame_times.size)]
+    return [0.0, *key_frame_times[indices].tolist()]
+
+
+def detect_scenes_parallel(
+    file_input: Path,
+    *,
+    threshold: float = THRESHOLD_DEFAULT,
+    max_workers: Optional[int] = None,
+    size: FrameSize = SIZE_ANALYSIS,
+) -> Scenes:
+    """Detect scenes by decoding all frames in parallel.
+
+    Args:
+        file_input: Video file.
+        threshold: Threshold of the scene score of the downscaled luma, see `SceneScorer`.
+        max_workers: The number of FFmpeg processes, the number of CPUs in default.
+        size: Size of frames to analyze.
+    """
+    frame_scores = score_frames_parallel(file_input, max_workers=max_workers, size=size)
+    return Scenes.create(frame_scores.scores, frame_scores.list_pts_time, frame_scores.end, threshold=threshold)
+
+
+def score_frames_parallel(
+    file_input: Path,
+    *,
+    max_workers: Optional[int] = None,
+    size: FrameSize = SIZE_ANALYSIS,
+) -> FrameScores:
+    """Score all frames in parallel, the result is the same as `score_frames()`."""
+    count_worker = max_workers or os.cpu_count() or 1
+    starts = split_into_chunks(get_key_frame_times(file_input), count_worker * COUNT_CHUNK_PER_WORKER)
+    ends: list[Optional[float]] = [*starts[1:], None]
+    logger.info("Chunks: %d", len(starts))
+    with ThreadPoolExecutor(max_workers=count_worker) as executor:
+        list_frame_scores = list(
+            executor.map(
+                lambda start, end: score_chunk(file_input, start, end, size=size),
+                starts,
+                ends,
+            ),
+        )
+    return merge(list_frame_scores)
+
+
+def score_chunk(file_input: Path, start: float, end: Optional[float], *, size: FrameSize) -> FrameScores:
+    """Score the frames from the start to the end, the timestamps are converted into the ones of the file."""
+    start_overlap = max(start - SECONDS_OVERLAP, 0.0)
+    parameters_input = ["-ss", f"{start_overlap:.6f}"]
+    if end is not None:
+        parameters_input.extend(["-to", f"{end:.6f}"])
+    frame_scores = score_frames(file_input, parameters_input=parameters_input, size=size)
+    # The timestamps restart from 0 at the position of the input-side `-ss`.
+    pts_time = np.array(frame_scores.list_pts_time, dtype=np.float64) + start_overlap
+    # The frames in the overlap are only to score the following frames, and belong to the previous chunk.
+    mask = pts_time >= start - get_tolerance(pts_time)
+    return FrameScores(
+        frame_scores.scores[mask],
+        [f"{each_pts_time:.6f}" for each_pts_time in pts_time[mask].tolist()],
+        frame_scores.duration,
+    )
+
+
+def get_tolerance(pts_time: npt.NDArray[np.float64]) -> float:
+    """Half of the shortest frame interval, the error of timestamps to regard as the same frame."""
+    intervals = np.diff(pts_time)
+    intervals = intervals[intervals > 0]
+    return max(float(intervals.min()) / 2, TOLERANCE) if intervals.size else TOLERANCE
+
+
+def merge(list_frame_scores: list[FrameScores]) -> FrameScores:
+    """Merge scores of chunks in the order of chunks, skipping the frames the previous chunks already have."""
+    list_pts_time: list[str] = []
+    list_scores = []
+    pts_time_last = -np.inf
+    for frame_scores in list_frame_scores:
+        pts_time = np.array(frame_scores.list_pts_time, dtype=np.float64)
+        mask = pts_time > pts_time_last + get_tolerance(pts_time)
+        list_pts_time.extend(itertools.compress(frame_scores.list_pts_time, mask.tolist()))
+        list_scores.append(frame_scores.scores[mask])
+        if mask.any():
+            pts_time_last = float(pts_time[mask][-1])
+    duration = next((frame_scores.duration for frame_scores in list_frame_scores if frame_scores.duration), None)
+    scores = np.concatenate(list_scores) if list_scores else np.empty(0, dtype=np.float64)
+    return FrameScores(scores, list_pts_time, duration)
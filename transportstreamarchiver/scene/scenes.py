@@ -0,0 +1,49 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
+import json
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+__all__ = ["Scenes"]
+
+
+@dataclass
+class Scenes:
+    """Scenes of the video.
+
+    The times are in the format of pts_time that FFmpeg outputs.
+    """
+
+    # The start times of the scenes except for the first scene which starts at 0.
+    times: list[str]
+    # The end time of the video.
+    end: str
+
+    @classmethod
+    def create(
+        cls,
+        scores: npt.NDArray[np.float64],
+        list_pts_time: Sequence[str],
+        end: str,
+        *,
+        threshold: float,
+    ) -> "Scenes":
+        """Frames whose score is greater than the threshold start new scenes."""
+        return cls([list_pts_time[frame] for frame in np.flatnonzero(scores > threshold).tolist()], end)
+
+    def __len__(self) -> int:
+        return len(self.times) + 1
+
+    @property
+    def indices(self) -> list[int]:
+        """Indices of the scenes to pass `create_list_consecutive_period()`."""
+        return list(range(len(self)))
+
+    def to_list_time(self) -> list[str]:
+        """The start time of each scene followed by the end time of the video, the format of times.json."""
+        return ["0", *self.times, self.end]
+
+    def save(self, file: Path) -> None:
+        file.write_text(json.dumps(self.to_list_time()), encoding="utf-8")
@@ -0,0 +1,52 @@
+"""Scene score in the same formula as the `select` filter of FFmpeg, applied to the frames given.
+
+The `select` filter scores only the luma plane of YUV frames,
+and the detector gives the luma plane downscaled (160x90 in default) without converting its range,
+so the score is in the same scale as `select=gt(scene,...)` and the thresholds tuned for the filter are kept.
+The downscale averages out small details, so the score of motion without scene change is slightly different.
+
+- FFmpeg Filters Documentation: select
+  https://ffmpeg.org/ffmpeg-filters.html#select_002c-aselect
+"""
+
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+__all__ = ["SceneScorer"]
+
+
+class SceneScorer:
+    """Score frames block by block, keeping the last frame to score the next block.
+
+    The score is `min(mafd, |mafd - previous mafd|) / 100` clipped into [0, 1],
+    where mafd is the mean absolute frame difference from the previous frame.
+    The score of the first frame is 0.
+    """
+
+    def __init__(self) -> None:
+        self.previous: Optional[npt.NDArray[np.int16]] = None
+        self.previous_mafd = 0.0
+
+    def update(self, frames: npt.NDArray[np.uint8]) -> npt.NDArray[np.float64]:
+        """Score the frames.
+
+        Args:
+            frames: Luma planes of frames in the shape of (count, height, width).
+        """
+        if frames.shape[0] == 0:
+            return np.empty(0, dtype=np.float64)
+        frames_signed = frames.astype(np.int16)
+        is_first = self.previous is None
+        if self.previous is not None:
+            frames_signed = np.concatenate((self.previous[np.newaxis], frames_signed))
+        mafd = np.abs(np.diff(frames_signed, axis=0)).mean(axis=(1, 2))
+        difference = np.abs(mafd - np.concatenate(([self.previous_mafd], mafd[:-1])))
+        scores: npt.NDArray[np.float64] = np.clip(np.minimum(mafd, difference) / 100, 0, 1)
+        if is_first:
+            scores = np.concatenate(([0.0], scores))
+        if mafd.size:
+            self.previous_mafd = float(mafd[-1])
+        self.previous = frames_signed[-1].copy()
+        return scores
@@ -0,0 +1,129 @@
+"""Streaming parser of stderr of FFmpeg with the `showinfo` filter.
+
+The verbose log grows in proportion to the number of frames,
+so it's parsed line by line and only the timestamps not yet consumed are kept.
+The raw log is written into a file only when requested.
+"""
+
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+import queue
+import re
+import threading
+from typing import IO, Optional
+
+__all__ = ["Progress", "ShowInfoParser", "StderrReader"]
+
+PATTERN_PTS_TIME = re.compile(r"\bn:\s*\d+\s.*?\bpts_time:(\S+)")
+PATTERN_DURATION = re.compile(r"Duration:\s(\d{2}):(\d{2}):(\d{2})\.(\d+)")
+# Percent to report the progress, to prevent the callback from being called for each frame.
+STEP_PROGRESS = 1.0
+
+
+@dataclass
+class Progress:
+    """Progress of the analysis by the timestamp of the last frame."""
+
+    seconds: float
+    # The duration of the input in seconds, None when FFmpeg doesn't report it.
+    duration: Optional[float]
+
+    @property
+    def percent(self) -> Optional[float]:
+        if not self.duration:
+            return None
+        return min(self.seconds / self.duration * 100, 100.0)
+
+
+def parse_duration(line: str) -> Optional[str]:
+    """Parse the duration of the input in seconds, in the format like `5.00`."""
+    match = PATTERN_DURATION.search(line)
+    if not match:
+        return None
+    hours, minutes, seconds, fraction = match.groups()
+    return f"{int(hours) * 3600 + int(minutes) * 60 + int(seconds)}.{fraction}"
+
+
+class ShowInfoParser:
+    """Parse lines of stderr one by one, keeping only the duration and the last progress reported."""
+
+    def __init__(
+        self,
+        *,
+        callback_progress: Optional[Callable[[Progress], None]] = None,
+        step_progress: float = STEP_PROGRESS,
+    ) -> None:
+        self.callback_progress = callback_progress
+        self.step_progress = step_progress
+        self.duration: Optional[str] = None
+        self.percent_reported = -step_progress
+
+    def parse(self, line: str) -> Optional[str]:
+        """Returns pts_time when the line is the one of a frame."""
+        match = PATTERN_PTS_TIME.search(line)
+        if match:
+            pts_time = match.group(1)
+            self.report(pts_time)
+            return pts_time
+        if self.duration is None:
+            self.duration = parse_duration(line)
+        return None
+
+    def report(self, pts_time: str) -> None:
+        if self.callback_progress is None:
+            return
+        progress = Progress(float(pts_time), float(self.duration) if self.duration else None)
+        percent = progress.percent
+        if percent is None or percent - self.percent_reported >= self.step_progress:
+            self.percent_reported = percent or 0.0
+            self.callback_progress(progress)
+
+
+class StderrReader(threading.Thread):
+    """Pass pts_time of frames from stderr of FFmpeg to the consumer of the stdout through the queue.
+
+    The consumer takes as many timestamps as frames it has read,
+    so the queue holds only the frames that FFmpeg has processed but the consumer hasn't read yet.
+    """
+
+    def __init__(
+        self,
+        stream: IO[bytes],
+        *,
+        parser: Optional[ShowInfoParser] = None,
+        log: Optional[IO[bytes]] = None,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.stream = stream
+        self.parser = parser or ShowInfoParser()
+        self.log = log
+        self.queue_pts_time: queue.SimpleQueue[Optional[str]] = queue.SimpleQueue()
+
+    @property
+    def duration(self) -> Optional[str]:
+        return self.parser.duration
+
+    def run(self) -> None:
+        try:
+            for line_bytes in self.stream:
+                if self.log is not None:
+                    self.log.write(line_bytes)
+                pts_time = self.parser.parse(line_bytes.decode("utf-8", errors="ignore"))
+                if pts_time is not None:
+                    self.queue_pts_time.put(pts_time)
+        finally:
+            # Sentinel to tell the consumer that no more timestamps come.
+            self.queue_pts_time.put(None)
+
+    def take(self, count: int) -> list[str]:
+        """Take timestamps of the next frames, fewer than the count only when stderr is closed."""
+        return list(self.iterate_pts_time(count))
+
+    def iterate_pts_time(self, count: int) -> Iterator[str]:
+        for _ in range(count):
+            pts_time = self.queue_pts_time.get()
+            if pts_time is None:
+                # Put back for following calls.
+                self.queue_pts_time.put(None)
+                return
+            yield pts_time
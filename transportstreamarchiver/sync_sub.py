@@ -1,12 +1,80 @@
+from collections.abc import Iterable
+from concurrent.futures import as_completed, ProcessPoolExecutor
+from dataclasses import dataclass
+from logging import getLogger
 from pathlib import Path
+from tempfile import TemporaryDirectory
+import time
+from typing import Optional
 
 from srt_sync import SrtSyncWrapper
 from transportstreamarchiver import ffmpeg
 
+__all__ = ["sync_sub", "sync_sub_batch", "SyncSubJob", "SyncSubResult"]
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class SyncSubJob:
+    ts_original: Path
+    remove_list: Path
+    ts_cut: Path
+    ts_synced: Path
+
+
+@dataclass
+class SyncSubResult:
+    job: SyncSubJob
+    seconds: float
+    error: Optional[str] = None
+
 
 def sync_sub(ts_original: Path, remove_list: Path, ts_cut: Path, ts_synced: Path) -> None:
-    sub_original = Path("sub.srt")
-    sub_cut = Path(f"{sub_original.stem}_cut.srt")
-    ffmpeg.export_subtitle(ts_original, sub_original)
-    SrtSyncWrapper.process(sub_original, remove_list)
-    ffmpeg.import_subtitle(ts_cut, sub_cut, ts_synced)
+    # The scratch directory is isolated for each call
+    # so that multiple calls can run at the same time in the same working directory.
+    with TemporaryDirectory(prefix=f"{ts_original.stem}_") as directory_work:
+        sub_original = Path(directory_work) / "sub.srt"
+        sub_cut = Path(directory_work) / f"{sub_original.stem}_cut.srt"
+        ffmpeg.export_subtitle(ts_original, sub_original)
+        SrtSyncWrapper.process(sub_original, remove_list, file_sub_cut=sub_cut)
+        ffmpeg.import_subtitle(ts_cut, sub_cut, ts_synced)
+
+
+def run_job(job: SyncSubJob) -> SyncSubResult:
+    time_start = time.perf_counter()
+    try:
+        sync_sub(job.ts_original, job.remove_list, job.ts_cut, job.ts_synced)
+    # Reason: To continue the rest of jobs and report the failure in the summary.
+    except Exception as error:  # noqa: BLE001
+        return SyncSubResult(job, time.perf_counter() - time_start, f"{type(error).__name__}: {error}")
+    return SyncSubResult(job, time.perf_counter() - time_start)
+
+
+def sync_sub_batch(jobs: Iterable[SyncSubJob], *, max_workers: Optional[int] = None) -> list[SyncSubResult]:
+    """Sync subtitles of multiple videos in parallel.
+
+    Args:
+        jobs: Jobs to sync subtitle.
+        max_workers: The number of processes, the number of CPUs in default.
+    """
+    list_job = list(jobs)
+    results: dict[int, SyncSubResult] = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_job, job): index for index, job in enumerate(list_job)}
+        for future in as_completed(futures):
+            result = future.result()
+            logger.info("%s: %.1f sec %s", result.job.ts_synced, result.seconds, result.error or "OK")
+            results[futures[future]] = result
+    list_result = [results[index] for index in range(len(list_job))]
+    log_summary(list_result)
+    return list_result
+
+
+def log_summary(results: list[SyncSubResult]) -> None:
+    list_failure = [result for result in results if result.error is not None]
+    logger.info("Summary: %d succeeded, %d failed", len(results) - len(list_failure), len(list_failure))
+    for result in results:
+        logger.info("%8.1f sec %s %s", result.seconds, "NG" if result.error else "OK", result.job.ts_synced)
+    for result in list_failure:
+        logger.error("%s: %s", result.job.ts_synced, result.error)